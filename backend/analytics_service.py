@@ -0,0 +1,105 @@
+# Utilization analytics - 배치 시작/종료 배열로 설비/설비유형별 시간 구간 가동률을 벡터 연산으로 계산
+from datetime import datetime, timedelta
+from typing import Dict, List, Optional, Sequence
+
+import numpy as np
+import pandas as pd
+
+# 구간 단위별 길이 (교대 = 8시간)
+BUCKET_SIZES = {
+    'shift': timedelta(hours=8),
+    'day': timedelta(days=1),
+    'week': timedelta(weeks=1),
+}
+
+
+def bucket_edges(start: datetime, end: datetime, bucket: str) -> np.ndarray:
+    """[start, end) 를 덮는 구간 경계 (주 단위는 월요일 0시, 그 외는 당일 0시 기준 정렬)"""
+    if bucket not in BUCKET_SIZES:
+        raise ValueError(f"Unknown bucket: {bucket}")
+    size = BUCKET_SIZES[bucket]
+    origin = datetime.combine(start.date(), datetime.min.time())
+    if bucket == 'week':
+        origin -= timedelta(days=origin.weekday())
+    origin += ((start - origin) // size) * size
+    count = max(1, -(-(end - origin) // size))
+    return np.datetime64(origin, 's') + np.arange(count + 1) * np.timedelta64(int(size.total_seconds()), 's')
+
+
+def busy_seconds(starts: np.ndarray, ends: np.ndarray, edges: np.ndarray) -> np.ndarray:
+    """
+    구간별 작업 시간(초)
+    F(t) = Σ clip(t - start, 0, 길이) 를 경계마다 정렬 배열 + 누적합 + searchsorted 로 계산하고
+    구간 [a, b) 의 작업 시간 = F(b) - F(a)  → O((n + 구간 수) log n)
+    """
+    edge_seconds = edges.astype('datetime64[s]').astype(np.int64)
+    if starts.size == 0:
+        return np.zeros(len(edge_seconds) - 1)
+
+    start_seconds = np.sort(starts.astype('datetime64[s]').astype(np.int64))
+    end_seconds = np.sort(ends.astype('datetime64[s]').astype(np.int64))
+    start_cumsum = np.concatenate(([0], np.cumsum(start_seconds)))
+    end_cumsum = np.concatenate(([0], np.cumsum(end_seconds)))
+
+    started = np.searchsorted(start_seconds, edge_seconds, side='right')
+    finished = np.searchsorted(end_seconds, edge_seconds, side='right')
+    # Σ_{start<t}(t - start) - Σ_{end<t}(t - end)
+    integral = (started * edge_seconds - start_cumsum[started]) - (finished * edge_seconds - end_cumsum[finished])
+    return np.diff(integral).astype(float)
+
+
+def utilization_series(equipment_ids: Sequence[str], starts: Sequence[datetime], ends: Sequence[datetime],
+                       bucket: str = 'day', equipment_types: Optional[Dict[str, str]] = None,
+                       start: Optional[datetime] = None, end: Optional[datetime] = None) -> Dict:
+    """
+    설비별/설비유형별 구간 가동률(%) 시계열
+    equipment_types 를 주면 유형별 합계(유형 내 설비 수 × 구간 길이 대비)도 함께 계산
+    """
+    # pandas 변환이 datetime 객체 → datetime64 변환과 문자열 그룹화 모두 훨씬 빠름
+    start_array = pd.DatetimeIndex(starts).values.astype('datetime64[s]')
+    end_array = pd.DatetimeIndex(ends).values.astype('datetime64[s]')
+
+    if start is None or end is None:
+        if start_array.size == 0:
+            return {'bucket': bucket, 'edges': [], 'equipment': {}, 'types': {}}
+        start = start or pd.Timestamp(start_array.min()).to_pydatetime()
+        end = end or pd.Timestamp(end_array.max()).to_pydatetime()
+
+    edges = bucket_edges(start, end, bucket)
+    bucket_seconds = BUCKET_SIZES[bucket].total_seconds()
+
+    # 설비 코드별로 정렬해 연속 구간을 한 번에 처리
+    codes, unique_ids = pd.factorize(np.asarray(equipment_ids, dtype=object))
+    order = np.argsort(codes, kind='stable')
+    start_array = start_array[order]
+    end_array = end_array[order]
+    bounds = np.searchsorted(codes[order], np.arange(len(unique_ids) + 1))
+
+    busy: Dict[str, np.ndarray] = {}
+    for i, equipment_id in enumerate(unique_ids):
+        lo, hi = bounds[i], bounds[i + 1]
+        busy[equipment_id] = busy_seconds(start_array[lo:hi], end_array[lo:hi], edges)
+
+    result = {
+        'bucket': bucket,
+        'edges': [str(edge) for edge in edges[:-1]],
+        'equipment': {k: _percent(v, bucket_seconds) for k, v in busy.items()},
+        'types': {}
+    }
+
+    if equipment_types:
+        by_type: Dict[str, List[np.ndarray]] = {}
+        for equipment_id, equipment_type in equipment_types.items():
+            by_type.setdefault(equipment_type, []).append(
+                busy.get(equipment_id, np.zeros(len(edges) - 1))
+            )
+        result['types'] = {
+            equipment_type: _percent(np.sum(series, axis=0), bucket_seconds * len(series))
+            for equipment_type, series in by_type.items()
+        }
+
+    return result
+
+
+def _percent(busy: np.ndarray, capacity_seconds: float) -> List[float]:
+    return np.round(busy / capacity_seconds * 100, 2).tolist()
@@ -0,0 +1,86 @@
+# Batch persistence - 생성된 배치를 호출자 트랜잭션 안에서 청크 단위 executemany 로 일괄 저장
+import time
+from datetime import datetime
+from typing import Dict, Iterable, Optional
+
+from sqlalchemy import delete
+from sqlalchemy.orm import Session
+
+from models import Batch
+from schedule_queries import MAX_BATCH_DURATION
+
+DEFAULT_CHUNK_SIZE = 5000
+KEY_CHUNK_SIZE = 500  # 한 번의 IN 삭제에 넣는 판매계획 ID 수 (바인드 파라미터 한도)
+
+# 일괄 저장 시 기록하는 컬럼 (실적 컬럼 actual_start/actual_end 제외)
+BATCH_COLUMNS = (
+    'id', 'lot_number', 'product_id', 'equipment_id', 'sales_plan_id', 'sequence',
+    'process_name', 'quantity', 'start_time', 'end_time', 'status', 'notes'
+)
+
+
+def _batch_row(batch: Batch, schedule_id: Optional[str], now: datetime) -> Dict:
+    # 기간 조회는 start_time 하한을 (start - MAX_BATCH_DURATION) 으로 두므로 더 긴 배치는 저장하지 않음
+    if batch.end_time - batch.start_time > MAX_BATCH_DURATION:
+        raise ValueError(f"Batch {batch.lot_number or batch.id} is longer than {MAX_BATCH_DURATION} "
+                         f"({batch.start_time} - {batch.end_time})")
+    row = {column: getattr(batch, column) for column in BATCH_COLUMNS}
+    row['status'] = row['status'] or 'planned'
+    row['schedule_id'] = schedule_id if schedule_id is not None else batch.schedule_id
+    row['created_at'] = now
+    row['updated_at'] = now
+    return row
+
+
+def persist_batches(db: Session, batches: Iterable[Batch], schedule_id: Optional[str] = None,
+                    replace: bool = False, chunk_size: int = DEFAULT_CHUNK_SIZE,
+                    replace_sales_plans: Iterable[str] = ()) -> Dict:
+    """
+    배치 일괄 저장 - ORM unit-of-work 없이 Core INSERT 를 chunk_size 행씩 executemany 로 실행
+    replace=True 이면 같은 schedule_id 의 기존 배치를 먼저 삭제
+    replace_sales_plans 의 판매계획 배치도 schedule_id 와 무관하게 삭제 (다른 범위로 생성된 같은 계획의 배치)
+    커밋/롤백은 호출자 몫 - 삭제와 저장이 호출자의 트랜잭션 안에서 실행되므로
+    다른 변경과 함께 커밋하거나, 실패 시 롤백해 기존 배치를 그대로 유지할 수 있음
+    MAX_BATCH_DURATION 보다 긴 배치가 있으면 ValueError (호출자가 롤백)
+    저장 결과와 처리량(rows/sec, 커밋 제외)을 반환
+    """
+    if chunk_size < 1:
+        raise ValueError("chunk_size must be positive")
+    if replace and schedule_id is None:
+        raise ValueError("replace requires a schedule_id")
+
+    started = time.perf_counter()
+    now = datetime.utcnow()
+    insert_statement = Batch.__table__.insert()
+    inserted = deleted = chunks = 0
+
+    if replace:
+        deleted = db.execute(delete(Batch).where(Batch.schedule_id == schedule_id)).rowcount
+    plan_ids = list(replace_sales_plans)
+    for index in range(0, len(plan_ids), KEY_CHUNK_SIZE):
+        deleted += db.execute(
+            delete(Batch).where(Batch.sales_plan_id.in_(plan_ids[index:index + KEY_CHUNK_SIZE]))
+        ).rowcount
+
+    chunk = []
+    for batch in batches:
+        chunk.append(_batch_row(batch, schedule_id, now))
+        if len(chunk) >= chunk_size:
+            db.execute(insert_statement, chunk)
+            inserted += len(chunk)
+            chunks += 1
+            chunk = []
+    if chunk:
+        db.execute(insert_statement, chunk)
+        inserted += len(chunk)
+        chunks += 1
+
+    elapsed = time.perf_counter() - started
+    return {
+        'schedule_id': schedule_id,
+        'inserted': inserted,
+        'deleted': deleted,
+        'chunks': chunks,
+        'elapsed_seconds': elapsed,
+        'rows_per_second': inserted / elapsed if elapsed > 0 else 0.0
+    }
@@ -0,0 +1,265 @@
+"""
+스케줄러 성능 벤치마크
+메모리 SQLite에 샘플 마스터 데이터를 넣고 대량 판매계획으로 스케줄 생성 시간을 측정
+
+실행 방법:
+    cd backend
+    python benchmark.py --plans 10000
+"""
+
+import argparse
+import json
+import os
+import tempfile
+import time
+import uuid
+from datetime import date, datetime, timedelta
+
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+from models import Base, Batch, Product, Equipment, Process, ProductProcess, SalesPlan
+from batch_persistence import persist_batches
+from init_data import create_sample_master_data
+from equipment_occupancy import EquipmentOccupancy, SlotMatrixOccupancy
+from routing import load_routing_table
+from scheduler_service import SchedulerService
+
+PRODUCT_IDS = ["500002", "500005", "500008", "505227", "500023", "500041", "507123", "507242"]
+
+
+class DictOccupancy:
+    """기존 방식 재현: {(equipment_id, date, slot): True} 딕셔너리를 하루/구간 단위로 순회"""
+
+    def __init__(self, origin: date, slots_per_day: int):
+        self.origin = origin
+        self.slots_per_day = slots_per_day
+        self.equipment_slots = {}
+
+    def slot_index(self, day: date, slot: int = 0) -> int:
+        return (day - self.origin).days * self.slots_per_day + slot
+
+    def find_free_run(self, equipment_id, start, length, limit):
+        consecutive = 0
+        for index in range(start, limit):
+            day, slot = divmod(index, self.slots_per_day)
+            slot_key = (equipment_id, self.origin + timedelta(days=day), slot)
+            if not self.equipment_slots.get(slot_key):
+                consecutive += 1
+                if consecutive >= length:
+                    return index - length + 1
+            else:
+                consecutive = 0
+        return None
+
+    def first_free(self, equipment_id):
+        return 0  # 기존 방식에는 빈 슬롯 포인터가 없음
+
+    def occupy(self, equipment_id, start, length):
+        for index in range(start, start + length):
+            day, slot = divmod(index, self.slots_per_day)
+            self.equipment_slots[(equipment_id, self.origin + timedelta(days=day), slot)] = True
+
+
+class DictSchedulerService(SchedulerService):
+    occupancy_class = DictOccupancy
+
+
+def create_session():
+    """샘플 마스터 데이터가 들어있는 메모리 DB 세션"""
+    engine = create_engine("sqlite://")
+    Base.metadata.create_all(bind=engine)
+    db = sessionmaker(bind=engine)()
+    create_sample_master_data(db)
+    db.commit()
+    return db
+
+
+def make_sales_plans(db, count: int, year: int = 2025, month: int = 1):
+    """제품을 순환하며 판매계획 생성 (DB에 저장하지 않음)"""
+    products = [db.get(Product, product_id) for product_id in PRODUCT_IDS]
+    return [
+        SalesPlan(
+            id=f"PLAN{i:06d}",
+            product_id=products[i % len(products)].id,
+            product=products[i % len(products)],
+            year=year,
+            month=month,
+            quantity=1000,
+            priority=i % 5 + 1
+        )
+        for i in range(count)
+    ]
+
+
+def timed(label, func, *args, **kwargs):
+    started = time.perf_counter()
+    result = func(*args, **kwargs)
+    elapsed = time.perf_counter() - started
+    print(f"{label:<32} {elapsed * 1000:10.1f} ms")
+    return result, elapsed
+
+
+def bench_generation(plan_count: int):
+    """판매계획 plan_count건 스케줄 생성: 기존 딕셔너리 방식 vs 비트셋 인덱스"""
+    print(f"\n[generate_schedule_from_sales] plans={plan_count}")
+    db = create_session()
+    plans = make_sales_plans(db, plan_count)
+
+    legacy, legacy_time = timed("dict slots (before)", DictSchedulerService(db).generate_schedule_from_sales, plans)
+    indexed, indexed_time = timed("bitset occupancy (after)", SchedulerService(db).generate_schedule_from_sales, plans)
+
+    same = [(b.equipment_id, b.start_time, b.end_time) for b in legacy] == \
+           [(b.equipment_id, b.start_time, b.end_time) for b in indexed]
+    print(f"batches placed: {len(indexed)}, identical: {same}, speedup: {legacy_time / indexed_time:.1f}x")
+    db.close()
+
+
+def bench_slot_search(plan_count: int):
+    """ORM 조회를 제외한 슬롯 탐색만 재현 (장비 4대, 공정당 2~3 슬롯)"""
+    print(f"\n[slot search only] plans={plan_count}")
+    steps = [("EQ001", 2), ("EQ003", 3), ("EQ005", 2), ("EQ007", 2)]
+    origin = date(2025, 1, 1)
+    limit = SchedulerService.SEARCH_DAYS * SchedulerService.SLOTS_PER_DAY
+
+    def replay(occupancy_class):
+        occupancy = occupancy_class(origin, SchedulerService.SLOTS_PER_DAY)
+        placed = []
+        for _ in range(plan_count):
+            for equipment_id, length in steps:
+                start = occupancy.find_free_run(equipment_id, 0, length, limit)
+                if start is not None:
+                    occupancy.occupy(equipment_id, start, length)
+                    placed.append((equipment_id, start))
+        return placed
+
+    legacy, legacy_time = timed("dict slots (before)", replay, DictOccupancy)
+    indexed, indexed_time = timed("bitset occupancy (after)", replay, EquipmentOccupancy)
+    matrix, matrix_time = timed("numpy slot matrix", replay, SlotMatrixOccupancy)
+    print(f"runs placed: {len(indexed)}, identical: {legacy == indexed == matrix}, "
+          f"speedup: {legacy_time / indexed_time:.1f}x (bitset), {legacy_time / matrix_time:.1f}x (numpy)")
+
+
+def bench_engines(equipment_count: int, days: int):
+    """장비 equipment_count대, days일 범위를 가득 채우는 판매계획으로 엔진 비교"""
+    print(f"\n[engines] equipment={equipment_count} days={days}")
+    engine = create_engine("sqlite://")
+    Base.metadata.create_all(bind=engine)
+    db = sessionmaker(bind=engine)()
+    products, processes, routings = [], [], []
+    for i in range(equipment_count):
+        db.add(Equipment(id=f"EQ{i:03d}", name=f"Equipment {i}", type=f"type{i % 4}"))
+        db.add(Process(id=f"PROC{i:03d}", name=f"Process {i % 4}", type=f"type{i % 4}",
+                       equipment_id=f"EQ{i:03d}", duration_hours=1.0 + i % 5, setup_time_hours=0.5))
+    for p in range(equipment_count // 4):
+        db.add(Product(id=f"P{p:03d}", code=f"P{p:03d}", name=f"Product {p}"))
+        for sequence in range(4):
+            db.add(ProductProcess(product_id=f"P{p:03d}", process_id=f"PROC{p * 4 + sequence:03d}",
+                                  sequence=sequence + 1, quantity_per_batch=1000))
+    db.commit()
+
+    product_ids = [f"P{p:03d}" for p in range(equipment_count // 4)]
+    plans = [SalesPlan(id=f"PLAN{i:06d}", product_id=product_ids[i % len(product_ids)], year=2025, month=1,
+                       quantity=1000, priority=1)
+             for i in range(days * SchedulerService.SLOTS_PER_DAY * len(product_ids))]
+    service = SchedulerService(db)
+    routing = load_routing_table(db)
+
+    bitset, bitset_time = timed("engine=bitset", service.generate_schedule_from_sales, plans, routing, "bitset")
+    numpy_batches, numpy_time = timed("engine=numpy", service.generate_schedule_from_sales, plans, routing, "numpy")
+    same = [(b.equipment_id, b.start_time, b.end_time) for b in bitset] == \
+           [(b.equipment_id, b.start_time, b.end_time) for b in numpy_batches]
+    print(f"plans: {len(plans)}, batches placed: {len(bitset)}, identical: {same}")
+    db.close()
+
+
+def make_batches(count: int):
+    """로트 번호가 겹치지 않는 합성 배치 (설비 8대에 2시간 간격으로 순차 배치)"""
+    origin = datetime(2025, 1, 1)
+    return [
+        Batch(id=str(uuid.uuid4()), lot_number=f"LOT-BENCH-{i:07d}", product_id=PRODUCT_IDS[i % len(PRODUCT_IDS)],
+              equipment_id=f"EQ{i % 8 + 1:03d}", sales_plan_id=None, sequence=1, process_name="혼합",
+              quantity=1000, start_time=origin + timedelta(hours=2 * (i // 8)),
+              end_time=origin + timedelta(hours=2 * (i // 8) + 2), status="planned")
+        for i in range(count)
+    ]
+
+
+def bench_persistence(batch_count: int, chunk_size: int):
+    """ORM add_all + commit 과 청크 단위 executemany 일괄 저장 비교 (파일 SQLite)"""
+    print(f"\n[persist batches] batches={batch_count} chunk={chunk_size}")
+    with tempfile.TemporaryDirectory() as directory:
+        results = {}
+        for label in ("orm add_all (before)", "bulk executemany (after)", "bulk replace"):
+            engine = create_engine(f"sqlite:///{os.path.join(directory, label.split()[1] + '.db')}")
+            Base.metadata.create_all(bind=engine)
+            db = sessionmaker(bind=engine)()
+            batches = make_batches(batch_count)
+            if label == "bulk replace":
+                persist_batches(db, batches, schedule_id="bench", chunk_size=chunk_size)
+                db.commit()
+                batches = make_batches(batch_count)
+                for batch in batches:
+                    batch.lot_number += "-R"
+
+            started = time.perf_counter()
+            if label.startswith("orm"):
+                db.add_all(batches)
+                db.commit()
+            else:
+                persist_batches(db, batches, schedule_id="bench", replace=True, chunk_size=chunk_size)
+                db.commit()
+            results[label] = time.perf_counter() - started
+            rows = db.query(Batch).count()
+            print(f"{label:<30} {results[label] * 1000:9.1f} ms  "
+                  f"{batch_count / results[label]:>10,.0f} rows/sec  ({rows} rows)")
+            db.close()
+            engine.dispose()
+    print(f"speedup: {results['orm add_all (before)'] / results['bulk executemany (after)']:.1f}x")
+
+
+def bench_serialization(batch_counts=(10000, 100000)):
+    """/api/schedule 응답 직렬화: pydantic 모델 + jsonable_encoder 경로와 행 → JSON bytes 고속 경로 비교"""
+    from collections import namedtuple
+    from fastapi.encoders import jsonable_encoder
+    from fastapi.responses import JSONResponse
+    from fast_json import FastJSONResponse, orjson
+    from schedule_queries import schedule_row_dict, schedule_summary
+    from schemas import BatchSchedule, ScheduleResponse
+
+    Row = namedtuple("Row", "id product_id product_name equipment_id process_name start_time end_time "
+                            "lot_number quantity status")
+    encoder = "orjson" if orjson is not None else "json (orjson not installed)"
+    for count in batch_counts:
+        print(f"\n[serialize schedule] batches={count} encoder={encoder}")
+        rows = [Row(b.id, b.product_id, "기넥신에프정 40mg 100T", b.equipment_id, b.process_name, b.start_time,
+                    b.end_time, b.lot_number, b.quantity, b.status) for b in make_batches(count)]
+
+        def pydantic_path():
+            response = ScheduleResponse(batches=[BatchSchedule(**schedule_row_dict(row)) for row in rows],
+                                        summary=schedule_summary(rows))
+            return JSONResponse(jsonable_encoder(response)).body
+
+        def fast_path():
+            return FastJSONResponse({"batches": [schedule_row_dict(row) for row in rows],
+                                     "summary": schedule_summary(rows), "next_cursor": None}).body
+
+        slow_body, slow_time = timed("pydantic + jsonable_encoder (before)", pydantic_path)
+        fast_body, fast_time = timed("fast json (after)", fast_path)
+        same = json.loads(slow_body) == json.loads(fast_body)
+        print(f"{len(fast_body) / 1e6:.1f} MB, identical: {same}, speedup: {slow_time / fast_time:.1f}x")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="APS scheduler benchmarks")
+    parser.add_argument("--plans", type=int, default=10000, help="number of sales plans")
+    parser.add_argument("--equipment", type=int, default=48, help="equipment count for engine comparison")
+    parser.add_argument("--batches", type=int, default=100000, help="batch count for persistence comparison")
+    parser.add_argument("--chunk-size", type=int, default=5000, help="rows per executemany chunk")
+    args = parser.parse_args()
+
+    bench_slot_search(args.plans)
+    bench_generation(args.plans)
+    bench_engines(args.equipment, SchedulerService.SEARCH_DAYS)
+    bench_persistence(args.batches, args.chunk_size)
+    bench_serialization()
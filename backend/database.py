@@ -1,5 +1,6 @@
 # Database configuration and session management
-from sqlalchemy import create_engine
+from sqlalchemy import create_engine, event
+from sqlalchemy.engine import Engine
 from sqlalchemy.orm import sessionmaker, Session
 from sqlalchemy.ext.declarative import declarative_base
 from contextlib import contextmanager
@@ -8,15 +9,89 @@ from typing import Generator
 
 # Database URL from environment variable or default
 DATABASE_URL = os.getenv("DATABASE_URL", "sqlite:///./aps.db")
+# Optional separate URL (e.g. a read replica) for read-only sessions
+READ_DATABASE_URL = os.getenv("READ_DATABASE_URL", DATABASE_URL)
 
-# Create engine
-engine = create_engine(
-    DATABASE_URL,
-    connect_args={"check_same_thread": False} if "sqlite" in DATABASE_URL else {}
-)
+# SQLite performance profile (applied to every new connection)
+SQLITE_PRAGMAS = {
+    "journal_mode": "WAL",  # readers do not block the writer
+    "synchronous": "NORMAL",  # safe with WAL, fsync only at checkpoints
+    "mmap_size": int(os.getenv("SQLITE_MMAP_SIZE", 256 * 1024 * 1024)),
+    "cache_size": int(os.getenv("SQLITE_CACHE_SIZE", -64000)),  # negative = KiB (64 MB)
+    "busy_timeout": int(os.getenv("SQLITE_BUSY_TIMEOUT_MS", 5000)),
+    "temp_store": "MEMORY",
+}
 
-# Create session factory
+# Connection pool profile for server databases (PostgreSQL, MySQL, ...)
+POOL_SETTINGS = {
+    "pool_size": int(os.getenv("DB_POOL_SIZE", 10)),
+    "max_overflow": int(os.getenv("DB_MAX_OVERFLOW", 20)),
+    "pool_recycle": int(os.getenv("DB_POOL_RECYCLE", 1800)),
+    "pool_timeout": int(os.getenv("DB_POOL_TIMEOUT", 30)),
+    "pool_pre_ping": True,
+}
+
+# Session-level read-only switch for server databases
+READ_ONLY_STATEMENTS = {
+    "postgresql": "SET SESSION CHARACTERISTICS AS TRANSACTION READ ONLY",
+    "mysql": "SET SESSION TRANSACTION READ ONLY",
+    "mariadb": "SET SESSION TRANSACTION READ ONLY",
+}
+
+
+def _is_sqlite(url: str) -> bool:
+    return url.startswith("sqlite")
+
+
+def _is_memory_sqlite(url: str) -> bool:
+    return url in ("sqlite://", "sqlite:///:memory:") or "mode=memory" in url
+
+
+def create_db_engine(url: str, read_only: bool = False) -> Engine:
+    """Create an engine with the SQLite pragmas or server pool profile for the URL"""
+    if not _is_sqlite(url):
+        db_engine = create_engine(url, **POOL_SETTINGS)
+        statement = READ_ONLY_STATEMENTS.get(db_engine.dialect.name)
+        if read_only and statement:
+            @event.listens_for(db_engine, "connect")
+            def _set_read_only(dbapi_connection, connection_record):
+                cursor = dbapi_connection.cursor()
+                cursor.execute(statement)
+                cursor.close()
+        return db_engine
+
+    db_engine = create_engine(url, connect_args={"check_same_thread": False})
+    memory = _is_memory_sqlite(url)
+
+    @event.listens_for(db_engine, "connect")
+    def _set_sqlite_pragmas(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        for name, value in SQLITE_PRAGMAS.items():
+            if memory and name in ("journal_mode", "mmap_size"):
+                continue  # not applicable to in-memory databases
+            cursor.execute(f"PRAGMA {name}={value}")
+        if read_only:
+            cursor.execute("PRAGMA query_only=ON")
+        cursor.close()
+
+    return db_engine
+
+
+# Create engines - reads get their own pool of read-only connections
+# (an in-memory SQLite database exists only in its own engine, so it is shared)
+engine = create_db_engine(DATABASE_URL)
+read_engine = (engine if _is_memory_sqlite(READ_DATABASE_URL)
+               else create_db_engine(READ_DATABASE_URL, read_only=True))
+
+# Create session factories
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+ReadOnlySessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=read_engine)
+
+
+@event.listens_for(ReadOnlySessionLocal, "before_flush")
+def _reject_writes(session, flush_context, instances):
+    raise RuntimeError("Read-only session cannot flush changes")
+
 
 # Base class for models
 Base = declarative_base()
@@ -30,6 +105,15 @@ def get_db() -> Generator[Session, None, None]:
     finally:
         db.close()
 
+def get_read_db() -> Generator[Session, None, None]:
+    """Get read-only database session for heavy GET endpoints"""
+    db = ReadOnlySessionLocal()
+    try:
+        yield db
+    finally:
+        db.rollback()
+        db.close()
+
 @contextmanager
 def get_db_context() -> Generator[Session, None, None]:
     """Get database session as context manager"""
@@ -44,11 +128,13 @@ def get_db_context() -> Generator[Session, None, None]:
         db.close()
 
 def init_database():
-    """Initialize database tables"""
+    """Initialize database tables and migrate existing ones (new columns/indexes)"""
     from models import Base
+    from migrations import migrate_database
     Base.metadata.create_all(bind=engine)
-    
+    return migrate_database(engine)
+
 def drop_database():
     """Drop all database tables - use with caution"""
     from models import Base
-    Base.metadata.drop_all(bind=engine)
\ No newline at end of file
+    Base.metadata.drop_all(bind=engine)
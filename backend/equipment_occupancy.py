@@ -0,0 +1,228 @@
+# Equipment occupancy index - 장비별 슬롯 점유 인덱스 (비트셋 / NumPy 행렬)
+import heapq
+from datetime import date
+from typing import Dict, Iterable, Optional, Tuple
+
+import numpy as np
+
+
+class EquipmentOccupancy:
+    """
+    장비별 슬롯 점유 인덱스
+    장비마다 정수 하나를 비트셋으로 사용 (비트 i = origin 기준 i번째 슬롯 점유 여부)
+    연속 빈 슬롯 탐색은 비트 연산으로 워드 단위 병렬 처리
+    """
+
+    def __init__(self, origin: date, slots_per_day: int):
+        self.origin = origin
+        self.slots_per_day = slots_per_day
+        self._occupied: Dict[str, int] = {}
+        # 장비별 "가장 이른 빈 슬롯" 포인터 - 이 인덱스 이전 슬롯은 모두 점유됨
+        self._first_free: Dict[str, int] = {}
+
+    def slot_index(self, day: date, slot: int = 0) -> int:
+        """날짜/구간을 origin 기준 슬롯 인덱스로 변환"""
+        index = (day - self.origin).days * self.slots_per_day + slot
+        if index < 0:
+            raise ValueError(f"{day} is before occupancy origin {self.origin}")
+        return index
+
+    def find_free_run(self, equipment_id: str, start: int, length: int,
+                      limit: int) -> Optional[int]:
+        """[start, limit) 범위에서 length개 연속 빈 슬롯의 가장 이른 시작 인덱스"""
+        start = max(start, self._first_free.get(equipment_id, 0))
+        window = limit - start
+        if window < length:
+            return None
+
+        # 비트 i = start + i 슬롯이 비어 있음
+        free = ~(self._occupied.get(equipment_id, 0) >> start) & ((1 << window) - 1)
+
+        # 비트 i 가 남으려면 i .. i+length-1 이 모두 비어 있어야 함 (log(length)회 시프트)
+        runs = free
+        span = 1
+        while span < length and runs:
+            step = min(span, length - span)
+            runs &= runs >> step
+            span += step
+
+        if not runs:
+            return None
+        return start + (runs & -runs).bit_length() - 1
+
+    def first_free(self, equipment_id: str) -> int:
+        """장비의 가장 이른 빈 슬롯 (이전 슬롯은 모두 점유)"""
+        return self._first_free.get(equipment_id, 0)
+
+    def is_free(self, equipment_id: str, start: int, length: int) -> bool:
+        """start 부터 length개 슬롯이 모두 비어 있는지 확인"""
+        mask = ((1 << length) - 1) << start
+        return not (self._occupied.get(equipment_id, 0) & mask)
+
+    def occupy(self, equipment_id: str, start: int, length: int):
+        """슬롯 점유 표시"""
+        occupied = self._occupied.get(equipment_id, 0) | (((1 << length) - 1) << start)
+        self._occupied[equipment_id] = occupied
+
+        first_free = self._first_free.get(equipment_id, 0)
+        if start <= first_free:
+            # 포인터 이후 첫 번째 0 비트로 이동
+            remaining = occupied >> first_free
+            self._first_free[equipment_id] = (
+                first_free + ((remaining + 1) & ~remaining).bit_length() - 1
+            )
+
+    def release(self, equipment_id: str, start: int, length: int):
+        """슬롯 점유 해제"""
+        mask = ((1 << length) - 1) << start
+        self._occupied[equipment_id] = self._occupied.get(equipment_id, 0) & ~mask
+        if start < self._first_free.get(equipment_id, 0):
+            self._first_free[equipment_id] = start
+
+
+class SlotMatrixOccupancy:
+    """
+    장비 × 슬롯 인덱스 NumPy 불리언 행렬 (True = 점유)
+    연속 빈 슬롯 탐색은 누적합 기반 벡터 연산으로 처리
+    EquipmentOccupancy 와 동일한 인터페이스/결과를 제공
+    """
+
+    INITIAL_SLOTS = 256
+
+    def __init__(self, origin: date, slots_per_day: int):
+        self.origin = origin
+        self.slots_per_day = slots_per_day
+        self._rows: Dict[str, int] = {}
+        self._matrix = np.zeros((0, self.INITIAL_SLOTS), dtype=bool)
+        self._first_free = np.zeros(0, dtype=np.int64)
+
+    def slot_index(self, day: date, slot: int = 0) -> int:
+        """날짜/구간을 origin 기준 슬롯 인덱스로 변환"""
+        index = (day - self.origin).days * self.slots_per_day + slot
+        if index < 0:
+            raise ValueError(f"{day} is before occupancy origin {self.origin}")
+        return index
+
+    def _row(self, equipment_id: str, limit: int) -> int:
+        """장비 행 번호 (필요 시 행렬을 장비/슬롯 방향으로 2배씩 확장)"""
+        row = self._rows.get(equipment_id)
+        rows, slots = self._matrix.shape
+        if row is None:
+            row = self._rows[equipment_id] = len(self._rows)
+        if row >= rows or limit > slots:
+            new_rows = max(rows, 1)
+            while new_rows <= row:
+                new_rows *= 2
+            new_slots = slots
+            while new_slots < limit:
+                new_slots *= 2
+            matrix = np.zeros((new_rows, new_slots), dtype=bool)
+            matrix[:rows, :slots] = self._matrix
+            self._matrix = matrix
+            self._first_free = np.concatenate(
+                [self._first_free, np.zeros(new_rows - rows, dtype=np.int64)]
+            )
+        return row
+
+    def find_free_run(self, equipment_id: str, start: int, length: int,
+                      limit: int) -> Optional[int]:
+        """[start, limit) 범위에서 length개 연속 빈 슬롯의 가장 이른 시작 인덱스"""
+        row = self._row(equipment_id, limit)
+        start = max(start, int(self._first_free[row]))
+        if limit - start < length:
+            return None
+
+        # 창 안의 빈 슬롯 누적합으로 길이 length 구간의 빈 슬롯 수를 한 번에 계산
+        free_count = np.concatenate(([0], np.cumsum(~self._matrix[row, start:limit])))
+        fits = (free_count[length:] - free_count[:-length]) == length
+        first = int(fits.argmax())
+        if not fits[first]:
+            return None
+        return start + first
+
+    def first_free(self, equipment_id: str) -> int:
+        """장비의 가장 이른 빈 슬롯 (이전 슬롯은 모두 점유)"""
+        row = self._rows.get(equipment_id)
+        return 0 if row is None else int(self._first_free[row])
+
+    def is_free(self, equipment_id: str, start: int, length: int) -> bool:
+        """start 부터 length개 슬롯이 모두 비어 있는지 확인"""
+        row = self._row(equipment_id, start + length)
+        return not self._matrix[row, start:start + length].any()
+
+    def occupy(self, equipment_id: str, start: int, length: int):
+        """슬롯 점유 표시"""
+        row = self._row(equipment_id, start + length + 1)
+        self._matrix[row, start:start + length] = True
+
+        first_free = int(self._first_free[row])
+        if start <= first_free:
+            remaining = self._matrix[row, first_free:]
+            if remaining.all():
+                self._row(equipment_id, self._matrix.shape[1] + 1)
+                remaining = self._matrix[row, first_free:]
+            self._first_free[row] = first_free + int(remaining.argmin())
+
+    def release(self, equipment_id: str, start: int, length: int):
+        """슬롯 점유 해제"""
+        row = self._row(equipment_id, start + length)
+        self._matrix[row, start:start + length] = False
+        if start < self._first_free[row]:
+            self._first_free[row] = start
+
+
+class EquipmentPoolIndex:
+    """
+    동일 유형 설비 풀에서 가장 이른 시작이 가능한 설비 선택
+    풀마다 (가장 이른 빈 슬롯, 설비 ID) 최소 힙을 유지 - 가장 이른 빈 슬롯은 시작 가능 시각의 하한이므로
+    하한이 이미 찾은 시작 슬롯 이상인 설비부터는 탐색하지 않음 (풀 전체 선형 탐색 없음)
+    """
+
+    def __init__(self, occupancy, pools: Dict[str, Iterable[str]]):
+        self.occupancy = occupancy
+        self._heaps: Dict[str, list] = {}
+        self._pool_of: Dict[str, str] = {}
+        self._key: Dict[str, int] = {}  # 설비별 힙에 반영된 최신 하한 (이전 항목은 무효)
+        self.search_iterations = 0  # find_free_run 호출(설비 탐색) 누적 횟수
+        for pool, equipment_ids in pools.items():
+            heap = self._heaps[pool] = []
+            for equipment_id in equipment_ids:
+                self._pool_of[equipment_id] = pool
+                self._key[equipment_id] = occupancy.first_free(equipment_id)
+                heap.append((self._key[equipment_id], equipment_id))
+            heapq.heapify(heap)
+
+    def find_earliest(self, pool: str, start: int, length: int,
+                      limit: int) -> Optional[Tuple[str, int]]:
+        """풀에서 [start, limit) 안에 length개 연속 빈 슬롯을 가장 이르게 확보할 수 있는 (설비 ID, 시작 슬롯)"""
+        heap = self._heaps.get(pool)
+        if not heap:
+            return None
+
+        best = None
+        popped = []
+        while heap:
+            bound, equipment_id = heap[0]
+            if bound != self._key[equipment_id]:
+                heapq.heappop(heap)  # 갱신 전 항목
+                continue
+            if best is not None and max(start, bound) >= best[1]:
+                break
+            popped.append(heapq.heappop(heap))
+            self.search_iterations += 1
+            slot = self.occupancy.find_free_run(equipment_id, start, length, limit)
+            if slot is not None and (best is None or slot < best[1]):
+                best = (equipment_id, slot)
+
+        for item in popped:
+            heapq.heappush(heap, item)
+        return best
+
+    def occupy(self, equipment_id: str, start: int, length: int):
+        """슬롯 점유 후 설비의 힙 하한 갱신"""
+        self.occupancy.occupy(equipment_id, start, length)
+        pool = self._pool_of.get(equipment_id)
+        bound = self.occupancy.first_free(equipment_id)
+        if pool is not None and bound != self._key[equipment_id]:
+            self._key[equipment_id] = bound
+            heapq.heappush(self._heaps[pool], (bound, equipment_id))
@@ -0,0 +1,36 @@
+# Fast JSON serialization - compiled encoder (orjson) for batch-heavy responses, stdlib json fallback
+import json
+import os
+from datetime import date, datetime
+from typing import Any
+
+from fastapi.responses import Response
+
+try:
+    import orjson
+except ImportError:  # optional dependency
+    orjson = None
+
+# Opt-in: serve schedule/batch endpoints through the fast path (same wire schema)
+FAST_JSON_ENABLED = os.getenv("FAST_JSON_RESPONSES", "").lower() in ("1", "true", "yes")
+
+
+def _default(value: Any):
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
+
+
+def dumps(content: Any) -> bytes:
+    """Serialize to compact UTF-8 JSON bytes (datetimes as ISO 8601)"""
+    if orjson is not None:
+        return orjson.dumps(content, option=orjson.OPT_NON_STR_KEYS)
+    return json.dumps(content, ensure_ascii=False, separators=(",", ":"), default=_default).encode("utf-8")
+
+
+class FastJSONResponse(Response):
+    """JSON response rendered directly from dicts/lists, skipping pydantic validation and jsonable_encoder"""
+    media_type = "application/json"
+
+    def render(self, content: Any) -> bytes:
+        return dumps(content)
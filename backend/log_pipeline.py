@@ -0,0 +1,214 @@
+# Log pipeline - 요청 스레드는 로그 레코드를 큐에 넣기만 하고, 리스너 스레드가 포맷/기록
+import atexit
+import contextvars
+import logging
+import os
+import queue
+import sys
+import threading
+import time
+import uuid
+from logging.handlers import QueueHandler, QueueListener, RotatingFileHandler
+from pathlib import Path
+from typing import Dict, Optional
+
+from fast_json import dumps
+
+LOG_FORMAT = os.getenv("LOG_FORMAT", "text")  # "text" 또는 "json" (한 줄에 JSON 객체 하나)
+LOG_QUEUE_SIZE = int(os.getenv("LOG_QUEUE_SIZE", 10000))  # 리스너 대기 레코드 수 - 넘으면 버림
+LOG_MAX_BYTES = int(os.getenv("LOG_MAX_BYTES", 10 * 1024 * 1024))
+LOG_ROTATE_SECONDS = float(os.getenv("LOG_ROTATE_SECONDS", 24 * 3600))
+LOG_BACKUP_COUNT = int(os.getenv("LOG_BACKUP_COUNT", 7))
+
+TEXT_FORMAT = '%(asctime)s [%(levelname)s] %(message)s'
+
+# 현재 태스크/스레드에서 처리 중인 요청의 (요청 ID, ASGI scope)
+_request_context: contextvars.ContextVar = contextvars.ContextVar("request_context", default=None)
+
+
+def _route(scope) -> str:
+    """라우팅 후에는 경로 템플릿(/api/batches/{batch_id}), 그 전에는 요청 경로 그대로"""
+    route = scope.get("route")
+    return getattr(route, "path", None) or scope.get("path", "")
+
+
+class RequestContextFilter(logging.Filter):
+    """로그를 남기는 스레드에서 레코드에 request_id/route 기록 (리스너 스레드에서는 컨텍스트 변수를 볼 수 없음)"""
+
+    def filter(self, record):
+        context = _request_context.get()
+        if context is not None:
+            if not hasattr(record, "request_id"):
+                record.request_id = context[0]
+            if not hasattr(record, "route"):
+                record.route = _route(context[1])
+        return True
+
+
+class DroppingQueueHandler(QueueHandler):
+    """
+    호출자를 막지 않는 큐 핸들러 - 큐가 가득 차면 레코드를 버리고 건수를 셈
+    다음에 들어가는 레코드 앞에 그동안 버린 건수를 경고로 남김
+    """
+
+    def __init__(self, log_queue: queue.Queue):
+        super().__init__(log_queue)
+        self.dropped = 0
+        self._unreported = 0
+        self._lock = threading.Lock()
+
+    def enqueue(self, record):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            with self._lock:
+                self.dropped += 1
+                self._unreported += 1
+            return
+        if self._unreported:
+            with self._lock:
+                unreported, self._unreported = self._unreported, 0
+            if unreported:
+                warning = logging.LogRecord(__name__, logging.WARNING, __file__, 0,
+                                            "Dropped %d log records (log queue full)", (unreported,), None)
+                try:
+                    self.queue.put_nowait(self.prepare(warning))
+                except queue.Full:
+                    with self._lock:
+                        self._unreported += unreported
+
+
+class JsonLinesFormatter(logging.Formatter):
+    """한 줄에 JSON 객체 하나 - ts, level, logger, message 와 (있으면) request_id/route/status/latency_ms"""
+
+    EXTRA_FIELDS = ("request_id", "route", "method", "status", "latency_ms")
+
+    def format(self, record):
+        entry = {
+            "ts": self.formatTime(record),
+            "level": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage(),
+        }
+        for field in self.EXTRA_FIELDS:
+            value = getattr(record, field, None)
+            if value is not None:
+                entry[field] = value
+        if record.exc_info:
+            entry["exc"] = self.formatException(record.exc_info)
+        return dumps(entry).decode()
+
+    def formatTime(self, record, datefmt=None):
+        return time.strftime("%Y-%m-%dT%H:%M:%S", time.localtime(record.created)) + f".{int(record.msecs):03d}"
+
+
+class SizeTimeRotatingFileHandler(RotatingFileHandler):
+    """파일이 max_bytes 를 넘거나 rotate_seconds 가 지나면 교체, 이전 파일은 backup_count 개 보관"""
+
+    def __init__(self, filename, max_bytes: int = LOG_MAX_BYTES, rotate_seconds: float = LOG_ROTATE_SECONDS,
+                 backup_count: int = LOG_BACKUP_COUNT, encoding: str = "utf-8"):
+        super().__init__(filename, maxBytes=max_bytes, backupCount=backup_count, encoding=encoding)
+        self.rotate_seconds = rotate_seconds
+        self.rollover_at = time.time() + rotate_seconds
+
+    def shouldRollover(self, record):
+        if self.rotate_seconds > 0 and time.time() >= self.rollover_at:
+            return True
+        return super().shouldRollover(record)
+
+    def doRollover(self):
+        super().doRollover()
+        self.rollover_at = time.time() + self.rotate_seconds
+
+
+class LogPipeline:
+    """setup_logging() 이 루트 로거에 설치한 큐 + 리스너"""
+
+    def __init__(self, handler: DroppingQueueHandler, listener: QueueListener):
+        self.handler = handler
+        self.listener = listener
+        self._stopped = False
+
+    def stats(self) -> Dict[str, int]:
+        return {"queued": self.handler.queue.qsize(), "dropped": self.handler.dropped}
+
+    def stop(self):
+        """큐에 남은 레코드를 기록하고 리스너 스레드 종료 (여러 번 호출해도 안전)"""
+        if not self._stopped:
+            self._stopped = True
+            self.listener.stop()
+
+
+def setup_logging(log_file: Optional[Path] = None, json_format: Optional[bool] = None,
+                  level: int = logging.INFO, queue_size: int = LOG_QUEUE_SIZE,
+                  max_bytes: int = LOG_MAX_BYTES, rotate_seconds: float = LOG_ROTATE_SECONDS,
+                  backup_count: int = LOG_BACKUP_COUNT, stream=sys.stderr) -> LogPipeline:
+    """루트 로거 핸들러를 논블로킹 큐로 교체 - 파일/스트림 핸들러는 리스너 스레드에서 실행"""
+    if json_format is None:
+        json_format = LOG_FORMAT == "json"
+    formatter = JsonLinesFormatter() if json_format else logging.Formatter(TEXT_FORMAT)
+
+    handlers = []
+    if log_file is not None:
+        handlers.append(SizeTimeRotatingFileHandler(log_file, max_bytes, rotate_seconds, backup_count))
+    if stream is not None:
+        handlers.append(logging.StreamHandler(stream))
+    for handler in handlers:
+        handler.setFormatter(formatter)
+
+    queue_handler = DroppingQueueHandler(queue.Queue(maxsize=queue_size))
+    queue_handler.addFilter(RequestContextFilter())
+    listener = QueueListener(queue_handler.queue, *handlers, respect_handler_level=True)
+
+    root = logging.getLogger()
+    for existing in list(root.handlers):
+        root.removeHandler(existing)
+        existing.close()
+    root.addHandler(queue_handler)
+    root.setLevel(level)
+
+    listener.start()
+    pipeline = LogPipeline(queue_handler, listener)
+    atexit.register(pipeline.stop)
+    return pipeline
+
+
+class RequestLogMiddleware:
+    """
+    ASGI 미들웨어 - 요청 ID(X-Request-ID 헤더 또는 새로 발급, 응답 헤더로 반환)를 요청 처리 중 남기는
+    로그 레코드에 연결하고, 끝나면 지연 시간을 포함한 접근 로그 한 건을 기록
+    """
+
+    def __init__(self, app, logger_name: str = "access"):
+        self.app = app
+        self.logger = logging.getLogger(logger_name)
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        request_id = None
+        for name, value in scope.get("headers", ()):
+            if name == b"x-request-id":
+                request_id = value.decode("latin-1")[:64]
+                break
+        request_id = request_id or uuid.uuid4().hex
+        token = _request_context.set((request_id, scope))
+        status = 500
+        started = time.perf_counter()
+
+        async def send_with_request_id(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+                message["headers"] = list(message.get("headers", [])) + [(b"x-request-id", request_id.encode("latin-1"))]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_request_id)
+        finally:
+            latency_ms = round((time.perf_counter() - started) * 1000, 3)
+            self.logger.info("%s %s %d %.1fms", scope["method"], scope["path"], status, latency_ms,
+                             extra={"method": scope["method"], "status": status, "latency_ms": latency_ms})
+            _request_context.reset(token)
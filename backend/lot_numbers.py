@@ -0,0 +1,118 @@
+# Lot numbers - (제품코드, 일자)별 로트 순번을 카운터 테이블에서 블록 단위로 원자적으로 예약
+import threading
+from datetime import date, datetime
+from typing import Dict, Iterable, Optional, Tuple, Union
+
+from sqlalchemy import bindparam, select, tuple_
+from sqlalchemy.engine import Engine
+from sqlalchemy.exc import IntegrityError, OperationalError
+
+from models import LotSequence
+
+LotKey = Tuple[str, str]  # (제품코드, YYYYMMDD)
+
+MAX_RETRIES = 5        # 동시 생성기와 같은 키를 처음 INSERT 하다 충돌한 경우 등 재시도 횟수
+KEY_CHUNK_SIZE = 500   # 한 번의 IN 조회에 넣는 키 수 (바인드 파라미터 한도)
+
+
+def lot_key(product_code: str, day: Union[date, datetime]) -> LotKey:
+    return product_code, day.strftime('%Y%m%d')
+
+
+def format_lot_number(key: LotKey, sequence: int) -> str:
+    product_code, day = key
+    return f"LOT-{product_code}-{day}-{sequence:03d}"
+
+
+class LotNumberAllocator:
+    """
+    로트 순번 할당기
+    - reserve: 키별 필요 수량을 한 트랜잭션에서 한꺼번에 예약 (키 수와 무관하게 UPDATE/SELECT/INSERT 몇 회)
+    - allocate: 1건씩 할당, 키별로 block_size 만큼 미리 예약해 두고 소진 시 다시 예약
+    카운터 증가는 UPDATE ... SET next_value = next_value + n 으로 행(SQLite 는 DB) 쓰기 잠금을 잡은 채 수행하므로
+    여러 프로세스/스레드의 생성기가 동시에 예약해도 구간이 겹치지 않음. 예약 후 쓰지 않은 번호는 비어 있는 채로 남음.
+    engine 이 없으면 (DB 없는 시나리오 실행 등) 인스턴스 안에서만 유일한 메모리 카운터 사용.
+    """
+
+    def __init__(self, engine: Optional[Engine] = None, block_size: int = 100):
+        if block_size < 1:
+            raise ValueError("block_size must be positive")
+        self.engine = engine
+        self.block_size = block_size
+        self._blocks: Dict[LotKey, Tuple[int, int]] = {}  # 키 → [다음 번호, 예약 끝)
+        self._memory: Dict[LotKey, int] = {}
+        self._lock = threading.Lock()
+        self.round_trips = 0  # 예약 트랜잭션 수
+
+    def allocate(self, product_code: str, day: Union[date, datetime]) -> str:
+        """로트 번호 1건"""
+        key = lot_key(product_code, day)
+        with self._lock:
+            next_value, end = self._blocks.get(key, (0, 0))
+            if next_value >= end:
+                next_value = self._reserve({key: self.block_size})[key]
+                end = next_value + self.block_size
+            self._blocks[key] = (next_value + 1, end)
+        return format_lot_number(key, next_value)
+
+    def reserve(self, demand: Dict[LotKey, int]) -> Dict[LotKey, int]:
+        """키별 count 개 연속 순번 예약 → 키별 첫 순번"""
+        demand = {key: count for key, count in demand.items() if count > 0}
+        if not demand:
+            return {}
+        with self._lock:
+            return self._reserve(demand)
+
+    def _reserve(self, demand: Dict[LotKey, int]) -> Dict[LotKey, int]:
+        if self.engine is None:
+            first = {}
+            for key, count in demand.items():
+                first[key] = self._memory.get(key, 1)
+                self._memory[key] = first[key] + count
+            return first
+
+        for attempt in range(MAX_RETRIES):
+            try:
+                return self._reserve_in_db(demand)
+            except (IntegrityError, OperationalError):
+                if attempt == MAX_RETRIES - 1:
+                    raise
+        raise RuntimeError("unreachable")
+
+    def _reserve_in_db(self, demand: Dict[LotKey, int]) -> Dict[LotKey, int]:
+        table = LotSequence.__table__
+        now = datetime.utcnow()
+        self.round_trips += 1
+        # 생성기 세션과 별도 연결/트랜잭션 - 예약은 배치 저장 성공 여부와 무관하게 확정
+        with self.engine.begin() as connection:
+            # 1) 기존 키 증가 (쓰기 잠금 획득)
+            connection.execute(
+                table.update()
+                .where(table.c.product_code == bindparam('key_code'), table.c.lot_date == bindparam('key_date'))
+                .values(next_value=table.c.next_value + bindparam('count'), updated_at=now),
+                [{'key_code': code, 'key_date': day, 'count': count} for (code, day), count in demand.items()]
+            )
+            # 2) 증가된 값 조회 - 없는 키는 새로 INSERT (동시에 같은 키를 INSERT 하면 IntegrityError → 재시도)
+            current = dict(self._select(connection, demand))
+            missing = [key for key in demand if key not in current]
+            if missing:
+                connection.execute(table.insert(), [
+                    {'product_code': code, 'lot_date': day, 'next_value': 1 + demand[(code, day)], 'updated_at': now}
+                    for code, day in missing
+                ])
+        first = {key: next_value - demand[key] for key, next_value in current.items()}
+        first.update({key: 1 for key in missing})
+        return first
+
+    @staticmethod
+    def _select(connection, keys: Iterable[LotKey]):
+        table = LotSequence.__table__
+        keys = list(keys)
+        for index in range(0, len(keys), KEY_CHUNK_SIZE):
+            chunk = keys[index:index + KEY_CHUNK_SIZE]
+            rows = connection.execute(
+                select(table.c.product_code, table.c.lot_date, table.c.next_value)
+                .where(tuple_(table.c.product_code, table.c.lot_date).in_(chunk))
+            )
+            for code, day, next_value in rows:
+                yield (code, day), next_value
@@ -1,23 +1,57 @@
 # FastAPI Backend for APS System
-from fastapi import FastAPI, File, UploadFile, HTTPException
+from fastapi import (
+    FastAPI, File, UploadFile, HTTPException, Depends, Query, Request, Response, WebSocket, WebSocketDisconnect
+)
+from fastapi.concurrency import run_in_threadpool
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import FileResponse
+from fastapi.responses import StreamingResponse
 from pydantic import BaseModel
 from typing import List, Optional, Dict
 from datetime import datetime, timedelta
+from sqlalchemy import update
+from sqlalchemy.orm import Session
+from contextlib import asynccontextmanager
 import uvicorn
-import pandas as pd
 import json
 import os
+import threading
+import zipfile
 from pathlib import Path
 
+from database import ReadOnlySessionLocal, SessionLocal, engine, get_db, get_read_db
+import models
+from analytics_service import utilization_series
+from versioning import etag_matches, versions
+from scenario_service import MasterDataSnapshot, ScenarioVariant, run_scenarios
+from fast_json import FAST_JSON_ENABLED, FastJSONResponse
+from schemas import BatchSchedule, ScheduleResponse
+from master_data import MasterDataCache
+from metrics import CONTENT_TYPE, MetricsMiddleware, metrics
+from schedule_jobs import GenerationJobQueue, JobConflict, JobQueueFull
+from schedule_events import CREATED, DELETED, UPDATED, BatchDelta, batch_fields, broadcaster, parse_filter
+from sales_plan_import import SalesPlanImportError, file_kind, import_sales_plan_file, spool_upload
+from schedule_queries import (
+    MAX_BATCH_DURATION, fetch_schedule_page, iter_schedule_ndjson, schedule_row_dict, schedule_summary
+)
+from schedule_export import EXPORT_FORMATS, check_format, export_filename, iter_export, iter_export_rows
+from schedule_repair import (
+    BatchTimeline, TimelineEntry, parse_move_request, repair_after_move, repair_after_delete
+)
+
 # Import scheduling logic from original APS
 import sys
 sys.path.append(str(Path(__file__).parent.parent.parent / "NEW_APS"))
 from app.core.scheduler import Scheduler
 from app.core.data_manager import DataManager
 
-app = FastAPI(title="APS Scheduling API", version="1.0.0")
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    broadcaster.start()
+    yield
+    generation_jobs.shutdown(wait=False)
+    await broadcaster.stop()
+
+app = FastAPI(title="APS Scheduling API", version="1.0.0", lifespan=lifespan)
 
 # CORS configuration
 app.add_middleware(
@@ -28,6 +62,9 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# Per-route latency/size histograms and in-flight gauge (outermost, so CORS time is included)
+app.add_middleware(MetricsMiddleware, registry=metrics)
+
 # Data models
 class Product(BaseModel):
     id: str
@@ -41,21 +78,30 @@ class Equipment(BaseModel):
     type: str
     capacity: Optional[int] = None
 
-class BatchSchedule(BaseModel):
-    id: str
-    product_id: str
-    product_name: str
-    equipment_id: str
-    process_name: str
-    start_time: datetime
-    end_time: datetime
-    lot_number: str
-    quantity: Optional[int] = None
-    status: Optional[str] = "planned"
-
-class ScheduleResponse(BaseModel):
-    batches: List[BatchSchedule]
-    summary: Dict[str, int]
+class ScenarioVariantRequest(BaseModel):
+    name: str
+    priorities: Dict[str, int] = {}
+    search_days: Optional[int] = None
+    unavailable_equipment: List[str] = []
+    engine: Optional[str] = None
+
+class GenerateRequest(BaseModel):
+    year: Optional[int] = None
+    month: Optional[int] = None
+    engine: Optional[str] = None
+    search_days: Optional[int] = None
+
+class ScenarioRequest(BaseModel):
+    year: int
+    month: int
+    variants: List[ScenarioVariantRequest]
+    max_workers: Optional[int] = None
+
+# Data versions come from the database so every worker issues the same ETags
+versions.bind(engine)
+
+# Master data (products/equipment/routing) shared by API reads and scheduling
+master_data = MasterDataCache(ReadOnlySessionLocal)
 
 # Initialize data manager and scheduler
 data_manager = DataManager()
@@ -65,143 +111,447 @@ scheduler = Scheduler()
 def read_root():
     return {"message": "APS Scheduling API", "version": "1.0.0"}
 
+@app.get("/metrics", include_in_schema=False)
+async def get_metrics():
+    """Prometheus text exposition of HTTP and scheduler metrics"""
+    return Response(content=metrics.render(), media_type=CONTENT_TYPE)
+
+def request_etag(request: Request, *kinds: str) -> str:
+    """ETag from the current data versions plus the path and normalized query string"""
+    query = "&".join(sorted(f"{k}={v}" for k, v in request.query_params.multi_items()))
+    return versions.etag(kinds, f"{request.url.path}?{query}")
+
+def not_modified(request: Request, response: Response, etag: str) -> Optional[Response]:
+    """304 response if If-None-Match matches (no DB access); otherwise tag the outgoing response"""
+    headers = {"ETag": etag, "Cache-Control": "no-cache"}
+    if etag_matches(request.headers.get("if-none-match"), etag):
+        return Response(status_code=304, headers=headers)
+    response.headers.update(headers)
+    return None
+
+def master_data_response(request: Request, kind: str) -> Response:
+    """Serve a master data list from the cache's pre-serialized bytes (304 if the client copy is current)"""
+    entry = master_data.entry(kind)  # (re)load first - a reload with changed content bumps the master version
+    etag = request_etag(request, "master")
+    headers = {"ETag": etag, "Cache-Control": "no-cache"}
+    if etag_matches(request.headers.get("if-none-match"), etag):
+        return Response(status_code=304, headers=headers)
+    return Response(content=entry.body, media_type="application/json", headers=headers)
+
 @app.get("/api/equipment", response_model=List[Equipment])
-async def get_equipment():
+def get_equipment(request: Request):
     """Get all equipment list"""
-    equipment_data = [
-        Equipment(id="EQ001", name="혼합기 1호", type="mixer"),
-        Equipment(id="EQ002", name="혼합기 2호", type="mixer"),
-        Equipment(id="EQ003", name="타정기 1호", type="tablet_press"),
-        Equipment(id="EQ004", name="타정기 2호", type="tablet_press"),
-        Equipment(id="EQ005", name="코팅기 1호", type="coating"),
-        Equipment(id="EQ006", name="코팅기 2호", type="coating"),
-        Equipment(id="EQ007", name="포장기 1호", type="packaging"),
-        Equipment(id="EQ008", name="포장기 2호", type="packaging")
-    ]
-    return equipment_data
+    return master_data_response(request, "equipment")
 
 @app.get("/api/products", response_model=List[Product])
-async def get_products():
-    """Get all products list"""
-    products_data = [
-        Product(id="500002", name="기넥신에프정 40mg 100T", code="GNX40-100"),
-        Product(id="500005", name="기넥신에프정 40mg 300T", code="GNX40-300"),
-        Product(id="500008", name="기넥신에프정 80mg 100T", code="GNX80-100"),
-        Product(id="505227", name="기넥신에프정 80mg 500T", code="GNX80-500"),
-        Product(id="500023", name="리넥신정", code="LNX"),
-        Product(id="500041", name="조인스정", code="JNS"),
-        Product(id="507123", name="페브릭정 40mg", code="FBR40"),
-        Product(id="507242", name="신플랙스세이프정", code="SFS")
-    ]
-    return products_data
+def get_products(request: Request):
+    """Get all active products list"""
+    return master_data_response(request, "products")
+
+@app.post("/api/master-data/refresh")
+def refresh_master_data():
+    """Drop cached master data (e.g. after editing the tables outside this process)"""
+    master_data.invalidate()
+    return {"success": True}
 
 @app.get("/api/schedule", response_model=ScheduleResponse)
-async def get_schedule():
-    """Get current schedule"""
-    # TODO: Load from database
-    # For now, return sample data
-    sample_batches = [
-        BatchSchedule(
-            id="BATCH001",
-            product_id="500002",
-            product_name="기넥신에프정 40mg 100T",
-            equipment_id="EQ001",
-            process_name="혼합",
-            start_time=datetime.now(),
-            end_time=datetime.now() + timedelta(hours=2),
-            lot_number="LOT20240101001",
-            quantity=1000
-        )
-    ]
+def get_schedule(request: Request, response: Response,
+                 start: Optional[datetime] = None, end: Optional[datetime] = None,
+                 equipment_id: Optional[List[str]] = Query(None), product_id: Optional[str] = None,
+                 limit: int = Query(1000, ge=1, le=10000), cursor: Optional[str] = None,
+                 db: Session = Depends(get_read_db)):
+    """Get batches overlapping [start, end), optionally filtered by equipment/product, one keyset page at a time"""
+    cached = not_modified(request, response, request_etag(request, "schedule", "master"))
+    if cached:
+        return cached
     
-    summary = {
-        "total_batches": len(sample_batches),
-        "total_products": 1,
-        "total_equipment": 1
-    }
+    try:
+        rows, next_cursor = fetch_schedule_page(db, start, end, equipment_id, product_id, limit, cursor)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    
+    summary = schedule_summary(rows)
+    if FAST_JSON_ENABLED:
+        # Same wire schema, serialized straight from the rows
+        return FastJSONResponse({
+            "batches": [schedule_row_dict(row) for row in rows],
+            "summary": summary,
+            "next_cursor": next_cursor
+        }, headers=dict(response.headers))
     
-    return ScheduleResponse(batches=sample_batches, summary=summary)
+    batches = [BatchSchedule(**schedule_row_dict(row)) for row in rows]
+    return ScheduleResponse(batches=batches, summary=summary, next_cursor=next_cursor)
 
-@app.post("/api/upload/sales-plan")
-async def upload_sales_plan(file: UploadFile = File(...)):
-    """Upload sales plan Excel file"""
-    if not file.filename.endswith(('.xlsx', '.xls')):
-        raise HTTPException(status_code=400, detail="Only Excel files are allowed")
+@app.get("/api/schedule/stream")
+def stream_schedule(request: Request, start: Optional[datetime] = None, end: Optional[datetime] = None,
+                    equipment_id: Optional[List[str]] = Query(None), product_id: Optional[str] = None):
+    """Stream batches as NDJSON (one batch per line, summary object last) from a server-side cursor"""
+    etag = request_etag(request, "schedule", "master")
+    headers = {"ETag": etag, "Cache-Control": "no-cache"}
+    if etag_matches(request.headers.get("if-none-match"), etag):
+        return Response(status_code=304, headers=headers)
     
-    # Save file temporarily
-    temp_path = f"temp_{file.filename}"
-    with open(temp_path, "wb") as buffer:
-        content = await file.read()
-        buffer.write(content)
+    def generate():
+        # The session lives as long as the stream, not the request handler
+        db = ReadOnlySessionLocal()
+        try:
+            yield from iter_schedule_ndjson(db, start, end, equipment_id, product_id)
+        finally:
+            db.rollback()
+            db.close()
     
+    return StreamingResponse(generate(), media_type="application/x-ndjson", headers=headers)
+
+@app.get("/api/analytics/utilization")
+def get_utilization(request: Request, response: Response, bucket: str = "day",
+                    start: Optional[datetime] = None, end: Optional[datetime] = None,
+                    db: Session = Depends(get_read_db)):
+    """Utilization time series (percent per shift/day/week) per equipment and equipment type"""
+    if bucket not in ("shift", "day", "week"):
+        raise HTTPException(status_code=400, detail="bucket must be one of shift, day, week")
+    cached = not_modified(request, response, request_etag(request, "schedule", "master"))
+    if cached:
+        return cached
+    
+    query = db.query(models.Batch.equipment_id, models.Batch.start_time, models.Batch.end_time)
+    if start is not None:
+        query = query.filter(models.Batch.end_time > start)
+    if end is not None:
+        query = query.filter(models.Batch.start_time < end)
+    rows = query.all()
+    equipment_types = dict(db.query(models.Equipment.id, models.Equipment.type).all())
+    
+    return utilization_series(
+        [row.equipment_id for row in rows],
+        [row.start_time for row in rows],
+        [row.end_time for row in rows],
+        bucket=bucket,
+        equipment_types=equipment_types,
+        start=start,
+        end=end
+    )
+
+@app.post("/api/upload/sales-plan")
+async def upload_sales_plan(file: UploadFile = File(...)):
+    """
+    Upload a sales plan (.xlsx, .xls, .csv or .parquet; .xls is read whole, not streamed)
+    The upload is spooled to a private temp file in chunks; parsing, validation and the
+    bulk insert run in a worker thread so large files do not block other requests.
+    """
     try:
-        # Read Excel file
-        df = pd.read_excel(temp_path)
-        
-        # Process sales plan
-        # TODO: Implement actual processing logic
-        
-        # Clean up
-        os.remove(temp_path)
-        
-        return {"success": True, "message": "Sales plan uploaded successfully", "rows": len(df)}
-    except Exception as e:
-        if os.path.exists(temp_path):
-            os.remove(temp_path)
-        raise HTTPException(status_code=500, detail=str(e))
+        kind = file_kind(file.filename)
+    except SalesPlanImportError as e:
+        raise HTTPException(status_code=400, detail=str(e))
 
-@app.post("/api/schedule/generate")
-async def generate_schedule(sales_data: Optional[dict] = None):
-    """Generate production schedule from sales plan"""
+    temp_path = await spool_upload(file)
     try:
-        # TODO: Implement actual scheduling logic using the Scheduler class
-        # For now, return success message
-        return {
-            "success": True,
-            "message": "Schedule generated successfully",
-            "batches_created": 10
-        }
+        result = await run_in_threadpool(_import_sales_plan_file, temp_path, kind)
+    except (SalesPlanImportError, UnicodeDecodeError, zipfile.BadZipFile) as e:
+        raise HTTPException(status_code=400, detail=f"Invalid sales plan file: {e}")
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
+    finally:
+        os.remove(temp_path)
+
+    return {
+        "success": True,
+        "message": f"Imported {result['imported']} of {result['total_rows']} sales plan rows",
+        "rows": result['imported'],
+        **result
+    }
+
+
+def _import_sales_plan_file(path: str, kind: str) -> Dict:
+    db = SessionLocal()
+    try:
+        return import_sales_plan_file(db, path, kind)
+    finally:
+        db.close()
+
+@app.post("/api/schedule/generate", status_code=202)
+async def generate_schedule(request: Optional[GenerateRequest] = None):
+    """
+    Queue a schedule generation job and return its id immediately
+    Without year/month every sales plan is scheduled. Poll /api/schedule/jobs/{job_id} for progress.
+    """
+    request = request or GenerateRequest()
+    if (request.year is None) != (request.month is None):
+        raise HTTPException(status_code=400, detail="year and month must be given together")
+    try:
+        job = generation_jobs.submit(request.year, request.month, request.engine, request.search_days)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except JobQueueFull as e:
+        raise HTTPException(status_code=429, detail=str(e), headers={"Retry-After": "5"})
+    except JobConflict as e:
+        raise HTTPException(status_code=409, detail={"message": str(e), "job_id": e.job.id,
+                                                     "status_url": f"/api/schedule/jobs/{e.job.id}"})
+    
+    return {
+        "success": True,
+        "message": "Schedule generation queued",
+        "job_id": job.id,
+        "status": job.status,
+        "status_url": f"/api/schedule/jobs/{job.id}"
+    }
+
+@app.get("/api/schedule/jobs/{job_id}")
+async def get_generation_job(job_id: str):
+    """Schedule generation job status and progress (plans processed, batches placed)"""
+    job = generation_jobs.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return job.to_dict()
+
+@app.post("/api/schedule/jobs/{job_id}/cancel", status_code=202)
+async def cancel_generation_job(job_id: str):
+    """Request cancellation; a running job stops at the next sales plan and saves nothing"""
+    job = generation_jobs.cancel(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return job.to_dict()
+
+@app.post("/api/schedule/scenarios")
+def compare_scenarios(request: ScenarioRequest, db: Session = Depends(get_db)):
+    """Run what-if scheduling scenarios in parallel and return KPIs side by side"""
+    sales_plans = db.query(models.SalesPlan).filter_by(year=request.year, month=request.month).all()
+    if not sales_plans:
+        raise HTTPException(status_code=404, detail="No sales plans for the requested month")
+    
+    snapshot = MasterDataSnapshot.from_db(db, sales_plans, routing=master_data.routing())
+    variants = [
+        ScenarioVariant(
+            name=v.name,
+            priorities=v.priorities,
+            search_days=v.search_days,
+            unavailable_equipment=frozenset(v.unavailable_equipment),
+            engine=v.engine
+        )
+        for v in request.variants
+    ]
+    
+    try:
+        results = run_scenarios(snapshot, variants, request.max_workers)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    
+    return {"plans": len(snapshot.plans), "scenarios": results}
+
+# Per-process batch timeline for incremental repair (loaded from the DB on first edit)
+# It is tagged with the schedule data version it reflects and reloaded when another worker (or any
+# write not made through commit_schedule_edit) changed the batches.
+# Edit endpoints run in the threadpool - the lock serializes each repair with its commit
+schedule_timeline: Optional[BatchTimeline] = None
+schedule_timeline_version: Optional[tuple] = None
+schedule_timeline_lock = threading.RLock()
+
+def get_schedule_timeline(db: Session) -> BatchTimeline:
+    """Return the cached batch timeline, reloading it with a single column query if the schedule version moved"""
+    global schedule_timeline, schedule_timeline_version
+    current = versions.read(db, "schedule")
+    if schedule_timeline is None or current != schedule_timeline_version:
+        rows = db.query(
+            models.Batch.id,
+            models.Batch.equipment_id,
+            models.Batch.start_time,
+            models.Batch.end_time,
+            models.Batch.sales_plan_id,
+            models.Batch.sequence
+        )
+        schedule_timeline = BatchTimeline(TimelineEntry(*row) for row in rows)
+        schedule_timeline_version = current
+    return schedule_timeline
+
+def commit_schedule_edit(db: Session):
+    """Commit an edit mirrored in the cached timeline; keep the timeline only if no other write came in between"""
+    global schedule_timeline, schedule_timeline_version
+    bumped = db.info.get('_version_bumped', {}).get("schedule")
+    db.commit()
+    if schedule_timeline is None or bumped is None:
+        return
+    epoch, version = schedule_timeline_version or (None, 0)
+    if bumped == (epoch, version + 1):
+        schedule_timeline_version = bumped
+    else:
+        schedule_timeline = None
+
+def invalidate_schedule_timeline():
+    """Drop the cached timeline so the next edit reloads it from the DB"""
+    global schedule_timeline
+    with schedule_timeline_lock:
+        schedule_timeline = None
+
+def on_schedule_generated(job, batches, replaced):
+    """Runs in the job worker thread after a generation job saved its batches"""
+    invalidate_schedule_timeline()
+    if not broadcaster.active:
+        return
+    product_names = master_data.product_names()
+    broadcaster.publish(
+        [BatchDelta(DELETED, row.id, locations=((row.equipment_id, row.start_time, row.end_time),))
+         for row in replaced] +
+        [BatchDelta(CREATED, batch.id, batch_fields(batch, product_names.get(batch.product_id)),
+                    ((batch.equipment_id, batch.start_time, batch.end_time),))
+         for batch in batches]
+    )
+
+def record_generation_job(job):
+    """Count finished jobs and add their SchedulerService.run_stats to the scheduler counters"""
+    metrics.record_generation(job.status, job.service.run_stats if job.service is not None else None)
+
+# Background schedule generation (bounded worker pool, see schedule_jobs.py)
+generation_jobs = GenerationJobQueue(SessionLocal, on_success=on_schedule_generated, master_data=master_data,
+                                     on_finish=record_generation_job)
+metrics.add_collector(lambda: [
+    ("aps_schedule_jobs_active", "gauge", "Schedule generation jobs queued or running",
+     [({}, generation_jobs.active_count())]),
+])
 
 @app.put("/api/batches/{batch_id}")
-async def update_batch(batch_id: str, batch_data: dict):
-    """Update batch schedule"""
-    # TODO: Implement database update
-    return {"success": True, "message": f"Batch {batch_id} updated successfully"}
+def update_batch(batch_id: str, batch_data: dict, db: Session = Depends(get_db)):
+    """Update batch schedule and repair only the affected equipment timelines and lot steps"""
+    batch = db.get(models.Batch, batch_id)
+    if batch is None:
+        raise HTTPException(status_code=404, detail="Batch not found")
+    
+    try:
+        start, end, equipment_id = parse_move_request(
+            batch_data, batch.start_time, batch.end_time, batch.equipment_id
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    if end - start > MAX_BATCH_DURATION:
+        raise HTTPException(status_code=400, detail=f"Batch cannot be longer than {MAX_BATCH_DURATION}")
+    
+    edited = {field: batch_data[field] for field in ("quantity", "status", "notes", "process_name")
+              if field in batch_data}
+    for field, value in edited.items():
+        setattr(batch, field, value)
+    location = (batch.equipment_id, batch.start_time, batch.end_time)
+    
+    changed = []
+    previous = {batch_id: location}
+    try:
+        with schedule_timeline_lock:
+            if (start, end, equipment_id) != (batch.start_time, batch.end_time, batch.equipment_id):
+                timeline = get_schedule_timeline(db)
+                changed = repair_after_move(timeline, batch_id, start, end, equipment_id)
+                if broadcaster.active:
+                    # Old positions, so subscribers whose window a batch left are told too
+                    previous = {row.id: (row.equipment_id, row.start_time, row.end_time) for row in db.query(
+                        models.Batch.id, models.Batch.equipment_id, models.Batch.start_time, models.Batch.end_time
+                    ).filter(models.Batch.id.in_([e.id for e in changed]))}
+                db.execute(update(models.Batch), [
+                    {"id": e.id, "start_time": e.start, "end_time": e.end, "equipment_id": e.equipment_id}
+                    for e in changed
+                ])
+            commit_schedule_edit(db)
+    except Exception:
+        db.rollback()
+        invalidate_schedule_timeline()
+        raise
+    
+    deltas = {e.id: BatchDelta(UPDATED, e.id,
+                               {"equipment_id": e.equipment_id, "start_time": e.start, "end_time": e.end},
+                               tuple(filter(None, (previous.get(e.id), (e.equipment_id, e.start, e.end)))))
+              for e in changed}
+    if edited:
+        moved = deltas.get(batch_id)
+        deltas[batch_id] = BatchDelta(UPDATED, batch_id, {**(moved.fields if moved else {}), **edited},
+                                      moved.locations if moved else (location,))
+    broadcaster.publish(deltas.values())
+    
+    return {
+        "success": True,
+        "message": f"Batch {batch_id} updated successfully",
+        "changed_batches": [e.to_dict() for e in changed]
+    }
 
 @app.delete("/api/batches/{batch_id}")
-async def delete_batch(batch_id: str):
-    """Delete batch schedule"""
-    # TODO: Implement database delete
-    return {"success": True, "message": f"Batch {batch_id} deleted successfully"}
+def delete_batch(batch_id: str, db: Session = Depends(get_db)):
+    """Delete batch schedule and pull the following batches on its equipment and lot into the freed time"""
+    location = db.query(models.Batch.equipment_id, models.Batch.start_time, models.Batch.end_time).filter_by(
+        id=batch_id
+    ).first()
+    if location is None:
+        raise HTTPException(status_code=404, detail="Batch not found")
+    previous = {}
+    try:
+        with schedule_timeline_lock:
+            timeline = get_schedule_timeline(db)
+            db.query(models.Batch).filter_by(id=batch_id).delete()
+            changed = repair_after_delete(timeline, batch_id)
+            if changed and broadcaster.active:
+                previous = {row.id: (row.equipment_id, row.start_time, row.end_time) for row in db.query(
+                    models.Batch.id, models.Batch.equipment_id, models.Batch.start_time, models.Batch.end_time
+                ).filter(models.Batch.id.in_([e.id for e in changed]))}
+            if changed:
+                db.execute(update(models.Batch), [
+                    {"id": e.id, "start_time": e.start, "end_time": e.end} for e in changed
+                ])
+            commit_schedule_edit(db)
+    except Exception:
+        db.rollback()
+        invalidate_schedule_timeline()
+        raise
+    broadcaster.publish([BatchDelta(DELETED, batch_id, locations=(tuple(location),))] + [
+        BatchDelta(UPDATED, e.id, {"start_time": e.start, "end_time": e.end},
+                   tuple(filter(None, (previous.get(e.id), (e.equipment_id, e.start, e.end)))))
+        for e in changed
+    ])
+    
+    return {
+        "success": True,
+        "message": f"Batch {batch_id} deleted successfully",
+        "deleted": [batch_id],
+        "changed_batches": [e.to_dict() for e in changed]
+    }
+
+@app.websocket("/ws/schedule")
+async def schedule_updates(websocket: WebSocket, start: Optional[str] = None, end: Optional[str] = None,
+                           equipment_id: Optional[List[str]] = Query(None)):
+    """
+    Push coalesced batch deltas: {"type": "batch_deltas", "created": [...], "updated": [...], "deleted": [...]}
+    Filter by equipment and [start, end) via query parameters or a {"type": "subscribe", ...} message.
+    {"type": "resync"} means the client fell behind and should reload its window.
+    """
+    try:
+        subscription = parse_filter(equipment_id, start, end)
+    except ValueError:
+        await websocket.close(code=1008)
+        return
+    await websocket.accept()
+    try:
+        await broadcaster.serve(websocket, subscription)
+    except WebSocketDisconnect:
+        pass
 
 @app.get("/api/export/schedule")
-async def export_schedule(format: str = "excel"):
-    """Export schedule to Excel or CSV"""
-    # TODO: Implement actual export logic
-    # For now, create a sample file
-    if format == "excel":
-        filename = f"schedule_{datetime.now().strftime('%Y%m%d')}.xlsx"
-        # Create sample Excel file
-        df = pd.DataFrame({
-            "Product": ["Sample Product"],
-            "Equipment": ["Equipment 1"],
-            "Start": [datetime.now()],
-            "End": [datetime.now() + timedelta(hours=2)]
-        })
-        df.to_excel(filename, index=False)
-    else:
-        filename = f"schedule_{datetime.now().strftime('%Y%m%d')}.csv"
-        df = pd.DataFrame({
-            "Product": ["Sample Product"],
-            "Equipment": ["Equipment 1"],
-            "Start": [datetime.now()],
-            "End": [datetime.now() + timedelta(hours=2)]
-        })
-        df.to_csv(filename, index=False)
-    
-    return FileResponse(filename, filename=filename)
+async def export_schedule(format: str = "excel", start: Optional[datetime] = None, end: Optional[datetime] = None,
+                          equipment_id: Optional[List[str]] = Query(None), product_id: Optional[str] = None):
+    """
+    Export batches overlapping [start, end) as Excel (xlsx), CSV or Parquet
+    Rows are streamed from a server-side cursor with product/equipment names joined,
+    so memory stays flat regardless of how many batches are exported.
+    Excel output continues on further sheets once a sheet reaches the 1,048,576-row limit.
+    """
+    try:
+        check_format(format)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    
+    def generate():
+        # The session lives as long as the stream, not the request handler
+        db = ReadOnlySessionLocal()
+        try:
+            yield from iter_export(iter_export_rows(db, start, end, equipment_id, product_id), format)
+        finally:
+            db.rollback()
+            db.close()
+    
+    filename = export_filename(format)
+    return StreamingResponse(generate(), media_type=EXPORT_FORMATS[format][1],
+                             headers={"Content-Disposition": f'attachment; filename="{filename}"'})
 
 if __name__ == "__main__":
     uvicorn.run(app, host="0.0.0.0", port=8000)
\ No newline at end of file
@@ -1,5 +1,5 @@
 # Simplified FastAPI Backend for APS System (without heavy dependencies)
-from fastapi import FastAPI, HTTPException
+from fastapi import FastAPI, HTTPException, Query, Response
 from fastapi.middleware.cors import CORSMiddleware
 from pydantic import BaseModel
 from typing import List, Optional, Dict
@@ -8,24 +8,39 @@ import uvicorn
 import json
 import logging
 import os
+from contextlib import asynccontextmanager
 from pathlib import Path
 
+from batch_store import BatchStore
+from database import ReadOnlySessionLocal, engine
+from init_data import init_sample_data
+from log_pipeline import RequestLogMiddleware, setup_logging
+from metrics import CONTENT_TYPE, MetricsMiddleware, metrics
+from master_data import MasterDataCache
+from versioning import versions
+from schedule_repair import (
+    BatchTimeline, TimelineEntry, parse_move_request, repair_after_move, repair_after_delete
+)
+
 # 로그 디렉토리 설정
 log_dir = Path(__file__).parent / 'logs'
 log_dir.mkdir(exist_ok=True)
 
-# 로깅 설정
-logging.basicConfig(
-    level=logging.INFO,
-    format='%(asctime)s [%(levelname)s] %(message)s',
-    handlers=[
-        logging.FileHandler(log_dir / 'api_server.log'),
-        logging.StreamHandler()
-    ]
-)
+# 로깅 설정 - 요청 처리 중에는 큐에 넣기만 하고 파일/콘솔 기록은 리스너 스레드에서
+# (LOG_FORMAT=json 이면 request_id/route/latency_ms 포함 JSON lines, 크기/시간 기준 로테이션)
+log_pipeline = setup_logging(log_dir / 'api_server.log')
 logger = logging.getLogger(__name__)
 
-app = FastAPI(title="APS Scheduling API", version="1.0.0")
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # 테이블 생성 + 비어 있으면 샘플 마스터 데이터 입력
+    init_sample_data()
+    yield
+
+app = FastAPI(title="APS Scheduling API", version="1.0.0", lifespan=lifespan)
+
+# 요청 ID 부여 + 요청별 접근 로그 (지연 시간 포함)
+app.add_middleware(RequestLogMiddleware)
 
 # CORS configuration
 app.add_middleware(
@@ -36,6 +51,15 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# 라우트별 지연 시간/응답 크기 히스토그램 + 처리 중 요청 수 (/metrics)
+app.add_middleware(MetricsMiddleware, registry=metrics)
+metrics.add_collector(lambda: [
+    ("aps_log_records_queued", "gauge", "Log records waiting for the listener thread",
+     [({}, log_pipeline.stats()["queued"])]),
+    ("aps_log_records_dropped_total", "counter", "Log records dropped because the log queue was full",
+     [({}, log_pipeline.stats()["dropped"])]),
+])
+
 # Data models
 class Product(BaseModel):
     id: str
@@ -65,48 +89,62 @@ class ScheduleResponse(BaseModel):
     batches: List[BatchSchedule]
     summary: Dict[str, int]
 
-# In-memory storage (for demo)
-schedules = []
+# 데이터 버전은 DB 에서 읽음 (다른 프로세스의 마스터 데이터 변경도 캐시에 반영)
+versions.bind(engine)
+
+# 마스터 데이터 (DB 조회 결과 캐시)
+master_data = MasterDataCache(ReadOnlySessionLocal)
+
+# In-memory storage (for demo / load testing) - ID/설비/제품 인덱스와 요약 카운터를 함께 유지
+schedules = BatchStore()
+timeline = BatchTimeline()  # 설비/로트별 타임라인 - 증분 재배치용
+
+def _timeline_entry(batch):
+    return TimelineEntry(
+        batch["id"],
+        batch["equipment_id"],
+        datetime.fromisoformat(batch["start_time"]),
+        datetime.fromisoformat(batch["end_time"]),
+        batch.get("sales_plan_id"),
+        batch.get("sequence")
+    )
 
 @app.get("/")
 def read_root():
     logger.info("Root endpoint accessed")
     return {"message": "APS Scheduling API", "version": "1.0.0"}
 
+@app.get("/metrics", include_in_schema=False)
+async def get_metrics():
+    """Prometheus text exposition"""
+    return Response(content=metrics.render(), media_type=CONTENT_TYPE)
+
 @app.get("/api/equipment")
 async def get_equipment():
     """Get all equipment list"""
     logger.info("Equipment list requested")
-    equipment_data = [
-        {"id": "EQ001", "name": "혼합기 1호", "type": "mixer"},
-        {"id": "EQ002", "name": "혼합기 2호", "type": "mixer"},
-        {"id": "EQ003", "name": "타정기 1호", "type": "tablet_press"},
-        {"id": "EQ004", "name": "타정기 2호", "type": "tablet_press"},
-        {"id": "EQ005", "name": "코팅기 1호", "type": "coating"},
-        {"id": "EQ006", "name": "코팅기 2호", "type": "coating"},
-        {"id": "EQ007", "name": "포장기 1호", "type": "packaging"},
-        {"id": "EQ008", "name": "포장기 2호", "type": "packaging"}
-    ]
-    return equipment_data
+    return Response(content=master_data.entry("equipment").body, media_type="application/json")
 
 @app.get("/api/products")
 async def get_products():
     """Get all products list"""
-    products_data = [
-        {"id": "500002", "name": "기넥신에프정 40mg 100T", "code": "GNX40-100"},
-        {"id": "500005", "name": "기넥신에프정 40mg 300T", "code": "GNX40-300"},
-        {"id": "500008", "name": "기넥신에프정 80mg 100T", "code": "GNX80-100"},
-        {"id": "505227", "name": "기넥신에프정 80mg 500T", "code": "GNX80-500"},
-        {"id": "500023", "name": "리넥신정", "code": "LNX"},
-        {"id": "500041", "name": "조인스정", "code": "JNS"},
-        {"id": "507123", "name": "페브릭정 40mg", "code": "FBR40"},
-        {"id": "507242", "name": "신플랙스세이프정", "code": "SFS"}
-    ]
-    return products_data
+    return Response(content=master_data.entry("products").body, media_type="application/json")
 
 @app.get("/api/schedule")
-async def get_schedule():
-    """Get current schedule"""
+async def get_schedule(start: Optional[datetime] = None, end: Optional[datetime] = None,
+                       equipment_id: Optional[List[str]] = Query(None), product_id: Optional[str] = None):
+    """Get current schedule, optionally only batches overlapping [start, end) on the given equipment/product"""
+    if start is not None or end is not None or equipment_id or product_id is not None:
+        batches = schedules.window(start, end, equipment_id or None, product_id)
+        return {
+            "batches": batches,
+            "summary": {
+                "total_batches": len(batches),
+                "total_products": len(set(b["product_id"] for b in batches)),
+                "total_equipment": len(set(b["equipment_id"] for b in batches))
+            }
+        }
+    
     if not schedules:
         # Return sample data if no schedules exist
         sample_batches = [
@@ -128,12 +166,8 @@ async def get_schedule():
             "total_equipment": 1
         }
     else:
-        sample_batches = schedules
-        summary = {
-            "total_batches": len(schedules),
-            "total_products": len(set(s["product_id"] for s in schedules)),
-            "total_equipment": len(set(s["equipment_id"] for s in schedules))
-        }
+        sample_batches = list(schedules)
+        summary = schedules.summary()
     
     return {"batches": sample_batches, "summary": summary}
 
@@ -147,11 +181,11 @@ async def generate_schedule():
     """Generate production schedule from sales plan"""
     logger.info("Schedule generation requested")
     # Generate sample schedules
-    global schedules
-    schedules = []
+    global timeline
+    generated = []
     
-    products = await get_products()
-    equipment = await get_equipment()
+    products = master_data.products()
+    equipment = master_data.equipment()
     
     start_time = datetime.now().replace(hour=8, minute=0, second=0, microsecond=0)
     batch_id = 1
@@ -161,7 +195,7 @@ async def generate_schedule():
             eq_idx = j * 2 + (i % 2)  # Alternate between equipment
             eq = equipment[eq_idx]
             
-            schedules.append({
+            generated.append({
                 "id": f"BATCH{batch_id:03d}",
                 "product_id": product["id"],
                 "product_name": product["name"],
@@ -170,7 +204,9 @@ async def generate_schedule():
                 "start_time": start_time.isoformat(),
                 "end_time": (start_time + timedelta(hours=2)).isoformat(),
                 "lot_number": f"LOT{start_time.strftime('%Y%m%d')}{batch_id:03d}",
-                "quantity": 1000
+                "quantity": 1000,
+                "sales_plan_id": f"PLAN{i + 1:03d}",
+                "sequence": j + 1
             })
             
             batch_id += 1
@@ -180,6 +216,9 @@ async def generate_schedule():
             if start_time.hour >= 22:
                 start_time = start_time.replace(hour=8) + timedelta(days=1)
     
+    schedules.replace(generated)
+    timeline = BatchTimeline(_timeline_entry(b) for b in schedules)
+    
     logger.info(f"Schedule generated successfully with {len(schedules)} batches")
     return {
         "success": True,
@@ -190,19 +229,53 @@ async def generate_schedule():
 @app.put("/api/batches/{batch_id}")
 async def update_batch(batch_id: str, batch_data: dict):
     """Update batch schedule"""
-    global schedules
-    for i, batch in enumerate(schedules):
-        if batch["id"] == batch_id:
-            schedules[i].update(batch_data)
-            return {"success": True, "message": f"Batch {batch_id} updated successfully"}
-    return {"success": False, "message": "Batch not found"}
+    batch = schedules.get(batch_id)
+    if batch is None:
+        return {"success": False, "message": "Batch not found"}
+    
+    try:
+        start, end, equipment_id = parse_move_request(
+            batch_data,
+            datetime.fromisoformat(batch["start_time"]),
+            datetime.fromisoformat(batch["end_time"]),
+            batch["equipment_id"]
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    
+    schedules.update(batch_id, {k: v for k, v in batch_data.items()
+                                if k not in ("start", "end", "calendarId", "start_time", "end_time", "equipment_id")})
+    
+    # 이동한 배치와 밀려난 설비/후속 공정 배치만 갱신
+    changed = []
+    current = timeline.get(batch_id)
+    if (start, end, equipment_id) != (current.start, current.end, current.equipment_id):
+        changed = repair_after_move(timeline, batch_id, start, end, equipment_id)
+        for entry in changed:
+            schedules.update(entry.id, entry.to_dict())
+    
+    logger.info(f"Batch {batch_id} updated, {len(changed)} batches changed")
+    return {
+        "success": True,
+        "message": f"Batch {batch_id} updated successfully",
+        "changed_batches": [entry.to_dict() for entry in changed]
+    }
 
 @app.delete("/api/batches/{batch_id}")
 async def delete_batch(batch_id: str):
     """Delete batch schedule"""
-    global schedules
-    schedules = [b for b in schedules if b["id"] != batch_id]
-    return {"success": True, "message": f"Batch {batch_id} deleted successfully"}
+    # 같은 설비의 다음 배치와 같은 로트의 후속 공정을 비워진 구간으로 당김
+    changed = []
+    if schedules.remove(batch_id) is not None:
+        changed = repair_after_delete(timeline, batch_id)
+        for entry in changed:
+            schedules.update(entry.id, entry.to_dict())
+    return {
+        "success": True,
+        "message": f"Batch {batch_id} deleted successfully",
+        "deleted": [batch_id],
+        "changed_batches": [entry.to_dict() for entry in changed]
+    }
 
 @app.get("/api/export/schedule")
 async def export_schedule(format: str = "excel"):
@@ -0,0 +1,114 @@
+# Master data cache - products/equipment/routing read from the DB once and shared by API reads and scheduling
+import os
+import threading
+import time
+from typing import Any, Callable, Dict, List, NamedTuple, Optional
+
+from sqlalchemy.orm import Session
+
+from fast_json import dumps
+from models import Equipment, Product
+from routing import RoutingTable, load_routing_table
+from versioning import versions
+
+# Entries older than this are reloaded even without a local write (writes from other processes)
+MASTER_CACHE_TTL = float(os.getenv("MASTER_CACHE_TTL", 300))
+
+
+def _load_products(db: Session) -> List[Dict]:
+    rows = db.query(Product.id, Product.name, Product.code, Product.category).filter(
+        Product.active.isnot(False)
+    ).order_by(Product.id)
+    return [{"id": r.id, "name": r.name, "code": r.code, "category": r.category} for r in rows]
+
+
+def _load_equipment(db: Session) -> List[Dict]:
+    rows = db.query(Equipment.id, Equipment.name, Equipment.type, Equipment.capacity).order_by(Equipment.id)
+    return [{"id": r.id, "name": r.name, "type": r.type, "capacity": r.capacity} for r in rows]
+
+
+def _load_routing(db: Session) -> RoutingTable:
+    return load_routing_table(db)
+
+
+LOADERS: Dict[str, Callable[[Session], Any]] = {
+    "products": _load_products,
+    "equipment": _load_equipment,
+    "routing": _load_routing,
+}
+
+
+class CacheEntry(NamedTuple):
+    value: Any
+    body: Optional[bytes]  # pre-serialized JSON for list entries (served as-is)
+    version: int           # master data version the entry was loaded at
+    loaded_at: float
+
+
+class MasterDataCache:
+    """
+    In-process master data cache
+    An entry is reloaded when the master data version moved (any committed write to products/equipment/
+    processes/product_processes, see versioning.py), when it is older than the TTL,
+    or after invalidate(). Concurrent misses for the same entry load it once.
+    A reload that finds different content without a version change (tables edited outside the ORM)
+    bumps the master version, so ETags built from it change with the served bytes.
+    """
+
+    def __init__(self, session_factory: Callable[[], Session], ttl: float = MASTER_CACHE_TTL):
+        self.session_factory = session_factory
+        self.ttl = ttl
+        self._entries: Dict[str, CacheEntry] = {}
+        self._invalidated: Dict[str, CacheEntry] = {}  # dropped entries, kept to detect changed content
+        self._lock = threading.Lock()
+        self.stats = {"hits": 0, "loads": 0}
+
+    def _fresh(self, entry: Optional[CacheEntry]) -> bool:
+        return (entry is not None and entry.version == versions.get("master")
+                and time.monotonic() - entry.loaded_at < self.ttl)
+
+    def entry(self, kind: str) -> CacheEntry:
+        entry = self._entries.get(kind)
+        if self._fresh(entry):
+            self.stats["hits"] += 1
+            return entry
+        with self._lock:
+            entry = self._entries.get(kind)
+            if self._fresh(entry):
+                self.stats["hits"] += 1
+                return entry
+            version = versions.get("master")  # read before loading so a concurrent write forces a reload
+            db = self.session_factory()
+            try:
+                value = LOADERS[kind](db)
+            finally:
+                db.close()
+            body = dumps(value) if isinstance(value, list) else None
+            previous = self._entries.get(kind) or self._invalidated.pop(kind, None)
+            if (body is not None and previous is not None and previous.body != body
+                    and previous.version == version):
+                version = versions.bump("master")["master"]
+            entry = self._entries[kind] = CacheEntry(value, body, version, time.monotonic())
+            self.stats["loads"] += 1
+            return entry
+
+    def products(self) -> List[Dict]:
+        return self.entry("products").value
+
+    def equipment(self) -> List[Dict]:
+        return self.entry("equipment").value
+
+    def routing(self) -> RoutingTable:
+        """Routing table for every product (pass to SchedulerService instead of loading per run)"""
+        return self.entry("routing").value
+
+    def product_names(self) -> Dict[str, str]:
+        return {product["id"]: product["name"] for product in self.products()}
+
+    def invalidate(self, *kinds: str):
+        """Drop the given entries (all when none given); the next read reloads them"""
+        with self._lock:
+            for kind in kinds or list(self._entries):
+                entry = self._entries.pop(kind, None)
+                if entry is not None:
+                    self._invalidated[kind] = entry
@@ -0,0 +1,176 @@
+# Metrics - 라우트별 지연 시간/응답 크기 히스토그램, 처리 중 요청 수, 스케줄러 카운터를 Prometheus 텍스트 형식으로 제공
+import threading
+import time
+from bisect import bisect_left
+from typing import Callable, Dict, Iterable, List, Mapping, Optional, Tuple
+
+# 버킷 상한(le) - 지연 시간은 초, 응답 크기는 바이트
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+SIZE_BUCKETS = (256, 1024, 4096, 16384, 65536, 262144, 1048576, 4194304, 16777216)
+
+UNMATCHED_ROUTE = "<unmatched>"  # 404 등 - 요청 경로를 그대로 라벨로 쓰면 라벨 종류가 무한히 늘어남
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+# 스케줄 생성이 끝날 때마다 SchedulerService.run_stats 로 누적하는 카운터
+SCHEDULER_COUNTERS = {
+    'plans_processed': ("aps_scheduler_plans_processed_total", "Sales plans processed by schedule generation"),
+    'batches_placed': ("aps_scheduler_batches_placed_total", "Batches placed by schedule generation"),
+    'unscheduled_steps': ("aps_scheduler_unscheduled_steps_total", "Process steps that found no free equipment slot"),
+    'slot_search_iterations': ("aps_scheduler_slot_search_iterations_total",
+                               "Equipment probed while searching for free slot runs"),
+}
+
+# 수집(scrape) 시점에 추가로 출력하는 샘플: (이름, 유형, 설명, [(라벨, 값), ...])
+Collector = Callable[[], Iterable[Tuple[str, str, str, List[Tuple[Mapping[str, str], float]]]]]
+
+
+class Histogram:
+    """버킷별(비누적) 건수 + 합계 - 누적은 출력할 때만 계산"""
+    __slots__ = ('bounds', 'counts', 'sum')
+
+    def __init__(self, bounds: Tuple[float, ...]):
+        self.bounds = bounds
+        self.counts = [0] * (len(bounds) + 1)  # 마지막 = +Inf
+        self.sum = 0.0
+
+    def observe(self, value: float):
+        self.counts[bisect_left(self.bounds, value)] += 1
+        self.sum += value
+
+
+def _escape(value) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _labels(labels: Mapping[str, object]) -> str:
+    if not labels:
+        return ""
+    return "{" + ",".join(f'{key}="{_escape(value)}"' for key, value in labels.items()) + "}"
+
+
+def _number(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class MetricsRegistry:
+    """
+    프로세스 내 메트릭
+    HTTP 관측은 이벤트 루프 스레드에서만 기록 (요청 경로에 락 없음)
+    워커 스레드(스케줄 생성 작업)에서 올리는 카운터는 락을 거침
+    """
+
+    def __init__(self):
+        self._latency: Dict[Tuple[str, str, int], Histogram] = {}  # (method, route, status)
+        self._sizes: Dict[Tuple[str, str], Histogram] = {}          # (method, route)
+        self.in_flight = 0
+        self._counters: Dict[str, Tuple[str, Dict[Tuple[Tuple[str, str], ...], float]]] = {}
+        self._collectors: List[Collector] = []
+        self._lock = threading.Lock()
+
+    def observe_request(self, method: str, route: str, status: int, seconds: float, size: int):
+        key = (method, route, status)
+        histogram = self._latency.get(key)
+        if histogram is None:
+            histogram = self._latency[key] = Histogram(LATENCY_BUCKETS)
+        histogram.observe(seconds)
+        size_key = (method, route)
+        sizes = self._sizes.get(size_key)
+        if sizes is None:
+            sizes = self._sizes[size_key] = Histogram(SIZE_BUCKETS)
+        sizes.observe(size)
+
+    def inc(self, name: str, help: str, value: float = 1, **labels):
+        """카운터 증가 (스레드 안전)"""
+        key = tuple(sorted(labels.items()))
+        with self._lock:
+            samples = self._counters.setdefault(name, (help, {}))[1]
+            samples[key] = samples.get(key, 0) + value
+
+    def record_generation(self, status: str, run_stats: Optional[Mapping[str, int]]):
+        """끝난 스케줄 생성 작업 1건 기록 (run_stats = 작업의 SchedulerService 통계, 실행 전 종료면 None)"""
+        self.inc("aps_schedule_jobs_total", "Schedule generation jobs by final status", status=status)
+        for field, (name, help) in SCHEDULER_COUNTERS.items():
+            self.inc(name, help, (run_stats or {}).get(field, 0))
+
+    def add_collector(self, collector: Collector):
+        self._collectors.append(collector)
+
+    def render(self) -> str:
+        lines = [
+            "# HELP http_requests_in_flight Requests currently being handled",
+            "# TYPE http_requests_in_flight gauge",
+            f"http_requests_in_flight {self.in_flight}",
+        ]
+        self._render_histograms(lines, "http_request_duration_seconds", "Request latency by route and status",
+                                ("method", "route", "status"), dict(self._latency))
+        self._render_histograms(lines, "http_response_size_bytes", "Response body size by route",
+                                ("method", "route"), dict(self._sizes))
+        with self._lock:
+            counters = {name: (help, dict(samples)) for name, (help, samples) in self._counters.items()}
+        for name, (help, samples) in sorted(counters.items()):
+            lines.append(f"# HELP {name} {help}")
+            lines.append(f"# TYPE {name} counter")
+            for key, value in sorted(samples.items()):
+                lines.append(f"{name}{_labels(dict(key))} {_number(value)}")
+        for collector in self._collectors:
+            for name, kind, help, samples in collector():
+                lines.append(f"# HELP {name} {help}")
+                lines.append(f"# TYPE {name} {kind}")
+                for labels, value in samples:
+                    lines.append(f"{name}{_labels(labels)} {_number(value)}")
+        return "\n".join(lines) + "\n"
+
+    @staticmethod
+    def _render_histograms(lines: List[str], name: str, help: str, label_names: Tuple[str, ...],
+                           histograms: Dict[tuple, Histogram]):
+        lines.append(f"# HELP {name} {help}")
+        lines.append(f"# TYPE {name} histogram")
+        for key, histogram in sorted(histograms.items()):
+            labels = dict(zip(label_names, key))
+            cumulative = 0
+            for bound, count in zip(histogram.bounds + (float("inf"),), histogram.counts):
+                cumulative += count
+                lines.append(f"{name}_bucket{_labels({**labels, 'le': _number(bound)})} {cumulative}")
+            lines.append(f"{name}_sum{_labels(labels)} {_number(histogram.sum)}")
+            lines.append(f"{name}_count{_labels(labels)} {cumulative}")
+
+
+class MetricsMiddleware:
+    """ASGI 미들웨어 - 처리 중 요청 수, (메서드, 경로 템플릿, 상태)별 지연 시간과 응답 본문 크기 기록"""
+
+    def __init__(self, app, registry: MetricsRegistry):
+        self.app = app
+        self.registry = registry
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        registry = self.registry
+        status = 500
+        size = 0
+
+        async def send_and_measure(message):
+            nonlocal status, size
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            elif message["type"] == "http.response.body":
+                size += len(message.get("body", b""))
+            await send(message)
+
+        registry.in_flight += 1
+        started = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_and_measure)
+        finally:
+            elapsed = time.perf_counter() - started
+            registry.in_flight -= 1
+            route = getattr(scope.get("route"), "path", None) or UNMATCHED_ROUTE
+            registry.observe_request(scope["method"], route, status, elapsed, size)
+
+
+metrics = MetricsRegistry()
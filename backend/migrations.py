@@ -0,0 +1,63 @@
+# Schema migration for existing databases (e.g. aps.db files created before new columns/indexes)
+from typing import Dict, List
+
+from sqlalchemy import inspect
+from sqlalchemy.engine import Engine
+from sqlalchemy.schema import CreateColumn
+
+from models import Base
+
+
+def _add_column_sql(engine: Engine, table, column) -> str:
+    """ALTER TABLE ... ADD COLUMN statement compiled for the engine's dialect"""
+    column_sql = CreateColumn(column).compile(dialect=engine.dialect)
+    return f"ALTER TABLE {table.name} ADD COLUMN {column_sql}"
+
+
+def migrate_database(engine: Engine) -> Dict[str, List[str]]:
+    """
+    Bring an existing database up to the current models without dropping data
+    - Adds missing nullable columns (ALTER TABLE ... ADD COLUMN)
+    - Creates missing indexes
+    - Refreshes planner statistics on SQLite (ANALYZE)
+    Tables that do not exist yet are left to Base.metadata.create_all().
+    Returns the columns and indexes that were added.
+    """
+    added = {"columns": [], "indexes": []}
+
+    with engine.begin() as connection:
+        inspector = inspect(connection)
+        existing_tables = set(inspector.get_table_names())
+        for table in Base.metadata.sorted_tables:
+            if table.name not in existing_tables:
+                continue
+
+            existing_columns = {column["name"] for column in inspector.get_columns(table.name)}
+            for column in table.columns:
+                if column.name in existing_columns:
+                    continue
+                if not column.nullable or column.primary_key:
+                    raise RuntimeError(
+                        f"Cannot add required column {table.name}.{column.name} to an existing table"
+                    )
+                connection.exec_driver_sql(_add_column_sql(engine, table, column))
+                added["columns"].append(f"{table.name}.{column.name}")
+
+            existing_indexes = {index["name"] for index in inspector.get_indexes(table.name)}
+            for index in table.indexes:
+                if index.name not in existing_indexes:
+                    index.create(bind=connection)
+                    added["indexes"].append(index.name)
+
+        if engine.dialect.name == "sqlite" and added["indexes"]:
+            connection.exec_driver_sql("ANALYZE")
+
+    return added
+
+
+if __name__ == "__main__":
+    from database import init_database
+
+    added = init_database()
+    print(f"Added columns: {', '.join(added['columns']) or 'none'}")
+    print(f"Added indexes: {', '.join(added['indexes']) or 'none'}")
@@ -1,5 +1,5 @@
 # Database Models for APS System
-from sqlalchemy import create_engine, Column, String, Integer, DateTime, Float, Boolean, ForeignKey, JSON
+from sqlalchemy import create_engine, Column, String, Integer, DateTime, Float, Boolean, ForeignKey, JSON, Index
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import relationship, sessionmaker
 from datetime import datetime
@@ -57,6 +57,9 @@ class Process(Base):
 
 class ProductProcess(Base):
     __tablename__ = 'product_processes'
+    __table_args__ = (
+        Index('ix_product_processes_product_sequence', 'product_id', 'sequence'),  # routing lookup
+    )
     
     id = Column(String(50), primary_key=True, default=lambda: str(uuid.uuid4()))
     product_id = Column(String(50), ForeignKey('products.id'))
@@ -70,6 +73,9 @@ class ProductProcess(Base):
 
 class SalesPlan(Base):
     __tablename__ = 'sales_plans'
+    __table_args__ = (
+        Index('ix_sales_plans_period_priority', 'year', 'month', 'priority'),  # monthly plans by priority
+    )
     
     id = Column(String(50), primary_key=True, default=lambda: str(uuid.uuid4()))
     product_id = Column(String(50), ForeignKey('products.id'))
@@ -86,11 +92,20 @@ class SalesPlan(Base):
 
 class Batch(Base):
     __tablename__ = 'batches'
+    __table_args__ = (
+        Index('ix_batches_equipment_time', 'equipment_id', 'start_time', 'end_time'),  # equipment time windows
+        Index('ix_batches_product_start', 'product_id', 'start_time'),  # product schedule ranges
+        Index('ix_batches_start', 'start_time', 'id'),  # time windows + keyset pagination order
+        Index('ix_batches_schedule', 'schedule_id'),  # bulk replace of a schedule
+    )
     
     id = Column(String(50), primary_key=True, default=lambda: str(uuid.uuid4()))
     lot_number = Column(String(100), unique=True, nullable=False)
     product_id = Column(String(50), ForeignKey('products.id'))
     equipment_id = Column(String(50), ForeignKey('equipment.id'))
+    sales_plan_id = Column(String(50), ForeignKey('sales_plans.id'))  # 같은 로트의 공정 배치 묶음
+    sequence = Column(Integer)  # ProductProcess.sequence
+    schedule_id = Column(String(50))  # 일괄 저장/교체 단위 (스케줄 생성 실행 ID)
     process_name = Column(String(200))
     quantity = Column(Integer, nullable=False)
     start_time = Column(DateTime, nullable=False)
@@ -121,6 +136,23 @@ class Schedule(Base):
     created_at = Column(DateTime, default=datetime.utcnow)
     updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
 
+class LotSequence(Base):
+    __tablename__ = 'lot_sequences'
+    
+    # 제품코드 + 일자별 다음 로트 순번 (lot_numbers.LotNumberAllocator 가 블록 단위로 예약)
+    product_code = Column(String(100), primary_key=True)
+    lot_date = Column(String(8), primary_key=True)  # YYYYMMDD
+    next_value = Column(Integer, nullable=False, default=1)
+    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+class DataVersion(Base):
+    __tablename__ = 'data_versions'
+    
+    # Version counter per data kind (see versioning.py), bumped in the same transaction as the write
+    kind = Column(String(50), primary_key=True)
+    version = Column(Integer, nullable=False, default=0)
+    epoch = Column(String(32), nullable=False)  # new value whenever the row is (re)created
+
 # Database setup
 def init_db(database_url="sqlite:///aps.db"):
     engine = create_engine(database_url)
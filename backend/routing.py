@@ -0,0 +1,152 @@
+# Routing table - 스케줄링 1회에 필요한 마스터 데이터를 일괄 조회한 불변 스냅샷
+from dataclasses import dataclass
+from types import MappingProxyType
+from typing import Dict, Iterable, Mapping, Optional, Tuple
+
+from sqlalchemy import select
+from sqlalchemy.orm import Session
+
+from models import Product, Equipment, Process, ProductProcess
+
+# 배정 가능한 설비 상태 (상태가 비어 있으면 기본값 'available' 로 간주)
+AVAILABLE_EQUIPMENT_STATUSES = frozenset({'available'})
+
+
+@dataclass(frozen=True)
+class ProductInfo:
+    id: str
+    code: str
+    name: str
+
+
+@dataclass(frozen=True)
+class EquipmentInfo:
+    id: str
+    name: str
+    type: str
+    capacity: Optional[int] = None
+    status: Optional[str] = None
+
+
+@dataclass(frozen=True)
+class RoutingStep:
+    """제품 공정 순서의 한 단계 (ProductProcess + Process)"""
+    sequence: int
+    process_id: str
+    process_name: str
+    process_type: str
+    equipment_id: str
+    duration_hours: float
+    setup_time_hours: float
+    quantity_per_batch: Optional[int]
+
+
+class RoutingTable:
+    """
+    제품 → 공정 순서(설비, 소요시간 포함) 조회 테이블
+    생성 후 변경 불가 - 스케줄러는 이 테이블만 참조하고 ORM 지연 로딩을 하지 않음
+    """
+
+    def __init__(self, products: Dict[str, ProductInfo],
+                 equipment: Dict[str, EquipmentInfo],
+                 routings: Dict[str, Tuple[RoutingStep, ...]],
+                 unavailable: Iterable[str] = ()):
+        self._products = dict(products)
+        self._all_equipment = dict(equipment)
+        self._unavailable = frozenset(unavailable)
+        self._equipment = {k: v for k, v in self._all_equipment.items() if k not in self._unavailable}
+        self._routings = {product_id: tuple(steps) for product_id, steps in routings.items()}
+        # 설비 유형별 대체 가능 설비 풀 (사용 불가 설비 제외)
+        pools: Dict[str, list] = {}
+        for equipment_id in sorted(self._equipment):
+            pools.setdefault(self._equipment[equipment_id].type, []).append(equipment_id)
+        self._pools = {equipment_type: tuple(ids) for equipment_type, ids in pools.items()}
+
+    @property
+    def products(self) -> Mapping[str, ProductInfo]:
+        return MappingProxyType(self._products)
+
+    @property
+    def equipment(self) -> Mapping[str, EquipmentInfo]:
+        return MappingProxyType(self._equipment)
+
+    @property
+    def pools(self) -> Mapping[str, Tuple[str, ...]]:
+        """설비 유형 → 같은 유형의 사용 가능 설비 ID"""
+        return MappingProxyType(self._pools)
+
+    def pool_type(self, equipment_id: str) -> Optional[str]:
+        """공정 지정 설비의 풀(설비 유형) - 지정 설비가 사용 불가여도 같은 유형의 다른 설비로 대체 가능"""
+        equipment = self._all_equipment.get(equipment_id)
+        return equipment.type if equipment is not None else None
+
+    def steps(self, product_id: str) -> Tuple[RoutingStep, ...]:
+        """제품의 공정 단계 (sequence 순)"""
+        return self._routings.get(product_id, ())
+
+    def without_equipment(self, equipment_ids: Iterable[str]) -> 'RoutingTable':
+        """지정 설비를 사용할 수 없는 것으로 본 새 테이블 (같은 유형의 남은 설비로만 배정)"""
+        return RoutingTable(self._products, self._all_equipment, self._routings,
+                            self._unavailable | set(equipment_ids))
+
+
+def load_routing_table(db: Session, product_ids: Optional[Iterable[str]] = None) -> RoutingTable:
+    """
+    제품/공정/설비 마스터를 고정된 횟수(3회)의 일괄 쿼리로 조회
+    설비는 공정에 지정된 설비와 같은 유형의 설비를 모두 포함하되, 상태가 사용 가능이 아닌 설비(점검 등)는 풀에서 제외
+    product_ids 를 지정하지 않으면 전체 제품을 대상으로 함
+    """
+    product_query = db.query(Product.id, Product.code, Product.name)
+    routing_query = db.query(
+        ProductProcess.product_id,
+        ProductProcess.sequence,
+        ProductProcess.quantity_per_batch,
+        Process.id.label('process_id'),
+        Process.name.label('process_name'),
+        Process.type.label('process_type'),
+        Process.equipment_id,
+        Process.duration_hours,
+        Process.setup_time_hours
+    ).join(Process, ProductProcess.process_id == Process.id)
+
+    if product_ids is not None:
+        product_ids = set(product_ids)
+        product_query = product_query.filter(Product.id.in_(product_ids))
+        routing_query = routing_query.filter(ProductProcess.product_id.in_(product_ids))
+
+    products = {
+        row.id: ProductInfo(id=row.id, code=row.code, name=row.name)
+        for row in product_query
+    }
+
+    routings: Dict[str, list] = {}
+    for row in routing_query.order_by(ProductProcess.product_id, ProductProcess.sequence):
+        routings.setdefault(row.product_id, []).append(RoutingStep(
+            sequence=row.sequence,
+            process_id=row.process_id,
+            process_name=row.process_name,
+            process_type=row.process_type,
+            equipment_id=row.equipment_id,
+            duration_hours=row.duration_hours,
+            setup_time_hours=row.setup_time_hours or 0.0,
+            quantity_per_batch=row.quantity_per_batch
+        ))
+
+    # 공정에 지정된 설비와 같은 유형의 설비 전체 (대체 설비 풀)
+    equipment_ids = {step.equipment_id for steps in routings.values() for step in steps}
+    equipment = {}
+    if equipment_ids:
+        pool_types = select(Equipment.type).where(Equipment.id.in_(equipment_ids))
+        equipment = {
+            row.id: EquipmentInfo(id=row.id, name=row.name, type=row.type,
+                                  capacity=row.capacity, status=row.status)
+            for row in db.query(
+                Equipment.id, Equipment.name, Equipment.type, Equipment.capacity, Equipment.status
+            ).filter(Equipment.type.in_(pool_types))
+        }
+
+    unavailable = {
+        equipment_id for equipment_id, info in equipment.items()
+        if info.status is not None and info.status not in AVAILABLE_EQUIPMENT_STATUSES
+    }
+    return RoutingTable(products, equipment, routings, unavailable)
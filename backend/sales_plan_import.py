@@ -0,0 +1,259 @@
+# Sales plan import - 업로드 파일을 임시 파일로 청크 저장 후 스트리밍 리더로 읽어 검증/매핑, 청크 단위 일괄 저장
+import csv
+import importlib.util
+import os
+import tempfile
+import time
+import uuid
+from datetime import datetime
+from typing import Dict, Iterable, Iterator, List, Optional, Sequence, Tuple
+
+from sqlalchemy.orm import Session
+
+from models import Product, SalesPlan
+
+try:
+    import pyarrow.parquet as pq
+except ImportError:  # optional dependency (Parquet 업로드에만 필요)
+    pq = None
+
+# .xls(BIFF) 는 스트리밍 리더가 없어 pandas + xlrd 로 통째로 읽음 (optional dependency)
+XLRD_AVAILABLE = importlib.util.find_spec("xlrd") is not None
+
+SPOOL_CHUNK_SIZE = 1024 * 1024  # 업로드 스트림을 1 MiB 씩 임시 파일에 기록
+DEFAULT_CHUNK_SIZE = 1000       # 검증/저장 단위 (행)
+MAX_REJECTED_DETAILS = 100      # 응답에 포함하는 거부 행 상세 최대 건수
+
+SUPPORTED_EXTENSIONS = ('.xlsx', '.xls', '.csv', '.parquet')
+
+# 헤더 별칭 → 필드 (대소문자/앞뒤 공백 무시)
+HEADER_ALIASES = {
+    'product_id': 'product_id', 'product': 'product_id', 'product_code': 'product_id',
+    '제품': 'product_id', '제품id': 'product_id', '제품코드': 'product_id',
+    'year': 'year', '연도': 'year', '년도': 'year',
+    'month': 'month', '월': 'month',
+    'quantity': 'quantity', 'qty': 'quantity', '수량': 'quantity',
+    'priority': 'priority', '우선순위': 'priority',
+}
+REQUIRED_FIELDS = ('product_id', 'year', 'month', 'quantity')
+
+
+class SalesPlanImportError(ValueError):
+    """파일 형식/헤더 오류 (행 단위 오류는 거부 행으로 집계)"""
+
+
+def file_kind(filename: str) -> str:
+    """파일명 확장자 → 'xlsx' / 'xls' / 'csv' / 'parquet', 지원하지 않으면 SalesPlanImportError"""
+    extension = os.path.splitext(filename or "")[1].lower()
+    if extension not in SUPPORTED_EXTENSIONS:
+        raise SalesPlanImportError(
+            f"Unsupported file type '{extension or filename}' (allowed: {', '.join(SUPPORTED_EXTENSIONS)})"
+        )
+    if extension == '.parquet' and pq is None:
+        raise SalesPlanImportError("Parquet upload requires the optional 'pyarrow' package")
+    if extension == '.xls' and not XLRD_AVAILABLE:
+        raise SalesPlanImportError("Legacy .xls upload requires the optional 'xlrd' package (or save the file as .xlsx/.csv)")
+    return extension[1:]
+
+
+async def spool_upload(upload, chunk_size: int = SPOOL_CHUNK_SIZE) -> str:
+    """
+    업로드 스트림을 chunk_size 씩 읽어 비공개 임시 파일(0600, mkstemp)에 기록하고 경로 반환
+    파일 전체를 메모리에 올리지 않으며, 실패 시 임시 파일 삭제
+    """
+    suffix = os.path.splitext(upload.filename or "")[1].lower()
+    fd, path = tempfile.mkstemp(prefix="sales_plan_", suffix=suffix)
+    try:
+        with os.fdopen(fd, "wb") as spool:
+            while True:
+                chunk = await upload.read(chunk_size)
+                if not chunk:
+                    break
+                spool.write(chunk)
+    except BaseException:
+        os.remove(path)
+        raise
+    return path
+
+
+def iter_file_rows(path: str, kind: str) -> Iterator[Sequence]:
+    """첫 행(헤더)부터 값 튜플을 순서대로 반환 - .xls 를 제외하면 파일 전체를 메모리에 올리지 않음"""
+    if kind == 'xlsx':
+        from openpyxl import load_workbook
+
+        workbook = load_workbook(path, read_only=True, data_only=True)
+        try:
+            yield from workbook.active.iter_rows(values_only=True)
+        finally:
+            workbook.close()
+    elif kind == 'xls':
+        # 구형 .xls 는 스트리밍 불가 - 시트 전체를 DataFrame 으로 읽은 뒤 행 단위로 전달
+        import pandas as pd
+
+        frame = pd.read_excel(path, header=None, dtype=object, engine="xlrd")
+        for row in frame.itertuples(index=False, name=None):
+            # xlrd 는 숫자를 모두 float 으로 반환 - 정수 값은 int 로 (제품 ID 500002.0 → 500002)
+            yield tuple(None if pd.isna(value) else
+                        int(value) if isinstance(value, float) and value.is_integer() else value
+                        for value in row)
+    elif kind == 'csv':
+        with open(path, newline="", encoding="utf-8-sig") as handle:
+            yield from csv.reader(handle)
+    elif kind == 'parquet':
+        if pq is None:
+            raise SalesPlanImportError("Parquet upload requires the optional 'pyarrow' package")
+        parquet_file = pq.ParquetFile(path)
+        yield tuple(parquet_file.schema_arrow.names)
+        for record_batch in parquet_file.iter_batches(batch_size=DEFAULT_CHUNK_SIZE):
+            columns = [column.to_pylist() for column in record_batch.columns]
+            yield from zip(*columns)
+    else:
+        raise SalesPlanImportError(f"Unsupported file kind: {kind}")
+
+
+def _header_map(header: Sequence) -> Dict[str, int]:
+    """헤더 행 → {필드: 열 위치}, 필수 필드가 없으면 SalesPlanImportError"""
+    positions = {}
+    for index, name in enumerate(header):
+        field = HEADER_ALIASES.get(str(name).strip().lower()) if name is not None else None
+        if field and field not in positions:
+            positions[field] = index
+    missing = [field for field in REQUIRED_FIELDS if field not in positions]
+    if missing:
+        raise SalesPlanImportError(f"Missing required columns: {', '.join(missing)}")
+    return positions
+
+
+def _to_int(value) -> Optional[int]:
+    """셀 값 → 정수 ('1,200', 3.0 허용), 비어 있으면 None, 변환 불가 시 ValueError"""
+    if value is None or (isinstance(value, str) and not value.strip()):
+        return None
+    if isinstance(value, bool):
+        raise ValueError(value)
+    if isinstance(value, float):
+        if not value.is_integer():
+            raise ValueError(value)
+        return int(value)
+    if isinstance(value, int):
+        return value
+    text = str(value).strip().replace(",", "")
+    number = float(text)
+    if not number.is_integer():
+        raise ValueError(value)
+    return int(number)
+
+
+def _validate_row(values: Sequence, positions: Dict[str, int],
+                  product_ids: Dict[str, str]) -> Tuple[Optional[Dict], List[str]]:
+    """행 검증 → (SalesPlan 컬럼 dict, 오류 목록)"""
+    def cell(field):
+        index = positions.get(field)
+        return values[index] if index is not None and index < len(values) else None
+
+    errors = []
+    parsed = {}
+    for field in ('year', 'month', 'quantity', 'priority'):
+        try:
+            parsed[field] = _to_int(cell(field))
+        except (TypeError, ValueError):
+            errors.append(f"{field}: not an integer ({cell(field)!r})")
+
+    raw_product = cell('product_id')
+    product_key = str(raw_product).strip() if raw_product is not None else ""
+    product_id = product_ids.get(product_key)
+    if not product_key:
+        errors.append("product_id: missing")
+    elif product_id is None:
+        errors.append(f"product_id: unknown product '{product_key}'")
+
+    year, month, quantity, priority = (parsed.get(field) for field in ('year', 'month', 'quantity', 'priority'))
+    if 'year' in parsed and (year is None or not 2000 <= year <= 2100):
+        errors.append(f"year: out of range ({year})")
+    if 'month' in parsed and (month is None or not 1 <= month <= 12):
+        errors.append(f"month: out of range ({month})")
+    if 'quantity' in parsed and (quantity is None or quantity <= 0):
+        errors.append(f"quantity: must be positive ({quantity})")
+    if priority is not None and priority < 1:
+        errors.append(f"priority: must be >= 1 ({priority})")
+
+    if errors:
+        return None, errors
+    return {
+        'product_id': product_id,
+        'year': year,
+        'month': month,
+        'quantity': quantity,
+        'priority': priority if priority is not None else 1,
+    }, errors
+
+
+def import_sales_plans(db: Session, rows: Iterable[Sequence],
+                       chunk_size: int = DEFAULT_CHUNK_SIZE) -> Dict:
+    """
+    헤더 + 데이터 행을 검증해 SalesPlan 으로 매핑하고 chunk_size 행씩 Core INSERT(executemany)
+    전체를 한 트랜잭션으로 처리 (DB 오류 시 전체 롤백), 검증 실패 행은 건너뛰고 거부 사유를 집계
+    제품은 ID 또는 제품코드로 지정 가능
+    """
+    if chunk_size < 1:
+        raise ValueError("chunk_size must be positive")
+
+    started = time.perf_counter()
+    rows = iter(rows)
+    header = next(rows, None)
+    if header is None:
+        raise SalesPlanImportError("File is empty")
+    positions = _header_map(header)
+
+    product_ids = {}
+    for product_id, code in db.query(Product.id, Product.code):
+        product_ids[product_id] = product_id
+        if code:
+            product_ids.setdefault(code, product_id)
+
+    now = datetime.utcnow()
+    insert_statement = SalesPlan.__table__.insert()
+    total = imported = rejected = 0
+    rejected_rows = []
+
+    try:
+        chunk = []
+        for row_number, values in enumerate(rows, start=2):
+            if not values or all(value is None or str(value).strip() == "" for value in values):
+                continue  # 빈 행
+            total += 1
+            plan, errors = _validate_row(values, positions, product_ids)
+            if errors:
+                rejected += 1
+                if len(rejected_rows) < MAX_REJECTED_DETAILS:
+                    rejected_rows.append({'row': row_number, 'errors': errors})
+                continue
+
+            plan.update(id=str(uuid.uuid4()), status='pending', created_at=now, updated_at=now)
+            chunk.append(plan)
+            if len(chunk) >= chunk_size:
+                db.execute(insert_statement, chunk)
+                imported += len(chunk)
+                chunk = []
+        if chunk:
+            db.execute(insert_statement, chunk)
+            imported += len(chunk)
+
+        db.commit()
+    except Exception:
+        db.rollback()
+        raise
+
+    return {
+        'total_rows': total,
+        'imported': imported,
+        'rejected': rejected,
+        'rejected_rows': rejected_rows,
+        'rejected_rows_truncated': rejected > len(rejected_rows),
+        'elapsed_seconds': time.perf_counter() - started,
+    }
+
+
+def import_sales_plan_file(db: Session, path: str, kind: str,
+                           chunk_size: int = DEFAULT_CHUNK_SIZE) -> Dict:
+    """임시 파일 → 검증/저장 (블로킹, 이벤트 루프 밖 스레드에서 호출)"""
+    return import_sales_plans(db, iter_file_rows(path, kind), chunk_size=chunk_size)
@@ -0,0 +1,127 @@
+# What-if scenario service - 판매계획 변형 시나리오를 프로세스 풀에서 병렬 실행
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass, field, replace
+from typing import Dict, FrozenSet, Iterable, List, Optional, Tuple
+
+from sqlalchemy.orm import Session
+
+from models import SalesPlan
+from routing import RoutingTable, load_routing_table
+from scheduler_service import SchedulerService
+
+
+@dataclass(frozen=True)
+class PlanSpec:
+    """DB 세션과 무관한 판매계획 사본 (SalesPlan 과 같은 속성명)"""
+    id: str
+    product_id: str
+    year: int
+    month: int
+    quantity: int
+    priority: int = 1
+
+    @classmethod
+    def from_sales_plan(cls, plan: SalesPlan) -> 'PlanSpec':
+        return cls(id=plan.id, product_id=plan.product_id, year=plan.year, month=plan.month,
+                   quantity=plan.quantity, priority=plan.priority or 1)
+
+
+@dataclass(frozen=True)
+class MasterDataSnapshot:
+    """워커 프로세스로 한 번만 전달되는 피클 가능한 마스터 데이터 + 판매계획"""
+    routing: RoutingTable
+    plans: Tuple[PlanSpec, ...]
+
+    @classmethod
+    def from_db(cls, db: Session, sales_plans: Iterable[SalesPlan],
+                routing: Optional[RoutingTable] = None) -> 'MasterDataSnapshot':
+        """routing 을 주면 (마스터 데이터 캐시 등) 라우팅 조회 생략"""
+        plans = tuple(PlanSpec.from_sales_plan(plan) for plan in sales_plans)
+        if routing is None:
+            routing = load_routing_table(db, {plan.product_id for plan in plans})
+        return cls(routing=routing, plans=plans)
+
+
+@dataclass(frozen=True)
+class ScenarioVariant:
+    """
+    시나리오 변형
+    priorities: 제품 ID → 우선순위 재지정
+    search_days: 판매계획 월 1일부터의 배정 탐색 기간 (None 이면 기본값)
+    unavailable_equipment: 사용 불가 설비 ID
+    """
+    name: str
+    priorities: Dict[str, int] = field(default_factory=dict)
+    search_days: Optional[int] = None
+    unavailable_equipment: FrozenSet[str] = frozenset()
+    engine: Optional[str] = None
+
+
+# 워커 프로세스별 스냅샷 (initializer 에서 한 번 설정)
+_worker_snapshot: Optional[MasterDataSnapshot] = None
+
+
+def _init_worker(snapshot: MasterDataSnapshot):
+    global _worker_snapshot
+    _worker_snapshot = snapshot
+
+
+def _run_worker_scenario(variant: ScenarioVariant) -> Dict:
+    return run_scenario(_worker_snapshot, variant)
+
+
+def run_scenario(snapshot: MasterDataSnapshot, variant: ScenarioVariant) -> Dict:
+    """시나리오 1건 실행 후 KPI 반환 (DB 접근 없음)"""
+    started = time.perf_counter()
+
+    plans = [
+        replace(plan, priority=variant.priorities[plan.product_id])
+        if plan.product_id in variant.priorities else plan
+        for plan in snapshot.plans
+    ]
+    routing = snapshot.routing
+    if variant.unavailable_equipment:
+        routing = routing.without_equipment(variant.unavailable_equipment)
+
+    service = SchedulerService(None, search_days=variant.search_days)
+    batches = service.generate_schedule_from_sales(plans, routing=routing, engine=variant.engine)
+
+    equipment_timeline = {}
+    for batch in batches:
+        equipment_timeline.setdefault(batch.equipment_id, []).append((batch.start_time, batch.end_time))
+    utilization = service._calculate_utilization(equipment_timeline)
+
+    makespan_hours = 0.0
+    if batches:
+        makespan_hours = (max(b.end_time for b in batches) -
+                          min(b.start_time for b in batches)).total_seconds() / 3600
+
+    return {
+        'name': variant.name,
+        'batches': len(batches),
+        'unscheduled': service.run_stats['unscheduled_steps'],
+        'makespan_hours': makespan_hours,
+        'utilization': utilization,
+        'average_utilization': sum(utilization.values()) / len(utilization) if utilization else 0.0,
+        'elapsed_seconds': time.perf_counter() - started
+    }
+
+
+def run_scenarios(snapshot: MasterDataSnapshot, variants: List[ScenarioVariant],
+                  max_workers: Optional[int] = None) -> List[Dict]:
+    """
+    여러 시나리오를 ProcessPoolExecutor 로 병렬 실행
+    스냅샷은 워커당 한 번만 전달되며 결과는 variants 순서대로 반환
+    """
+    if not variants:
+        return []
+    if max_workers is None:
+        max_workers = min(len(variants), os.cpu_count() or 1)
+    if max_workers <= 1:
+        return [run_scenario(snapshot, variant) for variant in variants]
+
+    with ProcessPoolExecutor(max_workers=max_workers, initializer=_init_worker,
+                             initargs=(snapshot,)) as executor:
+        return list(executor.map(_run_worker_scenario, variants))
@@ -0,0 +1,258 @@
+# Schedule events - 배치 변경(생성/수정/삭제)을 모아 일정 주기로 WebSocket 구독자에게 전송
+import asyncio
+import logging
+import os
+import threading
+from datetime import datetime
+from typing import Dict, FrozenSet, Iterable, List, NamedTuple, Optional, Tuple
+
+from fast_json import dumps
+
+# 전송 주기(초) - 이 사이의 변경은 배치 ID 단위로 병합되어 한 메시지로 나감
+FLUSH_INTERVAL = float(os.getenv("SCHEDULE_PUSH_INTERVAL", 0.25))
+# 구독자별 미전송 메시지 한도 - 넘으면 쌓인 메시지를 버리고 resync 요청
+SUBSCRIBER_QUEUE_SIZE = int(os.getenv("SCHEDULE_PUSH_QUEUE", 16))
+# 한 메시지의 최대 변경 수 - 넘으면 변경 목록 대신 resync 요청 (대량 생성 등)
+MAX_DELTAS_PER_MESSAGE = int(os.getenv("SCHEDULE_PUSH_MAX_DELTAS", 2000))
+
+CREATED, UPDATED, DELETED = 'created', 'updated', 'deleted'
+
+logger = logging.getLogger(__name__)
+
+# (설비 ID, 시작, 종료) - 구독 필터 판정용 위치 (이동한 배치는 이전/이후 위치 모두)
+Location = Tuple[str, datetime, datetime]
+
+
+class BatchDelta(NamedTuple):
+    """배치 변경 1건 - fields 는 생성 시 전체 필드, 수정 시 바뀐 필드만"""
+    op: str
+    id: str
+    fields: Optional[Dict] = None
+    locations: Tuple[Location, ...] = ()
+
+
+class SubscriptionFilter(NamedTuple):
+    """구독 조건 - 설비 ID 집합과 [start, end) 기간 (None 이면 제한 없음)"""
+    equipment_ids: Optional[FrozenSet[str]] = None
+    start: Optional[datetime] = None
+    end: Optional[datetime] = None
+
+    def matches(self, locations: Iterable[Location]) -> bool:
+        located = False
+        for equipment_id, start, end in locations:
+            located = True
+            if self.equipment_ids is not None and equipment_id not in self.equipment_ids:
+                continue
+            if self.start is not None and end <= self.start:
+                continue
+            if self.end is not None and start >= self.end:
+                continue
+            return True
+        return not located  # 위치를 모르는 변경(삭제 등)은 모두에게 전달
+
+
+def _merge(pending: Dict[str, list], delta: BatchDelta):
+    """같은 배치의 연속 변경 병합 (생성→수정은 생성, 생성→삭제는 없음, 수정→삭제는 삭제)"""
+    current = pending.get(delta.id)
+    if current is None:
+        pending[delta.id] = [delta.op, dict(delta.fields or {}), list(delta.locations)]
+        return
+    op, fields, locations = current
+    if delta.op == DELETED:
+        if op == CREATED:
+            del pending[delta.id]
+        else:
+            pending[delta.id] = [DELETED, {}, locations + list(delta.locations)]
+    elif delta.op == CREATED:
+        pending[delta.id] = [CREATED, dict(delta.fields or {}), locations + list(delta.locations)]
+    else:
+        fields.update(delta.fields or {})
+        locations.extend(delta.locations)
+        if op == DELETED:  # 삭제 후 같은 ID 로 변경되는 경우는 없지만 수정으로 취급
+            current[0] = UPDATED
+
+
+class _Subscriber:
+    def __init__(self, websocket, subscription: SubscriptionFilter):
+        self.websocket = websocket
+        self.filter = subscription
+        self.queue: asyncio.Queue = asyncio.Queue(maxsize=SUBSCRIBER_QUEUE_SIZE)
+        self.dropped = 0
+
+    def offer(self, message: str):
+        """전송 대기열에 넣기 (가득 차면 쌓인 메시지를 버리고 resync 한 건만 남김)"""
+        try:
+            self.queue.put_nowait(message)
+        except asyncio.QueueFull:
+            self.dropped += self.queue.qsize()
+            while not self.queue.empty():
+                self.queue.get_nowait()
+            self.queue.put_nowait(_resync_message("subscriber_lagging"))
+
+
+def _resync_message(reason: str) -> str:
+    return dumps({'type': 'resync', 'reason': reason}).decode()
+
+
+class ScheduleBroadcaster:
+    """
+    배치 변경 브로드캐스터
+    - publish: 쓰기 경로(요청 핸들러, 생성 작업 스레드)에서 호출, 잠금 아래 병합만 하고 바로 반환
+    - 이벤트 루프의 flush 작업이 interval 마다 병합된 변경을 구독자 필터별로 한 번씩 직렬화해 대기열에 넣고
+      구독자별 전송 작업이 각자 보냄 (느린 클라이언트가 쓰기나 다른 구독자를 막지 않음)
+    """
+
+    def __init__(self, interval: float = FLUSH_INTERVAL, max_deltas: int = MAX_DELTAS_PER_MESSAGE):
+        self.interval = interval
+        self.max_deltas = max_deltas
+        self._pending: Dict[str, list] = {}
+        self._lock = threading.Lock()
+        self._subscribers: List[_Subscriber] = []
+        self._task: Optional[asyncio.Task] = None
+        self.stats = {'published': 0, 'flushes': 0, 'messages': 0, 'errors': 0}
+
+    @property
+    def active(self) -> bool:
+        """구독자가 있을 때만 변경을 모음 (없으면 publish 는 아무것도 하지 않음)"""
+        return bool(self._subscribers)
+
+    def publish(self, deltas: Iterable[BatchDelta]):
+        if not self._subscribers:
+            return
+        with self._lock:
+            for delta in deltas:
+                _merge(self._pending, delta)
+                self.stats['published'] += 1
+
+    def start(self):
+        if self._task is None:
+            self._task = asyncio.get_running_loop().create_task(self._run())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    async def _run(self):
+        while True:
+            await asyncio.sleep(self.interval)
+            try:
+                self.flush()
+            except Exception:  # 전송 작업이 끝나면 이후 변경이 아무에게도 가지 않으므로 기록만 하고 계속
+                logger.exception("Schedule delta flush failed")
+
+    def flush(self) -> int:
+        """병합된 변경을 구독자 대기열에 넣고 전달한 메시지 수 반환"""
+        with self._lock:
+            pending, self._pending = self._pending, {}
+        if not pending or not self._subscribers:
+            return 0
+        self.stats['flushes'] += 1
+
+        items = [(batch_id, op, fields, tuple(locations)) for batch_id, (op, fields, locations) in pending.items()]
+        messages: Dict[SubscriptionFilter, Optional[str]] = {}  # 같은 필터의 구독자는 메시지 공유
+        sent = 0
+        for subscriber in list(self._subscribers):
+            if subscriber.filter not in messages:
+                try:
+                    messages[subscriber.filter] = self._message(items, subscriber.filter)
+                except Exception:
+                    # 이 필터의 구독자만 변경을 놓침 - 다른 구독자는 그대로 받고, 이 구독자는 다시 불러오도록 resync
+                    logger.exception("Schedule deltas for filter %r failed", subscriber.filter)
+                    self.stats['errors'] += 1
+                    messages[subscriber.filter] = _resync_message("server_error")
+            message = messages[subscriber.filter]
+            if message is not None:
+                subscriber.offer(message)
+                sent += 1
+        self.stats['messages'] += sent
+        return sent
+
+    def _message(self, items, subscription: SubscriptionFilter) -> Optional[str]:
+        created, updated, deleted = [], [], []
+        for batch_id, op, fields, locations in items:
+            if not subscription.matches(locations):
+                continue
+            if op == CREATED:
+                created.append(fields)
+            elif op == UPDATED:
+                updated.append({'id': batch_id, **fields})
+            else:
+                deleted.append(batch_id)
+        count = len(created) + len(updated) + len(deleted)
+        if count == 0:
+            return None
+        if count > self.max_deltas:
+            return _resync_message("too_many_changes")
+        return dumps({'type': 'batch_deltas', 'created': created, 'updated': updated, 'deleted': deleted}).decode()
+
+    async def serve(self, websocket, subscription: SubscriptionFilter):
+        """
+        연결 1개 처리 - 전송 작업을 띄우고, 클라이언트의 subscribe 메시지로 필터 변경
+        {"type": "subscribe", "equipment_id": [...], "start": "...", "end": "..."}
+        """
+        subscriber = _Subscriber(websocket, subscription)
+        self._subscribers.append(subscriber)
+        sender = asyncio.get_running_loop().create_task(self._send_loop(subscriber))
+        try:
+            while True:
+                message = await websocket.receive_json()
+                if isinstance(message, dict) and message.get('type') == 'subscribe':
+                    try:
+                        subscriber.filter = parse_filter(
+                            message.get('equipment_id'), message.get('start'), message.get('end')
+                        )
+                    except ValueError as e:
+                        subscriber.offer(dumps({'type': 'error', 'detail': str(e)}).decode())
+        finally:
+            self._subscribers.remove(subscriber)
+            sender.cancel()
+
+    async def _send_loop(self, subscriber: _Subscriber):
+        while True:
+            message = await subscriber.queue.get()
+            await subscriber.websocket.send_text(message)
+
+
+def parse_filter(equipment_ids=None, start=None, end=None) -> SubscriptionFilter:
+    """
+    구독 조건 파싱 (설비 ID 는 문자열 또는 목록, 기간은 ISO 8601), 형식 오류 시 ValueError
+    기간의 시간대(Z, +09:00 등)는 배치 시각과 같은 로컬 naive datetime 으로 변환
+    """
+    if isinstance(equipment_ids, str):
+        equipment_ids = [equipment_ids]
+    return SubscriptionFilter(
+        equipment_ids=frozenset(equipment_ids) if equipment_ids else None,
+        start=_parse_time(start) if start else None,
+        end=_parse_time(end) if end else None,
+    )
+
+
+def _parse_time(value: str) -> datetime:
+    parsed = datetime.fromisoformat(value.replace('Z', '+00:00'))
+    if parsed.tzinfo is not None:
+        parsed = parsed.astimezone().replace(tzinfo=None)
+    return parsed
+
+
+def batch_fields(batch, product_name: Optional[str] = None) -> Dict:
+    """생성 변경의 필드 - /api/schedule 배치 항목(BatchSchedule)과 같은 스키마"""
+    return {
+        'id': batch.id,
+        'product_id': batch.product_id,
+        'product_name': product_name or batch.product_id,
+        'equipment_id': batch.equipment_id,
+        'process_name': batch.process_name or "",
+        'start_time': batch.start_time,
+        'end_time': batch.end_time,
+        'lot_number': batch.lot_number,
+        'quantity': batch.quantity,
+        'status': batch.status,
+    }
+
+
+broadcaster = ScheduleBroadcaster()
@@ -0,0 +1,159 @@
+# Schedule export - DB 배치를 서버 측 커서로 읽어 CSV / XLSX(write-only) / Parquet 로 스트리밍
+import codecs
+import csv
+import io
+import os
+import tempfile
+from datetime import datetime
+from typing import Iterable, Iterator, Optional
+
+from sqlalchemy.orm import Session
+
+from models import Batch, Equipment
+from schedule_queries import schedule_window_query
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:  # optional dependency (Parquet 내보내기에만 필요)
+    pa = pq = None
+
+DEFAULT_FETCH_SIZE = 5000
+FILE_CHUNK_SIZE = 1024 * 1024  # 임시 파일 → 응답 전송 단위
+XLSX_MAX_ROWS = 1048576        # Excel 시트 최대 행 수 (헤더 포함) - 넘으면 다음 시트로 이어서 기록
+
+# 내보내기 컬럼 (헤더 = 컬럼명)
+EXPORT_COLUMNS = (
+    'lot_number', 'product_id', 'product_name', 'equipment_id', 'equipment_name',
+    'process_name', 'start_time', 'end_time', 'quantity', 'status'
+)
+
+EXPORT_FORMATS = {
+    # format: (확장자, media type)
+    'csv': ('csv', 'text/csv; charset=utf-8'),
+    'excel': ('xlsx', 'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet'),
+    'parquet': ('parquet', 'application/vnd.apache.parquet'),
+}
+
+
+def check_format(format: str) -> str:
+    """내보내기 형식 확인, 지원하지 않거나 선택 의존성이 없으면 ValueError"""
+    if format not in EXPORT_FORMATS:
+        raise ValueError(f"Unsupported export format '{format}' (allowed: {', '.join(EXPORT_FORMATS)})")
+    if format == 'parquet' and pq is None:
+        raise ValueError("Parquet export requires the optional 'pyarrow' package")
+    return format
+
+
+def export_filename(format: str, now: Optional[datetime] = None) -> str:
+    extension = EXPORT_FORMATS[format][0]
+    return f"schedule_{(now or datetime.now()).strftime('%Y%m%d')}.{extension}"
+
+
+def iter_export_rows(db: Session, start: Optional[datetime] = None, end: Optional[datetime] = None,
+                     equipment_ids: Optional[Iterable[str]] = None, product_id: Optional[str] = None,
+                     fetch_size: int = DEFAULT_FETCH_SIZE) -> Iterator[tuple]:
+    """기간/설비/제품 조건의 배치를 제품명/설비명과 함께 EXPORT_COLUMNS 순서 튜플로 반환 (서버 측 커서)"""
+    query = (
+        schedule_window_query(db, start, end, equipment_ids, product_id)
+        .outerjoin(Equipment, Batch.equipment_id == Equipment.id)
+        .add_columns(Equipment.name.label('equipment_name'))
+        .execution_options(stream_results=True)
+        .yield_per(fetch_size)
+    )
+    for row in query:
+        yield (
+            row.lot_number, row.product_id, row.product_name or row.product_id,
+            row.equipment_id, row.equipment_name or row.equipment_id,
+            row.process_name or "", row.start_time, row.end_time, row.quantity, row.status
+        )
+
+
+def iter_csv(rows: Iterable[tuple], fetch_size: int = DEFAULT_FETCH_SIZE) -> Iterator[bytes]:
+    """CSV 스트림 (Excel 에서 한글이 깨지지 않도록 UTF-8 BOM), fetch_size 행씩 인코딩해 반환"""
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(EXPORT_COLUMNS)
+    yield codecs.BOM_UTF8 + buffer.getvalue().encode("utf-8")
+    buffer.seek(0)
+    buffer.truncate()
+
+    pending = 0
+    for row in rows:
+        writer.writerow(row)
+        pending += 1
+        if pending >= fetch_size:
+            yield buffer.getvalue().encode("utf-8")
+            buffer.seek(0)
+            buffer.truncate()
+            pending = 0
+    if pending:
+        yield buffer.getvalue().encode("utf-8")
+
+
+def _write_xlsx(rows: Iterable[tuple], path: str, max_rows: int = XLSX_MAX_ROWS):
+    from openpyxl import Workbook
+
+    # write-only 모드: 행을 바로 시트 XML(임시 파일)로 기록해 메모리 사용량이 행 수와 무관
+    # 시트가 max_rows 에 차면 "Schedule (2)", "Schedule (3)" ... 에 헤더부터 다시 기록
+    workbook = Workbook(write_only=True)
+    sheet = workbook.create_sheet("Schedule")
+    sheet.append(EXPORT_COLUMNS)
+    written = 1
+    for row in rows:
+        if written >= max_rows:
+            sheet = workbook.create_sheet(f"Schedule ({len(workbook.worksheets) + 1})")
+            sheet.append(EXPORT_COLUMNS)
+            written = 1
+        sheet.append(row)
+        written += 1
+    workbook.save(path)
+
+
+def _write_parquet(rows: Iterable[tuple], path: str, fetch_size: int):
+    schema = pa.schema([
+        ('lot_number', pa.string()), ('product_id', pa.string()), ('product_name', pa.string()),
+        ('equipment_id', pa.string()), ('equipment_name', pa.string()), ('process_name', pa.string()),
+        ('start_time', pa.timestamp('s')), ('end_time', pa.timestamp('s')),
+        ('quantity', pa.int64()), ('status', pa.string()),
+    ])
+    with pq.ParquetWriter(path, schema) as writer:
+        chunk = []
+        for row in rows:
+            chunk.append(row)
+            if len(chunk) >= fetch_size:
+                writer.write_batch(pa.RecordBatch.from_arrays(list(map(list, zip(*chunk))), schema=schema))
+                chunk = []
+        if chunk:
+            writer.write_batch(pa.RecordBatch.from_arrays(list(map(list, zip(*chunk))), schema=schema))
+
+
+def iter_export_file(rows: Iterable[tuple], format: str, fetch_size: int = DEFAULT_FETCH_SIZE,
+                     xlsx_max_rows: int = XLSX_MAX_ROWS) -> Iterator[bytes]:
+    """
+    XLSX/Parquet 스트림 - 컨테이너(zip 디렉터리, parquet footer)가 끝에 기록되므로
+    비공개 임시 파일에 행 그룹 단위로 쓴 뒤 청크로 전송하고 삭제 (응답 하나당 임시 파일 하나)
+    XLSX 는 시트당 xlsx_max_rows 행(헤더 포함)을 넘지 않도록 여러 시트로 나눔
+    """
+    fd, path = tempfile.mkstemp(prefix="schedule_export_", suffix=f".{EXPORT_FORMATS[format][0]}")
+    os.close(fd)
+    try:
+        if format == 'excel':
+            _write_xlsx(rows, path, xlsx_max_rows)
+        else:
+            _write_parquet(rows, path, fetch_size)
+        with open(path, "rb") as exported:
+            while True:
+                chunk = exported.read(FILE_CHUNK_SIZE)
+                if not chunk:
+                    break
+                yield chunk
+    finally:
+        os.remove(path)
+
+
+def iter_export(rows: Iterable[tuple], format: str, fetch_size: int = DEFAULT_FETCH_SIZE) -> Iterator[bytes]:
+    """형식별 내보내기 바이트 스트림"""
+    if format == 'csv':
+        return iter_csv(rows, fetch_size)
+    return iter_export_file(rows, check_format(format), fetch_size)
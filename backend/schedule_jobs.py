@@ -0,0 +1,257 @@
+# Schedule jobs - 스케줄 생성을 백그라운드 작업으로 실행 (제한된 워커 풀, 진행 상황 조회, 협조적 취소, 승인 제어)
+import os
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from datetime import datetime
+from typing import Callable, Dict, List, Optional
+
+from sqlalchemy.orm import Session
+
+from batch_persistence import KEY_CHUNK_SIZE, persist_batches
+from models import Batch, SalesPlan
+from scheduler_service import GenerationCancelled, SchedulerService
+
+# 동시 실행 작업 수 / 실행 대기 가능한 작업 수 / 완료 후 보관하는 작업 수
+JOB_WORKERS = int(os.getenv("SCHEDULE_JOB_WORKERS", 2))
+JOB_QUEUE_SIZE = int(os.getenv("SCHEDULE_JOB_QUEUE", 8))
+JOB_RETAIN = int(os.getenv("SCHEDULE_JOB_RETAIN", 100))
+
+QUEUED, RUNNING, SUCCEEDED, FAILED, CANCELLED = 'queued', 'running', 'succeeded', 'failed', 'cancelled'
+FINISHED_STATES = (SUCCEEDED, FAILED, CANCELLED)
+
+
+class JobQueueFull(Exception):
+    """실행 중 + 대기 작업이 용량을 넘어 새 작업을 받을 수 없음"""
+
+
+class JobConflict(Exception):
+    """같은(또는 겹치는) schedule_id 를 교체하는 작업이 이미 대기/실행 중 (job = 그 작업)"""
+
+    def __init__(self, job: "GenerationJob"):
+        super().__init__(f"Schedule job {job.id} for {job.schedule_id} is already {job.status}")
+        self.job = job
+
+
+@dataclass
+class GenerationJob:
+    """
+    스케줄 생성 작업 1건
+    year/month 가 없으면 전체 판매계획 대상
+    결과 배치는 같은 schedule_id 와 대상 판매계획의 기존 배치(다른 schedule_id 포함)를 교체해 저장
+    """
+    id: str
+    year: Optional[int] = None
+    month: Optional[int] = None
+    engine: Optional[str] = None
+    search_days: Optional[int] = None
+    status: str = QUEUED
+    created_at: datetime = field(default_factory=datetime.utcnow)
+    started_at: Optional[datetime] = None
+    finished_at: Optional[datetime] = None
+    plans_total: Optional[int] = None
+    result: Optional[Dict] = None
+    error: Optional[str] = None
+    service: Optional[SchedulerService] = field(default=None, repr=False)
+    cancel_event: threading.Event = field(default_factory=threading.Event, repr=False)
+
+    @property
+    def schedule_id(self) -> str:
+        if self.year is None or self.month is None:
+            return "generated-all"
+        return f"generated-{self.year}-{self.month:02d}"
+
+    def overlaps(self, other: "GenerationJob") -> bool:
+        """두 작업이 같은 배치 집합을 교체하는지 (전체 대상 작업은 모든 월 작업과 겹침)"""
+        return (self.schedule_id == other.schedule_id
+                or "generated-all" in (self.schedule_id, other.schedule_id))
+
+    def to_dict(self) -> Dict:
+        """상태 조회 응답 - 진행 상황은 실행 중인 SchedulerService.run_stats 에서 읽음"""
+        stats = self.service.run_stats if self.service is not None else {}
+        return {
+            'job_id': self.id,
+            'status': self.status,
+            'year': self.year,
+            'month': self.month,
+            'schedule_id': self.schedule_id,
+            'cancel_requested': self.cancel_event.is_set(),
+            'created_at': self.created_at,
+            'started_at': self.started_at,
+            'finished_at': self.finished_at,
+            'progress': {
+                'plans_total': self.plans_total,
+                'plans_processed': stats.get('plans_processed', 0),
+                'batches_placed': stats.get('batches_placed', 0),
+                'unscheduled_steps': stats.get('unscheduled_steps', 0),
+            },
+            'result': self.result,
+            'error': self.error,
+        }
+
+
+class GenerationJobQueue:
+    """
+    스케줄 생성 작업 큐
+    - 최대 max_workers 개 작업을 스레드 풀에서 동시에 실행, max_queued 개까지 대기
+    - 용량 초과 시 submit 에서 JobQueueFull (API 는 429 로 응답)
+    - 같은 schedule_id 를 교체하는 작업이 이미 대기/실행 중이면 JobConflict (API 는 409 로 응답)
+      - 교체 저장(schedule_id 삭제 후 삽입)이 서로 엇갈리지 않도록 schedule_id 당 한 작업만 허용
+    - 배치는 유지되는 저장 배치의 설비 점유 위에 놓음 - 점유 조회부터 커밋까지는 작업 간 직렬화
+      (동시에 배치하면 서로의 결과를 모르고 같은 설비 구간에 겹쳐 놓게 됨)
+    - cancel 은 대기 중이면 즉시, 실행 중이면 판매계획 단위로 확인해 중단 (저장 전까지)
+    """
+
+    def __init__(self, session_factory: Callable[[], Session], max_workers: int = JOB_WORKERS,
+                 max_queued: int = JOB_QUEUE_SIZE, retain: int = JOB_RETAIN,
+                 on_success: Optional[Callable[[GenerationJob, List[Batch], List], None]] = None,
+                 master_data=None, on_finish: Optional[Callable[[GenerationJob], None]] = None):
+        if max_workers < 1 or max_queued < 0:
+            raise ValueError("max_workers must be positive and max_queued non-negative")
+        self.session_factory = session_factory
+        self.capacity = max_workers + max_queued
+        self.retain = retain
+        # 저장 완료 후 워커 스레드에서 (작업, 저장한 배치, 교체된 배치 행) 으로 호출 (캐시 무효화, 변경 알림 등)
+        self.on_success = on_success
+        self.master_data = master_data  # MasterDataCache - 작업마다 라우팅을 다시 조회하지 않음
+        # 작업이 끝날 때마다 (성공/실패/취소, 대기 중 취소 포함) 큐 잠금 아래에서 호출 - 지표 집계 등 가벼운 처리만
+        self.on_finish = on_finish
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="schedule-job")
+        self._jobs: "OrderedDict[str, GenerationJob]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._placement_lock = threading.Lock()  # 기존 점유 조회 → 배치 → 저장/커밋 구간
+
+    def active_count(self) -> int:
+        with self._lock:
+            return sum(1 for job in self._jobs.values() if job.status not in FINISHED_STATES)
+
+    def submit(self, year: Optional[int] = None, month: Optional[int] = None,
+               engine: Optional[str] = None, search_days: Optional[int] = None) -> GenerationJob:
+        """작업 등록 후 즉시 반환 (용량 초과 시 JobQueueFull)"""
+        if engine is not None and engine not in SchedulerService.OCCUPANCY_ENGINES:
+            raise ValueError(f"Unknown scheduling engine: {engine}")
+        job = GenerationJob(id=uuid.uuid4().hex, year=year, month=month, engine=engine, search_days=search_days)
+        with self._lock:
+            active = [queued for queued in self._jobs.values() if queued.status not in FINISHED_STATES]
+            for queued in active:
+                if queued.overlaps(job):
+                    raise JobConflict(queued)
+            if len(active) >= self.capacity:
+                raise JobQueueFull(f"{len(active)} schedule jobs already queued or running")
+            self._jobs[job.id] = job
+            self._prune()
+        self._executor.submit(self._run, job)
+        return job
+
+    def get(self, job_id: str) -> Optional[GenerationJob]:
+        with self._lock:
+            return self._jobs.get(job_id)
+
+    def cancel(self, job_id: str) -> Optional[GenerationJob]:
+        """취소 요청 (이미 끝난 작업은 상태 그대로 반환)"""
+        with self._lock:
+            job = self._jobs.get(job_id)
+            if job is None or job.status in FINISHED_STATES:
+                return job
+            job.cancel_event.set()
+            if job.status == QUEUED:
+                self._finish(job, CANCELLED)
+        return job
+
+    def shutdown(self, wait: bool = True):
+        """대기 작업 취소, 실행 중 작업에 취소 요청 후 워커 종료"""
+        with self._lock:
+            for job in self._jobs.values():
+                if job.status not in FINISHED_STATES:
+                    job.cancel_event.set()
+                    if job.status == QUEUED:
+                        self._finish(job, CANCELLED)
+        self._executor.shutdown(wait=wait)
+
+    def _prune(self):
+        # 완료된 작업을 오래된 순으로 정리 (실행 중/대기 작업은 유지)
+        finished = [job_id for job_id, job in self._jobs.items() if job.status in FINISHED_STATES]
+        for job_id in finished[:max(0, len(finished) - self.retain)]:
+            del self._jobs[job_id]
+
+    def _finish(self, job: GenerationJob, status: str, error: Optional[str] = None):
+        job.status = status
+        job.error = error
+        job.finished_at = datetime.utcnow()
+        if self.on_finish is not None:
+            self.on_finish(job)
+
+    def _run(self, job: GenerationJob):
+        with self._lock:
+            if job.status != QUEUED:  # 대기 중 취소됨
+                return
+            job.status = RUNNING
+            job.started_at = datetime.utcnow()
+
+        db = self.session_factory()
+        try:
+            started = time.perf_counter()
+            query = db.query(SalesPlan)
+            if job.year is not None and job.month is not None:
+                query = query.filter(SalesPlan.year == job.year, SalesPlan.month == job.month)
+            sales_plans = query.all()
+            job.plans_total = len(sales_plans)
+            plan_ids = [plan.id for plan in sales_plans]
+
+            job.service = SchedulerService(db, search_days=job.search_days, master_data=self.master_data)
+            with self._placement_lock:
+                replaced = self._replaced_batches(db, job.schedule_id, plan_ids)
+                batches = job.service.generate_schedule_from_sales(
+                    sales_plans, engine=job.engine, should_stop=job.cancel_event.is_set,
+                    reserved=self._reserved_batches(db, job.service, sales_plans, {row.id for row in replaced})
+                )
+                if job.cancel_event.is_set():
+                    raise GenerationCancelled("Cancelled before saving")
+
+                saved = persist_batches(db, batches, schedule_id=job.schedule_id, replace=True,
+                                        replace_sales_plans=plan_ids)
+                db.commit()
+            job.result = {
+                'batches_created': saved['inserted'],
+                'batches_replaced': saved['deleted'],
+                'elapsed_seconds': time.perf_counter() - started,
+            }
+            status, error = SUCCEEDED, None
+        except GenerationCancelled as e:
+            db.rollback()
+            status, error = CANCELLED, str(e)
+        except Exception as e:
+            db.rollback()
+            status, error = FAILED, str(e)
+        finally:
+            db.close()
+
+        with self._lock:
+            self._finish(job, status, error)
+        if status == SUCCEEDED and self.on_success is not None:
+            self.on_success(job, batches, replaced)
+
+    @staticmethod
+    def _replaced_batches(db: Session, schedule_id: str, plan_ids: List[str]) -> List:
+        """교체될 기존 배치 위치 - 같은 schedule_id 이거나 대상 판매계획의 배치 (변경 알림/점유 제외용)"""
+        columns = (Batch.id, Batch.equipment_id, Batch.start_time, Batch.end_time)
+        rows = {row.id: row for row in db.query(*columns).filter(Batch.schedule_id == schedule_id)}
+        for index in range(0, len(plan_ids), KEY_CHUNK_SIZE):
+            chunk = plan_ids[index:index + KEY_CHUNK_SIZE]
+            rows.update((row.id, row) for row in db.query(*columns).filter(Batch.sales_plan_id.in_(chunk)))
+        return list(rows.values())
+
+    @staticmethod
+    def _reserved_batches(db: Session, service: SchedulerService, sales_plans: List[SalesPlan],
+                          replaced_ids: set) -> List:
+        """생성 구간에 걸치는 유지 배치의 (설비 ID, 시작, 종료)"""
+        if not sales_plans:
+            return []
+        window_start, window_end = service.planning_window(sales_plans)
+        rows = db.query(Batch.id, Batch.equipment_id, Batch.start_time, Batch.end_time).filter(
+            Batch.start_time < window_end, Batch.end_time > window_start
+        )
+        return [(row.equipment_id, row.start_time, row.end_time) for row in rows if row.id not in replaced_ids]
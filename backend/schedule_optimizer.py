@@ -0,0 +1,212 @@
+# Schedule optimizer - 셋업 시간 최소화 + 유휴 구간 압축 anytime 지역 탐색
+import heapq
+import random
+import time
+from collections import deque
+from typing import Callable, Dict, List, Optional, Sequence, Tuple
+
+
+class SlotJob:
+    """최적화 대상 배치 1건 (슬롯 단위, start_order = 현재 스케줄의 시작시각 순위)"""
+    __slots__ = ('index', 'equipment_id', 'product_id', 'run_slots', 'setup_slots',
+                 'setup_hours', 'release', 'lot_predecessors', 'start_order')
+
+    def __init__(self, index: int, equipment_id: str, product_id: str, run_slots: int,
+                 setup_slots: int, setup_hours: float, release: int):
+        self.index = index
+        self.equipment_id = equipment_id
+        self.product_id = product_id
+        self.run_slots = run_slots
+        self.setup_slots = setup_slots
+        self.setup_hours = setup_hours
+        self.release = release
+        self.lot_predecessors: List[int] = []
+        self.start_order = index
+
+
+class ScheduleOptimizer:
+    """
+    설비별 작업 순서를 해(solution)로 보는 지역 탐색
+    - 디코더: 순서를 받아 로트 선후행/설비 순서를 지키며 가장 이른 슬롯에 배치 (유휴 구간 자동 압축)
+              같은 설비에서 직전 배치와 제품이 같으면 셋업 생략
+    - 목적함수: (makespan 슬롯, 총 셋업 시간) 사전식 최소화
+    - 이동: 같은 제품 배치 옆으로 재배치(그룹화), 인접 교환
+    초기 순서가 로트 선후행과 순환하면 선후행을 지키는 순서(precedence_order)에서 시작
+    시간 예산 안에서 찾은 가장 좋은 해를 항상 유지
+    """
+
+    def __init__(self, jobs: Sequence[SlotJob], sequences: Dict[str, List[int]], seed: int = 0):
+        self.jobs = list(jobs)
+        self.initial = {equipment_id: list(order) for equipment_id, order in sequences.items()}
+        self.rng = random.Random(seed)
+        self.iterations = 0
+
+    def decode(self, sequences: Dict[str, List[int]]) -> Optional[Tuple[List[int], List[int], float]]:
+        """순서 → (시작 슬롯, 종료 슬롯, 총 셋업 시간). 선후행과 설비 순서가 순환하면 None"""
+        n = len(self.jobs)
+        equipment_prev = [-1] * n
+        equipment_next = [-1] * n
+        for order in sequences.values():
+            for a, b in zip(order, order[1:]):
+                equipment_prev[b] = a
+                equipment_next[a] = b
+
+        successors: List[List[int]] = [[] for _ in range(n)]
+        indegree = [0] * n
+        for job in self.jobs:
+            for predecessor in job.lot_predecessors:
+                successors[predecessor].append(job.index)
+            indegree[job.index] = len(job.lot_predecessors) + (equipment_prev[job.index] >= 0)
+
+        starts = [0] * n
+        ends = [0] * n
+        setup_hours = 0.0
+        ready = deque(i for i in range(n) if indegree[i] == 0)
+        done = 0
+        while ready:
+            i = ready.popleft()
+            job = self.jobs[i]
+            previous = equipment_prev[i]
+            start = job.release
+            if previous >= 0:
+                start = max(start, ends[previous])
+            for predecessor in job.lot_predecessors:
+                start = max(start, ends[predecessor])
+
+            length = job.run_slots
+            if previous < 0 or self.jobs[previous].product_id != job.product_id:
+                length += job.setup_slots
+                setup_hours += job.setup_hours
+            starts[i] = start
+            ends[i] = start + length
+            done += 1
+
+            following = equipment_next[i]
+            if following >= 0:
+                indegree[following] -= 1
+                if indegree[following] == 0:
+                    ready.append(following)
+            for successor in successors[i]:
+                indegree[successor] -= 1
+                if indegree[successor] == 0:
+                    ready.append(successor)
+
+        if done < n:
+            return None
+        return starts, ends, setup_hours
+
+    def setup_hours(self, sequences: Dict[str, List[int]]) -> float:
+        """순서상 제품이 바뀌는(또는 설비 첫) 배치의 셋업 시간 합계"""
+        total = 0.0
+        for order in sequences.values():
+            previous = None
+            for i in order:
+                if previous is None or self.jobs[previous].product_id != self.jobs[i].product_id:
+                    total += self.jobs[i].setup_hours
+                previous = i
+        return total
+
+    def _objective(self, decoded) -> Tuple[int, float]:
+        starts, ends, setup_hours = decoded
+        return (max(ends) if ends else 0, round(setup_hours, 6))
+
+    def grouped(self, sequences: Dict[str, List[int]]) -> Dict[str, List[int]]:
+        """같은 출고 기준일 안에서 제품별로 묶은 순서 (첫 등장 순서 유지)"""
+        result = {}
+        for equipment_id, order in sequences.items():
+            first_seen = {}
+            for position, i in enumerate(order):
+                first_seen.setdefault((self.jobs[i].release, self.jobs[i].product_id), position)
+            result[equipment_id] = sorted(
+                order, key=lambda i: (self.jobs[i].release, first_seen[(self.jobs[i].release, self.jobs[i].product_id)])
+            )
+        return result
+
+    def precedence_order(self, sequences: Dict[str, List[int]]) -> Optional[Dict[str, List[int]]]:
+        """
+        로트 선후행을 지키는 설비별 순서 - 선후행 위상 정렬(Kahn)에서 준비된 배치 중 시작시각이 이른 것부터
+        모든 설비 순서가 하나의 위상 순서를 따르므로 순환이 없음. 로트 선후행 자체가 순환하면 None
+        """
+        equipment_of = {i: equipment_id for equipment_id, order in sequences.items() for i in order}
+        successors: List[List[int]] = [[] for _ in self.jobs]
+        indegree = [len(job.lot_predecessors) for job in self.jobs]
+        for job in self.jobs:
+            for predecessor in job.lot_predecessors:
+                successors[predecessor].append(job.index)
+
+        result = {equipment_id: [] for equipment_id in sequences}
+        ready = [(job.start_order, job.index) for job in self.jobs if indegree[job.index] == 0]
+        heapq.heapify(ready)
+        done = 0
+        while ready:
+            _, i = heapq.heappop(ready)
+            done += 1
+            if i in equipment_of:
+                result[equipment_of[i]].append(i)
+            for successor in successors[i]:
+                indegree[successor] -= 1
+                if indegree[successor] == 0:
+                    heapq.heappush(ready, (self.jobs[successor].start_order, successor))
+        return result if done == len(self.jobs) else None
+
+    def _neighbour(self, sequences: Dict[str, List[int]]) -> Optional[Dict[str, List[int]]]:
+        candidates = [equipment_id for equipment_id, order in sequences.items() if len(order) > 1]
+        if not candidates:
+            return None
+        equipment_id = self.rng.choice(candidates)
+        order = list(sequences[equipment_id])
+        position = self.rng.randrange(len(order))
+        job = self.jobs[order[position]]
+
+        same_product = [p for p, i in enumerate(order)
+                        if p != position and self.jobs[i].product_id == job.product_id]
+        if same_product and self.rng.random() < 0.7:
+            # 같은 제품 배치 바로 뒤로 이동 - 셋업 생략 유도
+            target = self.rng.choice(same_product)
+            item = order.pop(position)
+            order.insert(target + 1 if target < position else target, item)
+        else:
+            other = position + 1 if position + 1 < len(order) else position - 1
+            order[position], order[other] = order[other], order[position]
+
+        neighbour = dict(sequences)
+        neighbour[equipment_id] = order
+        return neighbour
+
+    def _best_of(self, *candidates: Dict[str, List[int]]) -> Tuple[Optional[Dict[str, List[int]]], Optional[Tuple]]:
+        best, best_decoded = None, None
+        for candidate in candidates:
+            decoded = self.decode(candidate)
+            if decoded is not None and (best is None or self._objective(decoded) < self._objective(best_decoded)):
+                best, best_decoded = candidate, decoded
+        return best, best_decoded
+
+    def run(self, time_budget_seconds: float,
+            should_stop: Optional[Callable[[], bool]] = None) -> Tuple[Dict[str, List[int]], Tuple]:
+        """시간 예산 동안 탐색 후 (최적 순서, 디코딩 결과) 반환"""
+        deadline = time.perf_counter() + max(0.0, time_budget_seconds)
+
+        best, best_decoded = self._best_of(self.initial, self.grouped(self.initial))
+        if best is None:
+            # 초기 순서가 선후행과 순환 - 선후행을 지키는 순서에서 시작
+            fallback = self.precedence_order(self.initial)
+            if fallback is None:
+                raise ValueError("Lot process sequence is cyclic")
+            best, best_decoded = self._best_of(fallback, self.grouped(fallback))
+
+        current, current_objective = best, self._objective(best_decoded)
+        while time.perf_counter() < deadline and not (should_stop and should_stop()):
+            self.iterations += 1
+            neighbour = self._neighbour(current)
+            if neighbour is None:
+                break
+            decoded = self.decode(neighbour)
+            if decoded is None:
+                continue
+            objective = self._objective(decoded)
+            if objective <= current_objective:
+                current, current_objective = neighbour, objective
+                if objective < self._objective(best_decoded):
+                    best, best_decoded = neighbour, decoded
+
+        return best, best_decoded
@@ -0,0 +1,137 @@
+# Schedule queries - 기간/설비/제품 조건을 인덱스 범위 조회로 내려보내고 keyset(커서) 페이지네이션 제공
+import base64
+import os
+from datetime import datetime, timedelta
+from typing import Iterable, Iterator, List, Optional, Tuple
+
+from sqlalchemy import tuple_
+from sqlalchemy.orm import Query, Session
+
+from fast_json import dumps
+from models import Batch, Product
+
+# 배치 최대 길이 - 기간 조회 시 start_time 하한(start - 최대 길이)을 두어 인덱스 범위를 좁힘
+# 이보다 긴 배치는 일괄 저장(persist_batches)과 API 수정 모두에서 거부 - 조회에서 빠지는 배치가 없도록
+MAX_BATCH_DURATION = timedelta(days=int(os.getenv("MAX_BATCH_DAYS", 7)))
+
+# 조회 컬럼 (ORM 객체 생성 없이 행 단위로 반환)
+SCHEDULE_COLUMNS = (
+    Batch.id,
+    Batch.product_id,
+    Product.name.label('product_name'),
+    Batch.equipment_id,
+    Batch.process_name,
+    Batch.start_time,
+    Batch.end_time,
+    Batch.lot_number,
+    Batch.quantity,
+    Batch.status,
+)
+
+
+def schedule_window_query(db: Session, start: Optional[datetime] = None, end: Optional[datetime] = None,
+                          equipment_ids: Optional[Iterable[str]] = None,
+                          product_id: Optional[str] = None) -> Query:
+    """
+    [start, end) 와 겹치는 배치 조회 (시작시각, ID 순)
+    설비 조건이 있으면 (equipment_id, start_time, end_time), 제품 조건이 있으면 (product_id, start_time) 인덱스 사용
+    """
+    query = db.query(*SCHEDULE_COLUMNS).outerjoin(Product, Batch.product_id == Product.id)
+    if start is not None:
+        query = query.filter(Batch.end_time > start, Batch.start_time >= start - MAX_BATCH_DURATION)
+    if end is not None:
+        query = query.filter(Batch.start_time < end)
+    if equipment_ids:
+        query = query.filter(Batch.equipment_id.in_(list(equipment_ids)))
+    if product_id is not None:
+        query = query.filter(Batch.product_id == product_id)
+    return query.order_by(Batch.start_time, Batch.id)
+
+
+def encode_cursor(start_time: datetime, batch_id: str) -> str:
+    """마지막 행의 (시작시각, ID) → 불투명 커서 문자열"""
+    raw = f"{start_time.isoformat()}|{batch_id}".encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str) -> Tuple[datetime, str]:
+    """커서 문자열 → (시작시각, ID), 형식이 잘못되면 ValueError"""
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)).decode()
+        start_time, batch_id = raw.split("|", 1)
+        return datetime.fromisoformat(start_time), batch_id
+    except (ValueError, UnicodeDecodeError) as e:
+        raise ValueError(f"Invalid cursor: {cursor!r}") from e
+
+
+def fetch_schedule_page(db: Session, start: Optional[datetime] = None, end: Optional[datetime] = None,
+                        equipment_ids: Optional[Iterable[str]] = None, product_id: Optional[str] = None,
+                        limit: int = 1000, cursor: Optional[str] = None) -> Tuple[List, Optional[str]]:
+    """
+    keyset 페이지 조회 - 커서 이후 limit 건과 다음 페이지 커서(마지막 페이지면 None)
+    OFFSET 없이 (start_time, id) > 커서 조건으로 이어 읽으므로 페이지 위치와 무관하게 비용이 일정
+    """
+    query = schedule_window_query(db, start, end, equipment_ids, product_id)
+    if cursor is not None:
+        after_start, after_id = decode_cursor(cursor)
+        query = query.filter(tuple_(Batch.start_time, Batch.id) > tuple_(after_start, after_id))
+
+    rows = query.limit(limit + 1).all()
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        next_cursor = encode_cursor(rows[-1].start_time, rows[-1].id)
+    return rows, next_cursor
+
+
+def schedule_row_dict(row) -> dict:
+    """조회 행 → /api/schedule 배치 항목(BatchSchedule)과 같은 스키마의 dict (시각은 datetime 그대로)"""
+    return {
+        'id': row.id,
+        'product_id': row.product_id,
+        'product_name': row.product_name or row.product_id,
+        'equipment_id': row.equipment_id,
+        'process_name': row.process_name or "",
+        'start_time': row.start_time,
+        'end_time': row.end_time,
+        'lot_number': row.lot_number,
+        'quantity': row.quantity,
+        'status': row.status,
+    }
+
+
+def schedule_summary(rows) -> dict:
+    """배치 수 / 제품 수 / 설비 수"""
+    return {
+        'total_batches': len(rows),
+        'total_products': len({row.product_id for row in rows}),
+        'total_equipment': len({row.equipment_id for row in rows}),
+    }
+
+
+def iter_schedule_ndjson(db: Session, start: Optional[datetime] = None, end: Optional[datetime] = None,
+                         equipment_ids: Optional[Iterable[str]] = None, product_id: Optional[str] = None,
+                         fetch_size: int = 1000) -> Iterator[bytes]:
+    """
+    배치를 NDJSON 으로 스트리밍 - 한 줄에 배치 1건, 마지막 줄은 {"summary": {...}}
+    서버 측 커서(stream_results + yield_per)로 fetch_size 행씩 읽어 바로 내보내며
+    요약은 같은 순회에서 계산하므로 메모리 사용량이 스케줄 크기와 무관
+    """
+    query = schedule_window_query(db, start, end, equipment_ids, product_id)
+    query = query.execution_options(stream_results=True).yield_per(fetch_size)
+
+    total = 0
+    products, equipment = set(), set()
+    lines = []
+    for row in query:
+        total += 1
+        products.add(row.product_id)
+        equipment.add(row.equipment_id)
+        lines.append(dumps(schedule_row_dict(row)))
+        if len(lines) >= fetch_size:
+            yield b"\n".join(lines) + b"\n"
+            lines = []
+
+    summary = {'total_batches': total, 'total_products': len(products), 'total_equipment': len(equipment)}
+    lines.append(dumps({'summary': summary}))
+    yield b"\n".join(lines) + b"\n"
@@ -0,0 +1,315 @@
+# Incremental schedule repair - 배치 이동/삭제 시 영향받는 설비 타임라인과 후속 공정만 재배치
+import heapq
+from bisect import bisect_left, insort
+from datetime import datetime, timedelta
+from typing import Dict, Iterable, List, Optional
+
+
+class TimelineEntry:
+    """타임라인 상의 배치 1건 (lot_id = 판매계획 ID, sequence = 공정 순서)"""
+    __slots__ = ('id', 'equipment_id', 'start', 'end', 'lot_id', 'sequence')
+
+    def __init__(self, id: str, equipment_id: str, start: datetime, end: datetime,
+                 lot_id: Optional[str] = None, sequence: Optional[int] = None):
+        self.id = id
+        self.equipment_id = equipment_id
+        self.start = start
+        self.end = end
+        self.lot_id = lot_id
+        self.sequence = sequence
+
+    def to_dict(self) -> Dict:
+        return {
+            'id': self.id,
+            'equipment_id': self.equipment_id,
+            'start_time': self.start.isoformat(),
+            'end_time': self.end.isoformat()
+        }
+
+
+class BatchTimeline:
+    """
+    배치 타임라인 인덱스
+    - 설비별 시작시각 정렬 목록 (이진 탐색으로 구간 겹침 조회, 건별 이동은 리스트 삽입/삭제라 O(설비 배치 수))
+    - 로트별 공정 순서 목록 (후속 공정 조회)
+    """
+
+    def __init__(self, entries: Iterable[TimelineEntry] = ()):
+        self._entries: Dict[str, TimelineEntry] = {}
+        self._equipment: Dict[str, list] = {}  # {equipment_id: [(start, id), ...]} 정렬 유지
+        self._max_duration: Dict[str, float] = {}  # 설비별 최장 배치 길이 - 역방향 탐색 범위
+        self._lots: Dict[str, Dict[int, List[str]]] = {}  # {lot_id: {sequence: [id, ...]}}
+
+        # 초기 적재는 한 번에 정렬 (건별 insort 대신)
+        for entry in entries:
+            self._entries[entry.id] = entry
+            self._equipment.setdefault(entry.equipment_id, []).append((entry.start, entry.id))
+            duration = (entry.end - entry.start).total_seconds()
+            if duration > self._max_duration.get(entry.equipment_id, 0):
+                self._max_duration[entry.equipment_id] = duration
+            if entry.lot_id is not None:
+                self._lots.setdefault(entry.lot_id, {}).setdefault(entry.sequence or 0, []).append(entry.id)
+        for timeline in self._equipment.values():
+            timeline.sort()
+
+    def __len__(self):
+        return len(self._entries)
+
+    def __contains__(self, batch_id):
+        return batch_id in self._entries
+
+    def get(self, batch_id: str) -> Optional[TimelineEntry]:
+        return self._entries.get(batch_id)
+
+    def entries(self) -> Iterable[TimelineEntry]:
+        return self._entries.values()
+
+    def add(self, entry: TimelineEntry):
+        self._entries[entry.id] = entry
+        self._index(entry)
+        if entry.lot_id is not None:
+            self._lots.setdefault(entry.lot_id, {}).setdefault(entry.sequence or 0, []).append(entry.id)
+
+    def remove(self, batch_id: str) -> Optional[TimelineEntry]:
+        entry = self._entries.pop(batch_id, None)
+        if entry is None:
+            return None
+        self._unindex(entry)
+        if entry.lot_id is not None:
+            lot = self._lots[entry.lot_id]
+            steps = lot[entry.sequence or 0]
+            steps.remove(entry.id)
+            if not steps:
+                del lot[entry.sequence or 0]
+            if not lot:
+                del self._lots[entry.lot_id]
+        return entry
+
+    def move(self, batch_id: str, start: datetime, end: datetime,
+             equipment_id: Optional[str] = None) -> TimelineEntry:
+        entry = self._entries[batch_id]
+        self._unindex(entry)
+        entry.start, entry.end = start, end
+        if equipment_id is not None:
+            entry.equipment_id = equipment_id
+        self._index(entry)
+        return entry
+
+    def _index(self, entry: TimelineEntry):
+        insort(self._equipment.setdefault(entry.equipment_id, []), (entry.start, entry.id))
+        duration = (entry.end - entry.start).total_seconds()
+        if duration > self._max_duration.get(entry.equipment_id, 0):
+            self._max_duration[entry.equipment_id] = duration
+
+    def _unindex(self, entry: TimelineEntry):
+        timeline = self._equipment[entry.equipment_id]
+        del timeline[bisect_left(timeline, (entry.start, entry.id))]
+
+    def overlapping(self, equipment_id: str, start: datetime, end: datetime) -> List[TimelineEntry]:
+        """설비에서 [start, end) 와 겹치는 배치 (시작시각 순)"""
+        timeline = self._equipment.get(equipment_id)
+        if not timeline:
+            return []
+        # 시작시각이 start - 최장 배치 길이 이전인 배치는 겹칠 수 없음
+        earliest = start - timedelta(seconds=self._max_duration.get(equipment_id, 0))
+        lo = bisect_left(timeline, (earliest,))
+        hi = bisect_left(timeline, (end,))
+        result = []
+        for _, batch_id in timeline[lo:hi]:
+            entry = self._entries[batch_id]
+            if entry.end > start:
+                result.append(entry)
+        return result
+
+    def in_range(self, equipment_id: str, start: datetime, end: datetime) -> List[TimelineEntry]:
+        """설비에서 시작시각이 [start, end) 인 배치"""
+        timeline = self._equipment.get(equipment_id, [])
+        lo = bisect_left(timeline, (start,))
+        hi = bisect_left(timeline, (end,))
+        return [self._entries[batch_id] for _, batch_id in timeline[lo:hi]]
+
+    def successors(self, entry: TimelineEntry) -> List[TimelineEntry]:
+        """같은 로트의 바로 다음 공정 배치"""
+        lot = self._lots.get(entry.lot_id) if entry.lot_id is not None else None
+        if not lot:
+            return []
+        later = [sequence for sequence in lot if sequence > (entry.sequence or 0)]
+        if not later:
+            return []
+        return [self._entries[batch_id] for batch_id in lot[min(later)]]
+
+    def predecessors(self, entry: TimelineEntry) -> List[TimelineEntry]:
+        """같은 로트의 바로 이전 공정 배치"""
+        lot = self._lots.get(entry.lot_id) if entry.lot_id is not None else None
+        if not lot:
+            return []
+        earlier = [sequence for sequence in lot if sequence < (entry.sequence or 0)]
+        if not earlier:
+            return []
+        return [self._entries[batch_id] for batch_id in lot[max(earlier)]]
+
+    def lots(self) -> Iterable[Dict[int, List[str]]]:
+        """로트별 {sequence: [batch_id, ...]}"""
+        return self._lots.values()
+
+    def lot(self, lot_id: str) -> Dict[int, List[str]]:
+        """로트의 {sequence: [batch_id, ...]} (없으면 빈 dict)"""
+        return self._lots.get(lot_id, {})
+
+    def previous_on_equipment(self, entry: TimelineEntry) -> Optional[TimelineEntry]:
+        """같은 설비에서 바로 앞에 시작하는 배치"""
+        timeline = self._equipment.get(entry.equipment_id, [])
+        index = bisect_left(timeline, (entry.start, entry.id))
+        return self._entries[timeline[index - 1][1]] if index > 0 else None
+
+    def next_on_equipment(self, equipment_id: str, start: datetime) -> Optional[TimelineEntry]:
+        """설비에서 start 이후(같은 시각 포함) 처음 시작하는 배치"""
+        timeline = self._equipment.get(equipment_id, [])
+        index = bisect_left(timeline, (start,))
+        return self._entries[timeline[index][1]] if index < len(timeline) else None
+
+    def equipment_entries(self, equipment_id: str) -> List[TimelineEntry]:
+        """설비의 배치 (시작시각 순)"""
+        return [self._entries[batch_id] for _, batch_id in self._equipment.get(equipment_id, [])]
+
+    def equipment_ids(self) -> Iterable[str]:
+        return [equipment_id for equipment_id, timeline in self._equipment.items() if timeline]
+
+
+def repair_after_move(timeline: BatchTimeline, batch_id: str, start: datetime, end: datetime,
+                      equipment_id: Optional[str] = None) -> List[TimelineEntry]:
+    """
+    배치를 이동하고 영향받는 배치만 뒤로 밀어 재배치 (right-shift repair)
+    - 요청 시작이 같은 로트 선행 공정 종료보다 이르면 길이를 유지한 채 선행 공정 종료 시각으로 당겨 맞춤
+    - 이동한 배치는 고정, 같은 설비에서 겹치는 배치는 앞 배치 종료 시각으로 이동
+    - 같은 로트의 후속 공정이 선행 공정 종료 전에 시작하면 종료 시각으로 이동
+    변경된 배치 목록(이동한 배치 포함, 실제 배치된 위치)을 반환
+    """
+    entry = timeline.get(batch_id)
+    ready = max((p.end for p in timeline.predecessors(entry)), default=None) if entry is not None else None
+    if ready is not None and start < ready:
+        start, end = ready, ready + (end - start)
+    moved = timeline.move(batch_id, start, end, equipment_id)
+    changed = {moved.id: moved}
+
+    # 시작시각 순으로 처리 - 밀린 배치가 다시 다음 배치를 밀 수 있음
+    queue = [(moved.start, moved.id)]
+    while queue:
+        queued_start, current_id = heapq.heappop(queue)
+        current = timeline.get(current_id)
+        if current is None or current.start != queued_start:
+            continue  # 이미 다른 위치로 다시 밀린 항목
+
+        shifted_self = False
+        for other in timeline.overlapping(current.equipment_id, current.start, current.end):
+            if other.id == current.id:
+                continue
+            # 고정 배치 또는 먼저 시작한 배치가 우선 - 나머지가 뒤로 밀림
+            if other.id == moved.id or (other.start < current.start and current.id != moved.id):
+                _shift(timeline, current, other.end, changed, queue)
+                shifted_self = True
+                break
+            _shift(timeline, other, current.end, changed, queue)
+        if shifted_self:
+            continue
+
+        for successor in timeline.successors(current):
+            if successor.start < current.end and successor.id != moved.id:
+                _shift(timeline, successor, current.end, changed, queue)
+
+    return list(changed.values())
+
+
+def _shift(timeline: BatchTimeline, entry: TimelineEntry, new_start: datetime,
+           changed: Dict[str, TimelineEntry], queue: list):
+    """배치를 길이를 유지한 채 new_start 로 이동하고 재검사 대기열에 추가"""
+    duration = entry.end - entry.start
+    timeline.move(entry.id, new_start, new_start + duration)
+    changed[entry.id] = entry
+    heapq.heappush(queue, (entry.start, entry.id))
+
+
+def parse_move_request(batch_data: Dict, start: datetime, end: datetime,
+                       equipment_id: str) -> tuple:
+    """
+    배치 수정 요청에서 새 (시작, 종료, 설비) 추출
+    start_time/end_time/equipment_id 또는 캘린더 형식 start/end/calendarId 를 허용하며
+    시작만 바뀌면 기존 길이를 유지
+    """
+    new_start = _parse_datetime(batch_data.get('start_time', batch_data.get('start')))
+    new_end = _parse_datetime(batch_data.get('end_time', batch_data.get('end')))
+    new_equipment = batch_data.get('equipment_id', batch_data.get('calendarId')) or equipment_id
+
+    if new_start is None:
+        new_start = start
+    if new_end is None:
+        new_end = new_start + (end - start)
+    if new_end <= new_start:
+        raise ValueError("end_time must be after start_time")
+    return new_start, new_end, new_equipment
+
+
+def _parse_datetime(value) -> Optional[datetime]:
+    """ISO 문자열/datetime → 로컬 naive datetime"""
+    if value is None or isinstance(value, datetime):
+        parsed = value
+    elif isinstance(value, str):
+        parsed = datetime.fromisoformat(value.replace('Z', '+00:00'))
+    else:
+        raise ValueError(f"Invalid datetime value: {value!r}")
+    if parsed is not None and parsed.tzinfo is not None:
+        parsed = parsed.astimezone().replace(tzinfo=None)
+    return parsed
+
+
+def repair_after_delete(timeline: BatchTimeline, batch_id: str) -> List[TimelineEntry]:
+    """
+    배치를 삭제하고 비워진 구간으로 영향받는 배치만 앞으로 당김 (left-compaction)
+    - 같은 설비의 다음 배치와 같은 로트의 다음 공정 배치가 대상
+    - 당길 수 있는 한계: 설비 앞 배치 종료, 로트 선행 공정 종료 (선행 공정이 없으면 현재 시작 월 1일)
+    - 당겨진 배치가 비운 구간/앞당긴 종료에 대해 같은 방식으로 이어서 당김 (시작시각 순)
+    변경된 배치 목록(실제 배치된 위치)을 반환
+    """
+    entry = timeline.remove(batch_id)
+    if entry is None:
+        return []
+    changed: Dict[str, TimelineEntry] = {}
+    queue = []
+    _queue_compaction(timeline, entry, entry.start, queue)
+
+    while queue:
+        queued_start, current_id = heapq.heappop(queue)
+        current = timeline.get(current_id)
+        if current is None or current.start != queued_start:
+            continue  # 이미 다른 위치로 당겨진 항목
+        earliest = _earliest_start(timeline, current)
+        if earliest >= current.start:
+            continue
+        freed_from = current.start
+        timeline.move(current.id, earliest, earliest + (current.end - current.start))
+        changed[current.id] = current
+        _queue_compaction(timeline, current, freed_from, queue)
+
+    return list(changed.values())
+
+
+def _queue_compaction(timeline: BatchTimeline, entry: TimelineEntry, freed_from: datetime, queue: list):
+    """entry 가 빠지거나 앞당겨져 영향받는 배치 (설비의 다음 배치, 로트의 다음 공정) 를 대기열에 추가"""
+    following = timeline.next_on_equipment(entry.equipment_id, freed_from)
+    if following is not None and following.id != entry.id:
+        heapq.heappush(queue, (following.start, following.id))
+    for successor in timeline.successors(entry):
+        heapq.heappush(queue, (successor.start, successor.id))
+
+
+def _earliest_start(timeline: BatchTimeline, entry: TimelineEntry) -> datetime:
+    """설비 앞 배치 종료와 로트 선행 공정 종료 중 늦은 시각 (선행 공정이 없으면 현재 시작 월 1일 이후)"""
+    predecessors = timeline.predecessors(entry)
+    if predecessors:
+        earliest = max(p.end for p in predecessors)
+    else:
+        earliest = datetime(entry.start.year, entry.start.month, 1)
+    previous = timeline.previous_on_equipment(entry)
+    if previous is not None:
+        earliest = max(earliest, previous.end)
+    return earliest
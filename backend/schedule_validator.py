@@ -0,0 +1,160 @@
+# Schedule validator - 스윕라인 기반 설비 중복/공정 선후행 검증 (전체 및 증분)
+import heapq
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+
+from schedule_repair import BatchTimeline, TimelineEntry
+
+
+def _hours(delta) -> float:
+    return delta.total_seconds() / 3600
+
+
+def _overlap_record(equipment_id: str, first: TimelineEntry, second: TimelineEntry) -> Dict:
+    overlap_start = max(first.start, second.start)
+    overlap_end = min(first.end, second.end)
+    return {
+        'type': 'overlap',
+        'equipment_id': equipment_id,
+        'batch_ids': (first.id, second.id),
+        'overlap_start': overlap_start,
+        'overlap_end': overlap_end,
+        'overlap_hours': _hours(overlap_end - overlap_start)
+    }
+
+
+def _precedence_record(previous: TimelineEntry, following: TimelineEntry) -> Dict:
+    return {
+        'type': 'precedence',
+        'sales_plan_id': previous.lot_id,
+        'batch_ids': (previous.id, following.id),
+        'sequences': (previous.sequence, following.sequence),
+        'overlap_hours': _hours(previous.end - following.start)
+    }
+
+
+class ScheduleValidator:
+    """
+    스케줄 검증기
+    - 설비 중복: 설비별 시작시각 정렬 후 종료시각 힙을 유지하는 스윕라인으로 겹치는 모든 배치 쌍 보고
+      O(n log n + 충돌 수)
+    - 공정 선후행: 같은 로트에서 다음 sequence 배치가 이전 sequence 배치 종료 전에 시작하면 보고
+    - 증분 검증: 마지막 검증 이후 변경/삭제된 배치의 설비 충돌과 해당 로트의 선후행만 다시 검사
+    """
+
+    def __init__(self, utilization_func: Optional[Callable[[Dict], Dict[str, float]]] = None):
+        self.utilization_func = utilization_func
+        self.timeline: Optional[BatchTimeline] = None
+        self._conflicts: Dict[Tuple[str, str], Dict] = {}
+        self._precedence: Dict[Tuple[str, str], Dict] = {}
+        self._utilization: Dict[str, float] = {}
+
+    def validate(self, entries: Iterable[TimelineEntry]) -> Dict:
+        """전체 검증"""
+        self.timeline = BatchTimeline(entries)
+        self._conflicts = {}
+        self._precedence = {}
+
+        for equipment_id in self.timeline.equipment_ids():
+            active = []  # (end, id) 최소 힙 - 현재 시각에 진행 중인 배치
+            for entry in self.timeline.equipment_entries(equipment_id):
+                while active and active[0][0] <= entry.start:
+                    heapq.heappop(active)
+                for _, other_id in active:
+                    other = self.timeline.get(other_id)
+                    self._add_conflict(equipment_id, other, entry)
+                heapq.heappush(active, (entry.end, entry.id))
+
+        for lot in self.timeline.lots():
+            self._check_lot(lot)
+
+        self._utilization = self._equipment_utilization(self.timeline.equipment_ids())
+        return self.result()
+
+    def revalidate(self, changed: Iterable[TimelineEntry] = (), removed_ids: Iterable[str] = ()) -> Dict:
+        """
+        증분 검증 - 변경(추가 포함)/삭제된 배치와 관련된 충돌만 다시 계산
+        validate() 로 전체 검증을 한 번 수행한 뒤에 사용
+        """
+        if self.timeline is None:
+            raise RuntimeError("revalidate() requires a prior full validate()")
+
+        removed_ids = list(removed_ids)
+        touched_ids = set(removed_ids)
+        touched_equipment = set()
+        touched_lots = set()  # 가운데 공정이 빠지면 앞뒤 공정이 새로 인접하므로 로트 단위로 다시 검사
+        changed = list(changed)
+
+        for batch_id in removed_ids:
+            entry = self.timeline.remove(batch_id)
+            if entry is not None:
+                touched_equipment.add(entry.equipment_id)
+                touched_lots.add(entry.lot_id)
+        for entry in changed:
+            previous = self.timeline.remove(entry.id)
+            if previous is not None:
+                touched_equipment.add(previous.equipment_id)
+                touched_lots.add(previous.lot_id)
+            self.timeline.add(entry)
+            touched_ids.add(entry.id)
+            touched_equipment.add(entry.equipment_id)
+            touched_lots.add(entry.lot_id)
+        touched_lots.discard(None)
+
+        # 변경된 배치가 포함된 기존 결과 제거 후 해당 배치/로트만 재검사
+        self._conflicts = {k: v for k, v in self._conflicts.items() if not touched_ids.intersection(k)}
+        self._precedence = {k: v for k, v in self._precedence.items() if v['sales_plan_id'] not in touched_lots}
+
+        for entry in changed:
+            for other in self.timeline.overlapping(entry.equipment_id, entry.start, entry.end):
+                if other.id != entry.id:
+                    first, second = sorted((other, entry), key=lambda e: (e.start, e.id))
+                    self._add_conflict(entry.equipment_id, first, second)
+        for lot_id in touched_lots:
+            self._check_lot(self.timeline.lot(lot_id))
+
+        for equipment_id in touched_equipment:
+            self._utilization.pop(equipment_id, None)
+        self._utilization.update(self._equipment_utilization(
+            [equipment_id for equipment_id in touched_equipment if self.timeline.equipment_entries(equipment_id)]
+        ))
+        return self.result()
+
+    def _check_lot(self, lot: Dict[int, List[str]]):
+        """로트의 인접한 sequence 쌍마다 선후행 검사"""
+        sequences = sorted(lot)
+        for previous_seq, next_seq in zip(sequences, sequences[1:]):
+            for previous_id in lot[previous_seq]:
+                previous = self.timeline.get(previous_id)
+                for next_id in lot[next_seq]:
+                    following = self.timeline.get(next_id)
+                    if following.start < previous.end:
+                        self._precedence[(previous.id, following.id)] = _precedence_record(previous, following)
+
+    def _add_conflict(self, equipment_id: str, first: TimelineEntry, second: TimelineEntry):
+        key = tuple(sorted((first.id, second.id)))
+        self._conflicts[key] = _overlap_record(equipment_id, first, second)
+
+    def _equipment_utilization(self, equipment_ids: Iterable[str]) -> Dict[str, float]:
+        if self.utilization_func is None:
+            return {}
+        return self.utilization_func({
+            equipment_id: [(e.start, e.end) for e in self.timeline.equipment_entries(equipment_id)]
+            for equipment_id in equipment_ids
+        })
+
+    def result(self) -> Dict:
+        conflicts = list(self._conflicts.values())
+        precedence = list(self._precedence.values())
+        return {
+            'is_valid': not conflicts and not precedence,
+            'errors': conflicts + precedence,
+            'conflicts': conflicts,
+            'precedence_violations': precedence,
+            'warnings': [],
+            'statistics': {
+                'total_batches': len(self.timeline),
+                'conflict_count': len(conflicts),
+                'precedence_violation_count': len(precedence),
+                'equipment_utilization': dict(self._utilization)
+            }
+        }
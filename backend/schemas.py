@@ -0,0 +1,22 @@
+# Response schemas shared by the API and the serialization benchmark
+from datetime import datetime
+from typing import Dict, List, Optional
+
+from pydantic import BaseModel
+
+class BatchSchedule(BaseModel):
+    id: str
+    product_id: str
+    product_name: str
+    equipment_id: str
+    process_name: str
+    start_time: datetime
+    end_time: datetime
+    lot_number: str
+    quantity: Optional[int] = None
+    status: Optional[str] = "planned"
+
+class ScheduleResponse(BaseModel):
+    batches: List[BatchSchedule]
+    summary: Dict[str, int]
+    next_cursor: Optional[str] = None
@@ -0,0 +1,189 @@
+# Data versioning - schedule/master-data version counters bumped on every committed write, and strong ETags
+import hashlib
+import os
+import threading
+import time
+import uuid
+from typing import Dict, Iterable, Optional
+
+from sqlalchemy import event, select, update
+from sqlalchemy.engine import Connection, Engine
+from sqlalchemy.exc import SQLAlchemyError
+from sqlalchemy.orm import Session
+
+from models import DataVersion
+
+# Which version a table belongs to
+VERSION_BY_TABLE = {
+    'batches': 'schedule',
+    'products': 'master',
+    'equipment': 'master',
+    'processes': 'master',
+    'product_processes': 'master',
+    'sales_plans': 'sales',
+}
+
+VERSION_KINDS = ('schedule', 'master', 'sales')
+
+# How often a bound process re-reads the counters to see writes committed by other workers (seconds, 0 = every read)
+VERSION_POLL_INTERVAL = float(os.getenv("DATA_VERSION_POLL_INTERVAL", 1.0))
+
+
+def bump_version_rows(connection: Connection, kinds: Iterable[str]) -> Dict[str, tuple]:
+    """Increment the data_versions rows inside the caller's transaction; returns {kind: (epoch, version)}"""
+    table = DataVersion.__table__
+    kinds = sorted(set(kinds))
+    connection.execute(update(table).where(table.c.kind.in_(kinds)).values(version=table.c.version + 1))
+    rows = {row.kind: (row.epoch, row.version)
+            for row in connection.execute(select(table).where(table.c.kind.in_(kinds)))}
+    missing = [kind for kind in kinds if kind not in rows]
+    if missing:
+        created = {kind: (uuid.uuid4().hex[:12], 1) for kind in missing}
+        connection.execute(table.insert(), [
+            {'kind': kind, 'epoch': epoch, 'version': version} for kind, (epoch, version) in created.items()
+        ])
+        rows.update(created)
+    return rows
+
+
+class DataVersions:
+    """
+    Monotonic version counters
+    Unbound, they live in this process only (the boot id is the epoch, so tags issued before a restart never match).
+    Once bound to the database engine (bind()), every committed write also increments the kind's row in
+    data_versions within the same transaction, and get() re-reads the rows at most every poll_interval seconds,
+    so all workers on the database issue the same ETags and see each other's writes within that interval.
+    """
+
+    def __init__(self, kinds: Iterable[str] = VERSION_KINDS):
+        self.boot_id = uuid.uuid4().hex[:12]
+        self._versions: Dict[str, int] = {kind: 0 for kind in kinds}
+        self._epochs: Dict[str, str] = {kind: self.boot_id for kind in kinds}
+        self._lock = threading.Lock()
+        self._engine: Optional[Engine] = None
+        self.poll_interval = VERSION_POLL_INTERVAL
+        self._polled_at = 0.0
+
+    def bind(self, engine: Optional[Engine], poll_interval: float = VERSION_POLL_INTERVAL):
+        self._engine = engine
+        self.poll_interval = poll_interval
+        self._polled_at = 0.0
+
+    def get(self, kind: str) -> int:
+        self._poll()
+        return self._versions[kind]
+
+    def bump(self, *kinds: str) -> Dict[str, int]:
+        """Bump outside a session write (e.g. master data edited by another tool and refreshed)"""
+        if self._engine is not None:
+            try:
+                with self._engine.begin() as connection:
+                    self.apply(bump_version_rows(connection, kinds))
+                return dict(self._versions)
+            except SQLAlchemyError:
+                pass  # data_versions not created yet - fall back to this process
+        with self._lock:
+            for kind in kinds:
+                self._versions[kind] += 1
+            return dict(self._versions)
+
+    def apply(self, rows: Dict[str, tuple]):
+        """Adopt committed (epoch, version) values - newer versions or a recreated row"""
+        with self._lock:
+            for kind, (epoch, version) in rows.items():
+                if kind not in self._versions:
+                    continue
+                if epoch != self._epochs[kind] or version > self._versions[kind]:
+                    self._epochs[kind] = epoch
+                    self._versions[kind] = version
+
+    def read(self, db: Session, kind: str) -> Optional[tuple]:
+        """(epoch, version) of `kind` read in the caller's transaction, not the polled value; None if never bumped"""
+        table = DataVersion.__table__
+        row = db.execute(select(table.c.epoch, table.c.version).where(table.c.kind == kind)).first()
+        if row is None:
+            return None
+        self.apply({kind: tuple(row)})
+        return tuple(row)
+
+    def _poll(self):
+        if self._engine is None or time.monotonic() - self._polled_at < self.poll_interval:
+            return
+        self._polled_at = time.monotonic()
+        try:
+            with self._engine.connect() as connection:
+                rows = {row.kind: (row.epoch, row.version)
+                        for row in connection.execute(select(DataVersion.__table__))}
+        except SQLAlchemyError:
+            return  # database not initialized yet
+        self.apply(rows)
+
+    def etag(self, kinds: Iterable[str], variant: str = "") -> str:
+        """Strong ETag for a representation built from `kinds` (variant = e.g. path + normalized query)"""
+        stamp = ".".join(f"{kind}{self.get(kind)}" for kind in kinds)
+        epochs = hashlib.blake2b("".join(self._epochs[kind] for kind in kinds).encode(), digest_size=4).hexdigest()
+        digest = hashlib.blake2b(variant.encode(), digest_size=6).hexdigest()
+        return f'"{epochs}-{stamp}-{digest}"'
+
+
+versions = DataVersions()
+
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    """True if the If-None-Match header value contains the ETag (or *)"""
+    if not if_none_match:
+        return False
+    candidates = [value.strip() for value in if_none_match.split(",")]
+    return "*" in candidates or etag in candidates
+
+
+# Track the tables written in each session transaction, increment their data_versions rows in that
+# transaction, and adopt the new values on commit.
+# Covers ORM flushes and statements run through Session.execute (bulk INSERT/UPDATE/DELETE).
+
+def _bump_in_transaction(session: Session, kinds: set):
+    bumped = session.info.setdefault('_version_bumped', {})
+    kinds = kinds - set(bumped)
+    if kinds:
+        bumped.update(bump_version_rows(session.connection(), kinds))
+
+
+@event.listens_for(Session, "before_flush")
+def _track_flush(session, flush_context, instances):
+    kinds = session.info.setdefault('_version_kinds', set())
+    for obj in list(session.new) + list(session.dirty) + list(session.deleted):
+        kind = VERSION_BY_TABLE.get(getattr(obj, '__tablename__', None))
+        if kind:
+            kinds.add(kind)
+
+
+@event.listens_for(Session, "after_flush")
+def _bump_after_flush(session, flush_context):
+    kinds = session.info.pop('_version_kinds', None)
+    if kinds:
+        _bump_in_transaction(session, kinds)
+
+
+@event.listens_for(Session, "do_orm_execute")
+def _track_execute(orm_execute_state):
+    statement = orm_execute_state.statement
+    if not (orm_execute_state.is_insert or orm_execute_state.is_update or orm_execute_state.is_delete):
+        return
+    table = getattr(statement, 'table', None)
+    kind = VERSION_BY_TABLE.get(getattr(table, 'name', None))
+    if kind:
+        _bump_in_transaction(orm_execute_state.session, {kind})
+
+
+@event.listens_for(Session, "after_commit")
+def _adopt_on_commit(session):
+    session.info.pop('_version_kinds', None)
+    bumped = session.info.pop('_version_bumped', None)
+    if bumped:
+        versions.apply(bumped)
+
+
+@event.listens_for(Session, "after_rollback")
+def _discard_on_rollback(session):
+    session.info.pop('_version_kinds', None)
+    session.info.pop('_version_bumped', None)
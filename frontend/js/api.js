@@ -22,14 +22,42 @@ async function apiRequest(endpoint, options = {}) {
 }
 
 // 스케줄 관련 API
-async function getSchedule() {
-    return apiRequest('/schedule');
+// params: { start, end, equipment_id: [...], product_id } - 기간과 겹치는 배치만 조회, next_cursor 가 없을 때까지 페이지 이어 읽기
+async function getSchedule(params = {}) {
+    const batches = [];
+    let data;
+    let cursor = null;
+    do {
+        const query = new URLSearchParams();
+        Object.entries(params).forEach(([key, value]) => {
+            if (value === undefined || value === null) return;
+            (Array.isArray(value) ? value : [value]).forEach(v => query.append(key, v));
+        });
+        if (cursor) query.append('cursor', cursor);
+        
+        data = await apiRequest(`/schedule?${query.toString()}`);
+        batches.push(...data.batches);
+        cursor = data.next_cursor;
+    } while (cursor);
+    
+    return { ...data, batches };
 }
 
 async function generateScheduleFromSales(salesData) {
     return apiRequest('/schedule/generate', {
         method: 'POST',
-        body: JSON.stringify(salesData),
+        body: JSON.stringify(salesData || {}),
+    });
+}
+
+// 스케줄 생성 작업 상태/취소
+async function getScheduleJob(jobId) {
+    return apiRequest(`/schedule/jobs/${jobId}`);
+}
+
+async function cancelScheduleJob(jobId) {
+    return apiRequest(`/schedule/jobs/${jobId}/cancel`, {
+        method: 'POST',
     });
 }
 
@@ -46,6 +74,16 @@ async function deleteBatch(batchId) {
     });
 }
 
+// 배치 변경 실시간 구독 (WebSocket) - 연결이 끊기면 3초 후 재연결
+function connectScheduleUpdates(onMessage, onOpen) {
+    const url = API_BASE_URL.replace(/^http/, 'ws').replace(/\/api$/, '/ws/schedule');
+    const socket = new WebSocket(url);
+    socket.onopen = () => onOpen && onOpen(socket);
+    socket.onmessage = event => onMessage(JSON.parse(event.data));
+    socket.onclose = () => setTimeout(() => connectScheduleUpdates(onMessage, onOpen), 3000);
+    return socket;
+}
+
 // 마스터 데이터 API
 async function getEquipment() {
     return apiRequest('/equipment');
@@ -77,20 +115,17 @@ async function uploadSalesPlan(file) {
 }
 
 // 내보내기 API
-async function exportSchedule(format = 'excel') {
-    const response = await fetch(`${API_BASE_URL}/export/schedule?format=${format}`);
-    
-    if (!response.ok) {
-        throw new Error(`Export Error: ${response.status}`);
-    }
+// params: { start, end, equipment_id: [...], product_id } - 서버가 스트리밍하는 파일을 브라우저가 바로 저장 (메모리에 blob 을 만들지 않음)
+function downloadScheduleExport(format = 'excel', params = {}) {
+    const query = new URLSearchParams({ format });
+    Object.entries(params).forEach(([key, value]) => {
+        if (value === undefined || value === null) return;
+        (Array.isArray(value) ? value : [value]).forEach(v => query.append(key, v));
+    });
     
-    const blob = await response.blob();
-    const url = window.URL.createObjectURL(blob);
     const a = document.createElement('a');
-    a.href = url;
-    a.download = `schedule_${new Date().toISOString().split('T')[0]}.${format === 'excel' ? 'xlsx' : 'csv'}`;
+    a.href = `${API_BASE_URL}/export/schedule?${query.toString()}`;
     document.body.appendChild(a);
     a.click();
-    window.URL.revokeObjectURL(url);
     document.body.removeChild(a);
-}
\ No newline at end of file
+}
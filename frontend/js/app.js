@@ -161,8 +161,8 @@ function handleFileSelect(e) {
 }
 
 function handleFile(file) {
-    if (!file.name.match(/\.(xlsx|xls)$/)) {
-        showNotification('Excel 파일만 업로드 가능합니다.', 'error');
+    if (!file.name.match(/\.(xlsx|xls|csv|parquet)$/i)) {
+        showNotification('Excel(.xlsx, .xls), CSV, Parquet 파일만 업로드 가능합니다.', 'error');
         return;
     }
     
@@ -208,7 +208,12 @@ async function uploadFile() {
     try {
         const result = await uploadSalesPlan(window.selectedFile);
         closeUploadModal();
-        showNotification('판매계획이 업로드되었습니다.', 'success');
+        if (result.rejected > 0) {
+            console.warn('[Upload] Rejected rows:', result.rejected_rows);
+            showNotification(`판매계획 ${result.imported}건 업로드, ${result.rejected}건 제외되었습니다.`, 'info');
+        } else {
+            showNotification(`판매계획 ${result.imported}건이 업로드되었습니다.`, 'success');
+        }
         
         // 자동으로 스케줄 생성 여부 확인
         if (confirm('스케줄을 생성하시겠습니까?')) {
@@ -229,9 +234,24 @@ async function generateSchedule() {
     
     try {
         console.log('[API] Calling schedule generation API...');
-        const result = await generateScheduleFromSales();
-        console.log('[API] Schedule generation result:', result);
-        showNotification('스케줄이 생성되었습니다.', 'success');
+        let job = await generateScheduleFromSales();
+        
+        // 작업으로 접수된 경우 끝날 때까지 진행 상황 폴링 (main_simple 은 바로 결과 반환)
+        if (job.job_id) {
+            const jobId = job.job_id;
+            console.log('[API] Schedule generation job queued:', jobId);
+            while (job.status === 'queued' || job.status === 'running') {
+                await new Promise(resolve => setTimeout(resolve, 1000));
+                job = await getScheduleJob(jobId);
+                console.log(`[API] Job ${job.status}: ${job.progress.plans_processed}/${job.progress.plans_total ?? '?'} plans, ${job.progress.batches_placed} batches`);
+            }
+            if (job.status !== 'succeeded') {
+                throw new Error(job.error || job.status);
+            }
+            job = job.result;
+        }
+        console.log('[API] Schedule generation result:', job);
+        showNotification(`스케줄이 생성되었습니다. (배치 ${job.batches_created}건)`, 'success');
         loadScheduleData();
     } catch (error) {
         console.error('[ERROR] Schedule generation failed:', error);
@@ -244,8 +264,8 @@ async function generateSchedule() {
 // 스케줄 내보내기
 async function exportSchedule() {
     try {
-        await exportSchedule('excel');
-        showNotification('스케줄이 내보내졌습니다.', 'success');
+        downloadScheduleExport('excel');
+        showNotification('스케줄 내보내기를 시작합니다.', 'success');
     } catch (error) {
         console.error('Export failed:', error);
         showNotification('내보내기 실패', 'error');
@@ -257,8 +277,9 @@ function deleteEvent() {
     if (!selectedEvent) return;
     
     if (confirm('정말 삭제하시겠습니까?')) {
-        deleteBatch(selectedEvent.id).then(() => {
+        deleteBatch(selectedEvent.id).then(response => {
             calendar.deleteEvent(selectedEvent.id, selectedEvent.calendarId);
+            applyChangedBatches(response || {}, selectedEvent.id);
             closeEventPopup();
             showNotification('삭제되었습니다.', 'success');
         });
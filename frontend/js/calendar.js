@@ -3,6 +3,11 @@ let calendar;
 let currentView = 'week';
 let selectedEvent = null;
 
+// 실시간 변경 구독 상태 - 배치 ID → 캘린더(설비) ID, 현재 조회 기간
+let scheduleSocket = null;
+const eventCalendars = new Map();
+let loadedRange = null;
+
 // 장비별 캘린더 설정
 const EQUIPMENT_CALENDARS = [
     { id: 'EQ001', name: '혼합기 1호', backgroundColor: '#3498db' },
@@ -146,6 +151,10 @@ function onBeforeUpdateEvent(e) {
     updateBatch(updateData).then(response => {
         if (response.success) {
             calendar.updateEvent(event.id, event.calendarId, changes);
+            eventCalendars.set(event.id, changes.calendarId || event.calendarId);
+            
+            // 서버 증분 재배치로 함께 밀려난 배치 반영
+            applyChangedBatches(response, event.id);
             showNotification('일정이 수정되었습니다.', 'success');
         } else {
             showNotification('일정 수정에 실패했습니다.', 'error');
@@ -159,12 +168,27 @@ function onBeforeDeleteEvent(e) {
         deleteBatch(e.event.id).then(response => {
             if (response.success) {
                 calendar.deleteEvent(e.event.id, e.event.calendarId);
+                eventCalendars.delete(e.event.id);
+                // 비워진 구간으로 당겨진 배치 반영
+                applyChangedBatches(response, e.event.id);
                 showNotification('일정이 삭제되었습니다.', 'success');
             }
         });
     }
 }
 
+// 수정/삭제 응답의 재배치된 배치(changed_batches) 반영 - 요청한 배치 자체는 제외
+function applyChangedBatches(response, batchId) {
+    const shifted = (response.changed_batches || []).filter(batch => batch.id !== batchId);
+    console.log('[API] Batch edit repaired', shifted.length, 'related batches');
+    shifted.forEach(batch => {
+        calendar.updateEvent(batch.id, batch.equipment_id, {
+            start: new Date(batch.start_time),
+            end: new Date(batch.end_time)
+        });
+    });
+}
+
 // 이벤트 클릭 처리
 function onClickEvent(e) {
     const event = e.event;
@@ -191,6 +215,20 @@ function changeView(viewName) {
     calendar.changeView(viewName);
     currentView = viewName;
     updateCalendarRange();
+    loadScheduleData();
+}
+
+// 캘린더 이동 (이전/오늘/다음) - 보이는 기간의 배치만 다시 조회
+function moveCalendar(direction) {
+    if (direction < 0) {
+        calendar.prev();
+    } else if (direction > 0) {
+        calendar.next();
+    } else {
+        calendar.today();
+    }
+    updateCalendarRange();
+    loadScheduleData();
 }
 
 // 캘린더 범위 업데이트
@@ -213,30 +251,35 @@ function formatDateTime(date) {
     return d.toLocaleDateString() + ' ' + d.toLocaleTimeString();
 }
 
+// 로컬 시각 ISO 문자열 (서버는 타임존 없는 로컬 시각으로 저장)
+function formatLocalDateTime(date) {
+    const pad = n => String(n).padStart(2, '0');
+    return `${date.getFullYear()}-${pad(date.getMonth() + 1)}-${pad(date.getDate())}T` +
+           `${pad(date.getHours())}:${pad(date.getMinutes())}:${pad(date.getSeconds())}`;
+}
+
 // 스케줄 데이터 로드
 function loadScheduleData() {
     showLoading();
     
-    getSchedule().then(data => {
+    // 보이는 기간 [시작일 0시, 종료일 다음날 0시)
+    const rangeStart = calendar.getDateRangeStart().toDate();
+    const rangeEnd = calendar.getDateRangeEnd().toDate();
+    rangeStart.setHours(0, 0, 0, 0);
+    rangeEnd.setHours(0, 0, 0, 0);
+    rangeEnd.setDate(rangeEnd.getDate() + 1);
+    
+    getSchedule({
+        start: formatLocalDateTime(rangeStart),
+        end: formatLocalDateTime(rangeEnd)
+    }).then(data => {
         calendar.clear();
+        eventCalendars.clear();
+        loadedRange = { start: rangeStart, end: rangeEnd };
+        subscribeScheduleUpdates();
         
         // 배치 데이터를 캘린더 이벤트로 변환
-        const events = data.batches.map(batch => ({
-            id: batch.id,
-            calendarId: batch.equipment_id,
-            title: batch.product_name,
-            category: 'time',
-            start: new Date(batch.start_time),
-            end: new Date(batch.end_time),
-            backgroundColor: PRODUCT_COLORS[batch.product_id] || '#95a5a6',
-            borderColor: PRODUCT_COLORS[batch.product_id] || '#95a5a6',
-            raw: {
-                product_id: batch.product_id,
-                equipment_id: batch.equipment_id,
-                process: batch.process_name,
-                lot_number: batch.lot_number
-            }
-        }));
+        const events = data.batches.map(batchToEvent);
         
         calendar.createEvents(events);
         updateStatistics(data);
@@ -248,6 +291,88 @@ function loadScheduleData() {
     });
 }
 
+// 배치 → 캘린더 이벤트
+function batchToEvent(batch) {
+    eventCalendars.set(batch.id, batch.equipment_id);
+    return {
+        id: batch.id,
+        calendarId: batch.equipment_id,
+        title: batch.product_name,
+        category: 'time',
+        start: new Date(batch.start_time),
+        end: new Date(batch.end_time),
+        backgroundColor: PRODUCT_COLORS[batch.product_id] || '#95a5a6',
+        borderColor: PRODUCT_COLORS[batch.product_id] || '#95a5a6',
+        raw: {
+            product_id: batch.product_id,
+            equipment_id: batch.equipment_id,
+            process: batch.process_name,
+            lot_number: batch.lot_number
+        }
+    };
+}
+
+// 실시간 변경 구독 시작 (최초 1회) / 보이는 기간으로 구독 조건 변경
+function subscribeScheduleUpdates() {
+    if (!scheduleSocket) {
+        scheduleSocket = connectScheduleUpdates(applyScheduleDeltas, socket => {
+            scheduleSocket = socket;
+            subscribeScheduleUpdates();
+        });
+        return;
+    }
+    if (scheduleSocket.readyState === WebSocket.OPEN && loadedRange) {
+        scheduleSocket.send(JSON.stringify({
+            type: 'subscribe',
+            start: formatLocalDateTime(loadedRange.start),
+            end: formatLocalDateTime(loadedRange.end)
+        }));
+    }
+}
+
+// 서버에서 받은 배치 변경 반영 (다른 사용자의 수정/삭제/스케줄 생성)
+function applyScheduleDeltas(message) {
+    if (message.type === 'resync') {
+        loadScheduleData();
+        return;
+    }
+    if (message.type !== 'batch_deltas') return;
+    
+    message.deleted.forEach(id => {
+        if (eventCalendars.has(id)) {
+            calendar.deleteEvent(id, eventCalendars.get(id));
+            eventCalendars.delete(id);
+        }
+    });
+    
+    const created = message.created.filter(batch => !eventCalendars.has(batch.id));
+    if (created.length) {
+        calendar.createEvents(created.map(batchToEvent));
+    }
+    
+    let missing = false;
+    message.updated.forEach(change => {
+        const calendarId = eventCalendars.get(change.id);
+        if (!calendarId) {
+            missing = true;  // 보이는 기간 밖에서 들어온 배치 - 전체 필드가 없으므로 다시 조회
+            return;
+        }
+        const updates = {};
+        if (change.start_time) updates.start = new Date(change.start_time);
+        if (change.end_time) updates.end = new Date(change.end_time);
+        if (change.equipment_id && change.equipment_id !== calendarId) {
+            updates.calendarId = change.equipment_id;
+            eventCalendars.set(change.id, change.equipment_id);
+        }
+        if (Object.keys(updates).length) {
+            calendar.updateEvent(change.id, calendarId, updates);
+        }
+    });
+    if (missing) {
+        loadScheduleData();
+    }
+}
+
 // 통계 업데이트
 function updateStatistics(data) {
     document.getElementById('total-batches').textContent = data.batches.length;
@@ -0,0 +1,1324 @@
+"""
+스케줄러 서비스 단위 테스트 스크립트
+서버 없이 메모리 SQLite에서 SchedulerService 동작과 쿼리 수를 검증
+"""
+
+import asyncio
+import csv
+import gc
+import io
+import json
+import logging
+import queue
+import random
+import sys
+import tempfile
+import threading
+import time
+import tracemalloc
+from datetime import datetime, timedelta, timezone
+from logging.handlers import QueueListener
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent / "backend"))
+
+from sqlalchemy import create_engine, event, select, update
+from sqlalchemy.exc import IntegrityError, OperationalError
+from sqlalchemy.orm import sessionmaker
+
+from database import SQLITE_PRAGMAS, create_db_engine
+from models import Base, Batch, DataVersion, Equipment, Process, Product, ProductProcess, SalesPlan
+from migrations import migrate_database
+from master_data import MasterDataCache
+from versioning import DataVersions, etag_matches, versions
+from schedule_queries import MAX_BATCH_DURATION, fetch_schedule_page, iter_schedule_ndjson, schedule_window_query
+from init_data import create_sample_master_data
+from equipment_occupancy import EquipmentOccupancy, EquipmentPoolIndex
+from routing import load_routing_table
+from scheduler_service import SchedulerService
+from scenario_service import MasterDataSnapshot, ScenarioVariant, run_scenarios
+from schedule_optimizer import ScheduleOptimizer, SlotJob
+from schedule_repair import BatchTimeline, TimelineEntry, repair_after_delete, repair_after_move
+from analytics_service import utilization_series
+from batch_persistence import persist_batches
+from batch_store import BatchStore
+from lot_numbers import LotNumberAllocator
+from metrics import MetricsMiddleware, MetricsRegistry
+from log_pipeline import DroppingQueueHandler, RequestLogMiddleware, setup_logging
+from sales_plan_import import XLRD_AVAILABLE, SalesPlanImportError, file_kind, import_sales_plan_file
+from schedule_events import (
+    CREATED, DELETED, UPDATED, BatchDelta, ScheduleBroadcaster, SubscriptionFilter, parse_filter
+)
+from schedule_export import EXPORT_COLUMNS, iter_export, iter_export_file, iter_export_rows
+from schedule_jobs import (
+    CANCELLED, FINISHED_STATES, RUNNING, SUCCEEDED, GenerationJobQueue, JobConflict, JobQueueFull
+)
+
+# 브로드캐스트 테스트에서 구독자 대기열을 넘기는 flush 횟수
+SUBSCRIBER_OVERFLOW = 20
+
+PRODUCT_IDS = ["500002", "500005", "500008", "505227", "500023", "500041", "507123", "507242"]
+
+# 인덱스/스케줄 컬럼 추가 이전의 batches 테이블
+LEGACY_BATCHES_DDL = """
+CREATE TABLE batches (
+    id VARCHAR(50) PRIMARY KEY,
+    lot_number VARCHAR(100) NOT NULL UNIQUE,
+    product_id VARCHAR(50),
+    equipment_id VARCHAR(50),
+    process_name VARCHAR(200),
+    quantity INTEGER NOT NULL,
+    start_time DATETIME NOT NULL,
+    end_time DATETIME NOT NULL,
+    status VARCHAR(50),
+    actual_start DATETIME,
+    actual_end DATETIME,
+    notes VARCHAR(500),
+    created_at DATETIME,
+    updated_at DATETIME
+)
+"""
+
+
+class QueryCounter:
+    """엔진에서 실행된 SQL 문 개수 집계"""
+
+    def __init__(self, engine):
+        self.engine = engine
+        self.count = 0
+
+    def _on_execute(self, *args):
+        self.count += 1
+
+    def __enter__(self):
+        self.count = 0
+        event.listen(self.engine, "before_cursor_execute", self._on_execute)
+        return self
+
+    def __exit__(self, *exc):
+        event.remove(self.engine, "before_cursor_execute", self._on_execute)
+
+
+class SchedulerServiceTester:
+    def __init__(self):
+        self.engine = create_engine("sqlite://")
+        Base.metadata.create_all(bind=self.engine)
+        self.Session = sessionmaker(bind=self.engine)
+        with self.Session() as db:
+            create_sample_master_data(db)
+            db.commit()
+        self.test_results = []
+
+    def log_test(self, test_name, result, details=""):
+        """테스트 결과 로깅"""
+        self.test_results.append({
+            "timestamp": datetime.now().isoformat(),
+            "test": test_name,
+            "result": "PASS" if result else "FAIL",
+            "details": details
+        })
+        print(f"[{'PASS' if result else 'FAIL'}] {test_name}: {details}")
+
+    def make_sales_plans(self, count, year=2025, month=1):
+        return [
+            SalesPlan(id=f"PLAN{i:06d}", product_id=PRODUCT_IDS[i % len(PRODUCT_IDS)],
+                      year=year, month=month, quantity=1000, priority=i % 5 + 1)
+            for i in range(count)
+        ]
+
+    def test_generation_query_count(self):
+        """판매계획 수와 무관하게 마스터 데이터 조회 쿼리 수가 고정되어야 함"""
+        for plan_count in (10, 5000):
+            with self.Session() as db:
+                plans = self.make_sales_plans(plan_count)
+                with QueryCounter(self.engine) as counter:
+                    # 로트 순번 예약 쿼리는 test_lot_numbers 에서 따로 확인
+                    batches = SchedulerService(db, lot_numbers=LotNumberAllocator()).generate_schedule_from_sales(plans)
+            self.log_test(f"Generation Query Count ({plan_count} plans)", counter.count <= 3,
+                          f"{counter.count} queries, {len(batches)} batches")
+
+    def test_generation_slots(self):
+        """공정별 배치가 같은 장비에서 겹치지 않고 구간 경계에 맞춰 배정되어야 함"""
+        with self.Session() as db:
+            batches = SchedulerService(db).generate_schedule_from_sales(self.make_sales_plans(8))
+        first = batches[0]
+        aligned = all(b.start_time.hour % SchedulerService.HOURS_PER_SLOT == 0 for b in batches)
+        result = SchedulerService(None).validate_schedule(batches)
+        self.log_test("Generation Slots", len(batches) == 32 and aligned and not result["conflicts"]
+                      and first.start_time == datetime(2025, 1, 1, 0) and first.end_time == datetime(2025, 1, 1, 2),
+                      f"{len(batches)} batches, first {first.start_time} - {first.end_time}")
+
+    def test_engine_parity(self):
+        """bitset / numpy 엔진이 동일한 배치를 생성해야 함"""
+        with self.Session() as db:
+            service = SchedulerService(db)
+            plans = self.make_sales_plans(300)
+            results = {
+                engine: [(b.equipment_id, b.start_time, b.end_time)
+                         for b in service.generate_schedule_from_sales(plans, engine=engine)]
+                for engine in SchedulerService.OCCUPANCY_ENGINES
+            }
+        self.log_test("Engine Parity", results["bitset"] == results["numpy"],
+                      ", ".join(f"{engine}: {len(r)} batches" for engine, r in results.items()))
+
+    def test_equipment_pools(self):
+        """같은 유형 설비를 풀로 사용해 처리량이 늘고, 풀 선택이 전체 설비 선형 탐색과 같아야 함 (사용 불가 상태 설비 제외)"""
+        with self.Session() as db:
+            plans = self.make_sales_plans(2000)
+            routing = load_routing_table(db)
+            db.get(Equipment, "EQ002").status = "maintenance"
+            db.flush()
+            maintenance = load_routing_table(db)
+            db.rollback()
+        excluded = [b for b in SchedulerService(None).generate_schedule_from_sales(plans[:200], routing=maintenance)
+                    if b.equipment_id == "EQ002"]
+        status_ok = ("EQ002" not in maintenance.pools["mixer"] and "EQ001" in maintenance.pools["mixer"]
+                     and "EQ002" in routing.pools["mixer"] and not excluded)
+        service = SchedulerService(None)
+        pooled = service.generate_schedule_from_sales(plans, routing=routing)
+        single = service.generate_schedule_from_sales(
+            plans, routing=routing.without_equipment({"EQ002", "EQ004", "EQ006", "EQ008"}))
+        used = {b.equipment_id for b in pooled}
+
+        rng = random.Random(7)
+        occupancy = EquipmentOccupancy(datetime(2025, 1, 1).date(), 4)
+        units = [f"EQ{i}" for i in range(12)]
+        pools = EquipmentPoolIndex(occupancy, {"pool": units})
+        mismatches = 0
+        for _ in range(2000):
+            start, length = rng.randrange(200), rng.randint(1, 6)
+            slots = [occupancy.find_free_run(u, start, length, start + 40) for u in units]
+            expected = min((slot for slot in slots if slot is not None), default=None)
+            found = pools.find_earliest("pool", start, length, start + 40)
+            if (found[1] if found else None) != expected:
+                mismatches += 1
+            if found:
+                pools.occupy(found[0], found[1], length)
+        self.log_test("Equipment Pools", len(used) == 8 and len(pooled) >= 1.8 * len(single) and mismatches == 0
+                      and status_ok,
+                      f"pooled {len(pooled)} vs single-unit {len(single)} batches, {mismatches} mismatches, "
+                      f"mixer pool under maintenance {maintenance.pools['mixer']}")
+
+    def test_parallel_scenarios(self):
+        """프로세스 풀 병렬 실행 결과가 순차 실행과 같아야 함"""
+        with self.Session() as db:
+            snapshot = MasterDataSnapshot.from_db(db, self.make_sales_plans(200))
+        variants = [
+            ScenarioVariant("base"),
+            ScenarioVariant("long horizon", search_days=60),
+            ScenarioVariant("mixer 1 down", unavailable_equipment=frozenset({"EQ001"})),
+        ]
+        strip = lambda results: [{k: v for k, v in r.items() if k != "elapsed_seconds"} for r in results]
+        sequential = run_scenarios(snapshot, variants, max_workers=1)
+        parallel = run_scenarios(snapshot, variants, max_workers=2)
+        self.log_test("Parallel Scenarios", strip(sequential) == strip(parallel)
+                      and parallel[2]["unscheduled"] > parallel[0]["unscheduled"],
+                      ", ".join(f"{r['name']}: {r['batches']} batches / {r['unscheduled']} unscheduled"
+                                for r in parallel))
+
+    def test_optimize_schedule(self):
+        """최적화 결과는 충돌/선후행 위반이 없고 입력보다 makespan/셋업 시간이 나빠지지 않아야 함"""
+        def expected_setup(batches):
+            # 생성된 배치는 매번 셋업을 포함 (타정 1.0h 는 슬롯 차지, 나머지 0.5h 는 제품이 바뀔 때만 계산)
+            total, previous = 0.0, {}
+            for b in sorted(batches, key=lambda b: (b.start_time, b.id)):
+                if b.process_name == "타정" or previous.get(b.equipment_id) != b.product_id:
+                    total += 1.0 if b.process_name == "타정" else 0.5
+                previous[b.equipment_id] = b.product_id
+            return total
+
+        with self.Session() as db:
+            service = SchedulerService(db)
+            batches = service.generate_schedule_from_sales(self.make_sales_plans(400))
+            optimized = service.optimize_schedule(batches, time_budget_seconds=1.0)
+            report = service.last_optimization
+            # 단일 제품 - 같은 설비에 연속된 같은 제품 타정 배치도 각자 셋업을 포함
+            single = service.generate_schedule_from_sales([
+                SalesPlan(id=f"ONE{i}", product_id="500002", year=2025, month=1, quantity=1000, priority=1)
+                for i in range(6)
+            ])
+            service.optimize_schedule(single, time_budget_seconds=0.05)
+            single_before = service.last_optimization["setup_hours_before"]
+            # 최적화 결과를 다시 넣으면 기준 셋업 = 이전 최적화 후 셋업
+            service.optimize_schedule(optimized, time_budget_seconds=0.05)
+            again_before = service.last_optimization["setup_hours_before"]
+        valid = all(SchedulerService(None).validate_schedule(s)["is_valid"] for s in (batches, optimized))
+        baseline_ok = (abs(report["setup_hours_before"] - expected_setup(batches)) < 1e-6
+                       and abs(single_before - expected_setup(single)) < 1e-6
+                       and abs(again_before - report["setup_hours_after"]) < 1e-6)
+        improved = report["setup_hours_saved"] > 0 or report["makespan_improvement_hours"] > 0
+        self.log_test("Optimize Schedule", valid and len(optimized) == len(batches) and improved and baseline_ok
+                      and report["makespan_improvement_hours"] >= 0 and report["setup_hours_saved"] >= 0,
+                      f"makespan {report['makespan_hours_before']:.0f}h -> {report['makespan_hours_after']:.0f}h, "
+                      f"setup {report['setup_hours_before']:.1f}h -> {report['setup_hours_after']:.1f}h "
+                      f"in {report['iterations']} iterations, single-product baseline {single_before:.1f}h")
+
+        # 설비 순서가 로트 선후행과 순환하는 입력 (A1→A2, B1→B2 인데 EQ1: B2, A1 / EQ2: A2, B1)
+        jobs = [SlotJob(i, equipment_id, "P", 1, 0, 0.0, 0)
+                for i, equipment_id in enumerate(["EQ1", "EQ2", "EQ2", "EQ1"])]  # A1, A2, B1, B2
+        jobs[1].lot_predecessors = [0]
+        jobs[3].lot_predecessors = [2]
+        optimizer = ScheduleOptimizer(jobs, {"EQ1": [3, 0], "EQ2": [1, 2]})
+        cyclic = optimizer.decode(optimizer.initial) is None
+        order, (starts, ends, _) = optimizer.run(0.05)
+        self.log_test("Optimize Schedule Non-topological Input",
+                      cyclic and starts[1] >= ends[0] and starts[3] >= ends[2]
+                      and sorted(sum(order.values(), [])) == [0, 1, 2, 3],
+                      f"order {order}, starts {starts}")
+
+    def test_bulk_persist(self):
+        """청크 단위 일괄 저장과 스케줄 교체가 호출자 트랜잭션 안에서 처리되어야 함 (실패 시 롤백하면 기존 배치 유지)"""
+        def generate(suffix):
+            with self.Session() as db:
+                batches = SchedulerService(db).generate_schedule_from_sales(self.make_sales_plans(100))
+            for i, batch in enumerate(batches):
+                batch.lot_number = f"{batch.lot_number}-{suffix}{i}"  # 로트 순번 중복 방지
+            return batches
+
+        with self.Session() as db:
+            first = persist_batches(db, generate("A"), schedule_id="S1", chunk_size=100)
+            db.commit()
+            second = persist_batches(db, generate("B"), schedule_id="S1", replace=True, chunk_size=100)
+            left_open = db.in_transaction()  # 커밋은 호출자 몫
+            db.commit()
+            broken = generate("C")
+            broken[-1].lot_number = broken[0].lot_number
+            try:
+                persist_batches(db, broken, schedule_id="S1", replace=True, chunk_size=100)
+                db.commit()
+                rolled_back = False
+            except IntegrityError:
+                db.rollback()
+                rolled_back = True
+            # 기간 조회 하한보다 긴 배치는 저장 거부 (조회에서 조용히 빠지지 않도록)
+            too_long = generate("D")
+            too_long[0].end_time = too_long[0].start_time + MAX_BATCH_DURATION + timedelta(hours=1)
+            try:
+                persist_batches(db, too_long, schedule_id="S1", replace=True, chunk_size=100)
+                long_rejected = False
+            except ValueError:
+                long_rejected = True
+            db.rollback()
+            stored = db.query(Batch).filter_by(schedule_id="S1").count()
+            kept = db.query(Batch).filter(Batch.lot_number.like("%-B%")).count()
+            db.query(Batch).delete()
+            db.commit()
+
+        self.log_test("Bulk Persist", first["inserted"] == second["deleted"] == second["inserted"] == stored == kept
+                      and second["chunks"] == -(-stored // 100) and rolled_back and long_rejected and left_open,
+                      f"{stored} rows in {second['chunks']} chunks, {second['rows_per_second']:,.0f} rows/sec")
+
+    def test_database_profile(self):
+        """SQLite 연결마다 성능 PRAGMA 가 적용되고 읽기 전용 엔진은 쓰기를 거부해야 함"""
+        with tempfile.TemporaryDirectory() as directory:
+            url = f"sqlite:///{directory}/profile.db"
+            write_engine, read_engine = create_db_engine(url), create_db_engine(url, read_only=True)
+            Base.metadata.create_all(bind=write_engine)
+            with write_engine.connect() as connection:
+                pragmas = {name: connection.exec_driver_sql(f"PRAGMA {name}").scalar()
+                           for name in ("journal_mode", "synchronous", "busy_timeout")}
+            with read_engine.connect() as connection:
+                try:
+                    connection.exec_driver_sql("DELETE FROM batches")
+                    rejected = False
+                except OperationalError:
+                    rejected = True
+            write_engine.dispose()
+            read_engine.dispose()
+        self.log_test("Database Profile", pragmas == {"journal_mode": "wal", "synchronous": 1,
+                                                      "busy_timeout": SQLITE_PRAGMAS["busy_timeout"]} and rejected,
+                      f"{pragmas}, read-only write rejected: {rejected}")
+
+    def test_schema_migration(self):
+        """기존 aps.db 스키마(신규 컬럼/인덱스 없음)에 데이터 손실 없이 컬럼과 인덱스가 추가되어야 함"""
+        with tempfile.TemporaryDirectory() as directory:
+            engine = create_engine(f"sqlite:///{directory}/legacy.db")
+            with engine.begin() as connection:
+                connection.exec_driver_sql(LEGACY_BATCHES_DDL)
+                connection.exec_driver_sql(
+                    "INSERT INTO batches (id, lot_number, quantity, start_time, end_time) "
+                    "VALUES ('B1', 'LOT-1', 10, '2025-01-01 00:00:00', '2025-01-01 02:00:00')")
+            added = migrate_database(engine)
+            Base.metadata.create_all(bind=engine)
+            again = migrate_database(engine)
+            with sessionmaker(bind=engine)() as db:
+                kept = db.get(Batch, "B1")
+                kept_ok = kept is not None and kept.schedule_id is None
+            engine.dispose()
+        self.log_test("Schema Migration", set(added["columns"]) == {"batches.sales_plan_id", "batches.sequence",
+                                                                    "batches.schedule_id"}
+                      and len(added["indexes"]) == 4 and again == {"columns": [], "indexes": []} and kept_ok,
+                      f"added {added['columns']} and {added['indexes']}")
+
+    def test_query_plans(self):
+        """핫 쿼리가 복합 인덱스를 사용하고 정렬용 임시 B-tree 를 만들지 않아야 함"""
+        window = (datetime(2025, 1, 1), datetime(2025, 2, 1))
+        queries = {
+            "ix_batches_equipment_time": select(Batch.id).where(
+                Batch.equipment_id == "EQ001", Batch.start_time < window[1], Batch.end_time > window[0]),
+            "ix_batches_product_start": select(Batch.id).where(
+                Batch.product_id == "500002", Batch.start_time >= window[0]).order_by(Batch.start_time),
+            "ix_product_processes_product_sequence": select(ProductProcess.product_id, Process.duration_hours)
+                .join(Process, ProductProcess.process_id == Process.id)
+                .where(ProductProcess.product_id.in_(PRODUCT_IDS))
+                .order_by(ProductProcess.product_id, ProductProcess.sequence),
+            "ix_sales_plans_period_priority": select(SalesPlan.id).where(
+                SalesPlan.year == 2025, SalesPlan.month == 1).order_by(SalesPlan.priority),
+        }
+        missing = []
+        with self.engine.connect() as connection:
+            for index_name, statement in queries.items():
+                sql = str(statement.compile(dialect=self.engine.dialect, compile_kwargs={"literal_binds": True}))
+                plan = " | ".join(row[-1] for row in connection.exec_driver_sql(f"EXPLAIN QUERY PLAN {sql}"))
+                if index_name not in plan or "TEMP B-TREE" in plan:
+                    missing.append(f"{index_name}: {plan}")
+        self.log_test("Query Plans", not missing, "; ".join(missing) or f"{len(queries)} hot queries use indexes")
+
+    def test_schedule_window_paging(self):
+        """기간/설비 조건 keyset 페이지를 이어 읽은 결과가 전체 조회와 같고 인덱스 범위 조회여야 함"""
+        start, end = datetime(2025, 1, 5), datetime(2025, 1, 9)
+        with self.Session() as db:
+            persist_batches(db, [
+                Batch(id=f"W{i:05d}", lot_number=f"LOT-W{i:05d}", product_id=PRODUCT_IDS[i % 8],
+                      equipment_id=f"EQ00{i % 8 + 1}", quantity=1, start_time=datetime(2025, 1, 1) + timedelta(hours=i // 8),
+                      end_time=datetime(2025, 1, 1) + timedelta(hours=i // 8 + 3))
+                for i in range(8 * 24 * 14)
+            ], schedule_id="window")
+            db.commit()
+            expected = [row.id for row in schedule_window_query(db, start, end, ["EQ001", "EQ002"])]
+            paged, cursor, pages = [], None, 0
+            while True:
+                rows, cursor = fetch_schedule_page(db, start, end, ["EQ001", "EQ002"], limit=7, cursor=cursor)
+                paged.extend(row.id for row in rows)
+                pages += 1
+                if cursor is None:
+                    break
+            statement = schedule_window_query(db, start, end).statement
+            sql = str(statement.compile(dialect=self.engine.dialect, compile_kwargs={"literal_binds": True}))
+            plan = " | ".join(row[-1] for row in db.connection().exec_driver_sql(f"EXPLAIN QUERY PLAN {sql}"))
+            db.query(Batch).delete()
+            db.commit()
+        # 3시간 배치가 매시간 시작 → 설비당 기간 시작 2시간 전부터 시작한 배치까지 포함
+        overlapping = len(expected) == 2 * (4 * 24 + 2)
+        self.log_test("Schedule Window Paging", paged == expected and overlapping and "ix_batches_start" in plan,
+                      f"{len(paged)} batches in {pages} pages, plan: {plan}")
+
+    def test_data_versions(self):
+        """커밋된 쓰기(ORM flush, 일괄 INSERT/UPDATE/DELETE)마다 DB 버전 행이 오르고 롤백은 반영되지 않아야 함,
+        같은 DB 를 보는 프로세스(워커)끼리 같은 ETag"""
+        def stored(kind):
+            with self.engine.connect() as connection:
+                return connection.execute(
+                    select(DataVersion.version).where(DataVersion.kind == kind)
+                ).scalar() or 0
+
+        worker_a, worker_b = DataVersions(), DataVersions()
+        worker_a.bind(self.engine, poll_interval=0)
+        worker_b.bind(self.engine, poll_interval=0)
+        before, master_before = stored("schedule"), stored("master")
+        etag_before = worker_a.etag(("schedule",), "/api/schedule?")
+        with self.Session() as db:
+            db.add(Batch(id="V1", lot_number="LOT-V1", quantity=1,
+                         start_time=datetime(2025, 1, 1), end_time=datetime(2025, 1, 1, 2)))
+            db.commit()
+            after_flush = stored("schedule")
+            db.execute(update(Batch).where(Batch.id == "V1").values(quantity=2))
+            db.rollback()
+            after_rollback = stored("schedule")
+            db.query(Batch).filter_by(id="V1").delete()
+            db.commit()
+            after_delete = stored("schedule")
+        etag = worker_a.etag(("schedule",), "/api/schedule?")
+        shared = etag == worker_b.etag(("schedule",), "/api/schedule?") and etag != etag_before
+        # 폴링 주기와 무관하게 호출자 트랜잭션에서 읽은 값 (타임라인 캐시 확인용)
+        unpolled = DataVersions()
+        with self.Session() as db:
+            read = unpolled.read(db, "schedule")
+        read_ok = read is not None and read[1] == after_delete and unpolled.get("schedule") == after_delete
+        self.log_test("Data Versions", after_flush == before + 1 and after_rollback == after_flush
+                      and after_delete == after_flush + 1 and stored("master") == master_before and shared
+                      and versions.get("schedule") == after_delete and read_ok
+                      and etag_matches(f'W/"x", {etag}', etag) and not etag_matches('"stale"', etag),
+                      f"schedule {before} -> {after_delete}, etag {etag}, same across workers: {shared}")
+
+    def test_schedule_stream(self):
+        """NDJSON 스트림이 전체 배치와 요약을 내보내고 최대 메모리가 스케줄 크기에 비례하지 않아야 함"""
+        def measure(count):
+            with self.Session() as db:
+                persist_batches(db, [
+                    Batch(id=f"S{i:06d}", lot_number=f"LOT-S{i:06d}", product_id=PRODUCT_IDS[i % 8],
+                          equipment_id=f"EQ00{i % 8 + 1}", quantity=1, process_name="혼합",
+                          start_time=datetime(2025, 1, 1) + timedelta(hours=i // 8),
+                          end_time=datetime(2025, 1, 1) + timedelta(hours=i // 8 + 1))
+                    for i in range(count)
+                ], schedule_id="stream")
+                db.commit()
+                tracemalloc.start()
+                lines, last = 0, b""
+                for chunk in iter_schedule_ndjson(db):
+                    lines += chunk.count(b"\n")
+                    last = chunk
+                peak = tracemalloc.get_traced_memory()[1]
+                tracemalloc.stop()
+                db.query(Batch).delete()
+                db.commit()
+            summary = json.loads(last.splitlines()[-1])["summary"]
+            return lines - 1 == summary["total_batches"] == count, peak
+
+        small_ok, small_peak = measure(4000)
+        large_ok, large_peak = measure(40000)
+        self.log_test("Schedule Stream", small_ok and large_ok and large_peak < small_peak * 2,
+                      f"peak {small_peak / 1024:.0f} KiB (4k) vs {large_peak / 1024:.0f} KiB (40k)")
+
+    def test_lot_numbers(self):
+        """로트 번호: 실행 간 중복 없이 이어지고, 예약 쿼리 수는 고정, 동시 할당기끼리 구간이 겹치지 않음"""
+        plans = self.make_sales_plans(2000)
+        with self.Session() as db:
+            first = SchedulerService(db).generate_schedule_from_sales(plans)
+            allocator = LotNumberAllocator(self.engine)
+            with QueryCounter(self.engine) as counter:
+                second = SchedulerService(db, lot_numbers=allocator).generate_schedule_from_sales(plans)
+        lots = [b.lot_number for b in first + second]
+        key = first[0].lot_number.rsplit("-", 1)[0]
+        sequences = sorted(int(lot.rsplit("-", 1)[1]) for lot in lots if lot.startswith(key + "-"))
+
+        with tempfile.TemporaryDirectory() as directory:
+            # 스레드별 연결이 같은 DB 를 보도록 파일 DB 사용
+            engine = create_db_engine(f"sqlite:///{directory}/lots.db")
+            Base.metadata.create_all(bind=engine)
+            allocated, errors = [], []
+
+            def worker(index):
+                try:
+                    allocator = LotNumberAllocator(engine, block_size=16)
+                    numbers = [allocator.allocate("P1", datetime(2025, 1, 1)) for _ in range(100)]
+                    first_sequence = allocator.reserve({("P1", "20250101"): 50})[("P1", "20250101")]
+                    numbers += [f"LOT-P1-20250101-{n:03d}" for n in range(first_sequence, first_sequence + 50)]
+                    allocated.extend(numbers)
+                except Exception as e:
+                    errors.append(e)
+
+            threads = [threading.Thread(target=worker, args=(i,)) for i in range(8)]
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+            engine.dispose()
+
+        ok = (len(set(lots)) == len(lots) and sequences == list(range(sequences[0], sequences[0] + len(sequences)))
+              and allocator.round_trips == 1 and counter.count <= 6
+              and not errors and len(allocated) == 8 * 150 and len(set(allocated)) == len(allocated))
+        self.log_test("Lot Numbers", ok,
+                      f"{len(lots)} lots in 2 runs, {len(set(lots))} unique, {key} {sequences[0]}..{sequences[-1]}, "
+                      f"generation {counter.count} queries; "
+                      f"concurrent: {len(set(allocated))}/{len(allocated)} unique, errors: {errors[:1]}")
+
+    def test_sales_plan_import(self):
+        """CSV/XLSX 판매계획을 스트리밍으로 읽어 유효 행만 저장하고 거부 행 사유를 반환해야 함"""
+        from openpyxl import Workbook
+
+        header = ["제품코드", "연도", "월", "수량", "우선순위"]
+        rows = [["GNX40-100", 2025, 3, 1200, 1],      # 제품코드
+                ["500005", 2025, 3, "1,500", None],   # 제품 ID, 천 단위 구분자, 기본 우선순위
+                ["UNKNOWN", 2025, 3, 100, 1],         # 없는 제품
+                ["500008", 2025, 13, 100, 1],         # 잘못된 월
+                ["500008", 2025, 3, 0, 1],            # 수량 0
+                [None, None, None, None, None]]       # 빈 행 (무시)
+        with tempfile.TemporaryDirectory() as directory:
+            csv_path = Path(directory) / "plan.csv"
+            csv_path.write_text("\n".join(",".join(f'"{v}"' if v is not None else "" for v in row)
+                                          for row in [header] + rows), encoding="utf-8-sig")
+            xlsx_path = Path(directory) / "plan.xlsx"
+            workbook = Workbook()
+            for row in [header] + rows:
+                workbook.active.append(row)
+            workbook.save(xlsx_path)
+
+            results = []
+            with self.Session() as db:
+                before = {plan_id for (plan_id,) in db.query(SalesPlan.id)}
+                for path, kind in ((csv_path, "csv"), (xlsx_path, "xlsx")):
+                    results.append(import_sales_plan_file(db, str(path), kind, chunk_size=1))
+                imported = db.query(SalesPlan).filter(SalesPlan.id.notin_(before)).all()
+                stored = sorted((plan.product_id, plan.quantity, plan.priority) for plan in imported)
+                db.query(SalesPlan).filter(SalesPlan.id.notin_(before)).delete(synchronize_session=False)
+                db.commit()
+
+        counts_ok = all((r["total_rows"], r["imported"], r["rejected"]) == (5, 2, 3) for r in results)
+        rejected_ok = all([d["row"] for d in r["rejected_rows"]] == [4, 5, 6] for r in results)
+        stored_ok = stored == [("500002", 1200, 1)] * 2 + [("500005", 1500, 1)] * 2
+        # 구형 .xls 는 xlrd 가 있으면 허용, 없으면 안내와 함께 거부 (다른 확장자로 조용히 떨어지지 않음)
+        try:
+            xls_ok = file_kind("plan.XLS") == "xls" and XLRD_AVAILABLE
+        except SalesPlanImportError as e:
+            xls_ok = not XLRD_AVAILABLE and "xlrd" in str(e)
+        self.log_test("Sales Plan Import", counts_ok and rejected_ok and stored_ok and xls_ok,
+                      f"csv {results[0]['imported']}/{results[0]['total_rows']}, "
+                      f"xlsx {results[1]['imported']}/{results[1]['total_rows']}, "
+                      f"rejected: {results[0]['rejected_rows']}")
+
+    def test_generation_jobs(self):
+        """생성 작업: 용량 초과/같은 schedule_id 중복 거부, 대기/실행 중 취소, 취소된 작업은 저장하지 않음,
+        실제 판매계획 작업은 성공해 배치를 저장하고 다시 실행하면 교체"""
+        with tempfile.TemporaryDirectory() as directory:
+            # 워커 스레드가 같은 DB 를 보도록 파일 DB 사용
+            engine = create_db_engine(f"sqlite:///{directory}/jobs.db")
+            Base.metadata.create_all(bind=engine)
+            Session = sessionmaker(bind=engine)
+            with Session() as db:
+                create_sample_master_data(db)
+                db.add_all(self.make_sales_plans(8))
+                db.commit()
+
+            gate = threading.Event()
+
+            def gated_session():
+                gate.wait(5)  # 첫 작업을 실행 중 상태로 붙잡아 둠
+                return Session()
+
+            queue = GenerationJobQueue(gated_session, max_workers=1, max_queued=1)
+            running = queue.submit(2025, 1)
+            for _ in range(100):
+                if running.status == RUNNING:
+                    break
+                time.sleep(0.01)
+            conflicts = []
+            for year, month in ((2025, 1), (None, None)):
+                try:
+                    queue.submit(year, month)
+                except JobConflict as e:
+                    conflicts.append(e.job is running)
+            queued = queue.submit(2025, 2)
+            try:
+                queue.submit(2025, 3)
+                rejected = False
+            except JobQueueFull:
+                rejected = True
+
+            queue.cancel(queued.id)
+            queue.cancel(running.id)
+            gate.set()
+            queue.shutdown(wait=True)
+
+            finished = []
+            queue = GenerationJobQueue(Session, on_success=lambda job, batches, replaced: finished.append(job))
+            empty = queue.submit(2030, 1)
+            for _ in range(500):
+                if empty.status in FINISHED_STATES:
+                    break
+                time.sleep(0.01)
+            queue.shutdown(wait=True)
+
+            with Session() as db:
+                saved = db.query(Batch).count()
+
+            # 실제 판매계획 월 - 두 번 실행 (두 번째는 첫 번째 배치를 교체, 로트 번호 중복 없음)
+            queue = GenerationJobQueue(Session)
+            real_runs = []
+            for _ in range(2):
+                job = queue.submit(2025, 1)
+                for _ in range(500):
+                    if job.status in FINISHED_STATES:
+                        break
+                    time.sleep(0.01)
+                with Session() as db:
+                    stored = db.query(Batch).filter(Batch.schedule_id == job.schedule_id).count()
+                real_runs.append((job.status, job.error, (job.result or {}).get('batches_created'), stored))
+            queue.shutdown(wait=True)
+            with Session() as db:
+                db.query(Batch).delete()
+                db.commit()
+            engine.dispose()
+
+        real_ok = all(status == SUCCEEDED and created == stored == 32 for status, _, created, stored in real_runs)
+        ok = (rejected and conflicts == [True, True] and real_ok and queued.status == CANCELLED and running.status == CANCELLED and saved == 0
+              and running.to_dict()['progress']['plans_total'] == 8
+              and empty.status == SUCCEEDED and finished == [empty]
+              and empty.result['batches_created'] == 0)
+        self.log_test("Generation Jobs", ok,
+                      f"rejected over capacity: {rejected}, running: {running.status} ({running.error}), "
+                      f"queued: {queued.status}, empty month: {empty.status}, conflicts rejected: {conflicts}, "
+                      f"real month runs (status, error, created, stored): {real_runs}")
+
+    def test_schedule_broadcast(self):
+        """연속 변경은 배치별로 병합되고, 구독 필터별로 전달되며, 멈춘 구독자는 resync 만 받아야 함"""
+        class FakeSocket:
+            def __init__(self, stalled=False):
+                self.sent = []
+                self.stalled = stalled
+                self.closed = asyncio.Event()
+
+            async def send_text(self, message):
+                if self.stalled:
+                    await asyncio.Event().wait()
+                self.sent.append(json.loads(message))
+
+            async def receive_json(self):
+                await self.closed.wait()
+                raise ConnectionError
+
+        base = datetime(2025, 1, 1)
+
+        async def scenario():
+            broadcaster = ScheduleBroadcaster(interval=3600)
+            sockets = [FakeSocket() for _ in range(150)]
+            filters = [parse_filter(f"EQ00{i % 8 + 1}") for i in range(150)]
+            stalled = FakeSocket(stalled=True)
+            window = FakeSocket()
+            tasks = [asyncio.create_task(broadcaster.serve(socket, subscription))
+                     for socket, subscription in zip(sockets, filters)]
+            tasks.append(asyncio.create_task(broadcaster.serve(stalled, parse_filter())))
+            tasks.append(asyncio.create_task(broadcaster.serve(
+                window, parse_filter(start=(base + timedelta(days=1)).isoformat()))))
+            await asyncio.sleep(0)
+
+            # 10 개 배치를 각 100 번씩 수정 + 생성 후 삭제 1건 + 삭제 1건
+            gc.collect()  # 앞선 테스트가 남긴 객체의 전체 GC 가 측정 구간에 끼지 않도록
+            started = time.perf_counter()
+            for step in range(100):
+                broadcaster.publish(
+                    BatchDelta(UPDATED, f"B{i}", {'start_time': base + timedelta(hours=step)},
+                               ((f"EQ00{i % 8 + 1}", base + timedelta(hours=step), base + timedelta(hours=step + 2)),))
+                    for i in range(10)
+                )
+            broadcaster.publish([
+                BatchDelta(CREATED, "NEW", {'id': "NEW"}, (("EQ001", base, base + timedelta(hours=2)),)),
+                BatchDelta(DELETED, "NEW", locations=(("EQ001", base, base + timedelta(hours=2)),)),
+                BatchDelta(DELETED, "B9", locations=(("EQ002", base, base + timedelta(hours=2)),)),
+            ])
+            publish_ms = (time.perf_counter() - started) * 1000
+
+            sent = broadcaster.flush()
+            for _ in range(SUBSCRIBER_OVERFLOW):
+                broadcaster.publish([BatchDelta(UPDATED, "B0", {'quantity': 1}, (("EQ001", base, base),))])
+                broadcaster.flush()
+                await asyncio.sleep(0.001)  # 정상 구독자는 전송, 멈춘 구독자는 대기열 초과
+            await asyncio.sleep(0.05)
+            lagging = next(sub for sub in broadcaster._subscribers if sub.websocket is stalled)
+            resync = lagging.dropped > 0 and json.loads(lagging.queue.get_nowait())['type'] == 'resync'
+            for socket in sockets + [stalled, window]:
+                socket.closed.set()
+            await asyncio.gather(*tasks, return_exceptions=True)
+            return sockets, stalled, window, sent, publish_ms, broadcaster, resync
+
+        sockets, stalled, window, sent, publish_ms, broadcaster, resync = asyncio.run(scenario())
+        eq2 = sockets[1].sent[0]
+        coalesced = (eq2['updated'] == [{'id': "B1", 'start_time': (base + timedelta(hours=99)).isoformat()}]
+                     and eq2['deleted'] == ["B9"] and eq2['created'] == [])
+        eq1_ids = [d['id'] for d in sockets[0].sent[0]['updated']]
+        window_ids = sorted(d['id'] for d in window.sent[0]['updated'])  # 1일 이후 위치만
+        ok = (coalesced and eq1_ids == ["B0", "B8"] and all(not s.sent[0]['created'] for s in sockets)
+              and len(sockets[0].sent) == 1 + SUBSCRIBER_OVERFLOW and stalled.sent == [] and resync
+              and broadcaster._subscribers == [] and sent == 152
+              and window_ids == sorted(f"B{i}" for i in range(9)) and publish_ms < 50)
+        self.log_test("Schedule Broadcast", ok,
+                      f"1000 updates coalesced into 1 message per subscriber ({sent} subscribers), "
+                      f"publish {publish_ms:.1f} ms")
+
+    def test_broadcast_filter_errors(self):
+        """시간대가 있는 구독 기간은 로컬 시각으로 변환되고, 한 필터의 오류가 다른 구독자 전송을 막지 않아야 함"""
+        class QueueSocket:
+            def __init__(self):
+                self.sent = []
+                self.closed = asyncio.Event()
+
+            async def send_text(self, message):
+                self.sent.append(json.loads(message))
+
+            async def receive_json(self):
+                await self.closed.wait()
+                raise ConnectionError
+
+        utc = parse_filter(start="2025-01-01T00:00:00Z", end="2025-01-02T00:00:00+00:00")
+        local_start = datetime(2025, 1, 1, tzinfo=timezone.utc).astimezone().replace(tzinfo=None)
+        parsed_ok = utc.start == local_start and utc.end == local_start + timedelta(days=1)
+        base = datetime(2025, 1, 1)
+
+        async def scenario():
+            broadcaster = ScheduleBroadcaster(interval=0.01)
+            healthy, broken = QueueSocket(), QueueSocket()
+            # 시간대가 남은 필터 - naive 배치 시각과 비교하면 TypeError
+            aware = SubscriptionFilter(start=datetime(2025, 1, 1, tzinfo=timezone.utc))
+            tasks = [asyncio.create_task(broadcaster.serve(healthy, utc)),
+                     asyncio.create_task(broadcaster.serve(broken, aware))]
+            broadcaster.start()
+            await asyncio.sleep(0)
+            for step in range(2):  # 오류 후에도 전송 작업이 계속 동작해야 함
+                broadcaster.publish([BatchDelta(UPDATED, "B0", {'quantity': step},
+                                                (("EQ001", base + timedelta(hours=12), base + timedelta(hours=14)),))])
+                await asyncio.sleep(0.05)
+            running = not broadcaster._task.done()
+            await broadcaster.stop()
+            healthy.closed.set()
+            broken.closed.set()
+            await asyncio.gather(*tasks, return_exceptions=True)
+            return healthy, broken, broadcaster, running
+
+        logging.disable(logging.CRITICAL)  # 의도한 오류의 스택 출력 숨김
+        try:
+            healthy, broken, broadcaster, running = asyncio.run(scenario())
+        finally:
+            logging.disable(logging.NOTSET)
+        delivered = [m['updated'] for m in healthy.sent]
+        ok = (parsed_ok and running and delivered == [[{'id': "B0", 'quantity': 0}], [{'id': "B0", 'quantity': 1}]]
+              and [m['type'] for m in broken.sent] == ['resync', 'resync'] and broadcaster.stats['errors'] == 2)
+        self.log_test("Broadcast Filter Errors", ok,
+                      f"utc filter start {utc.start}, healthy {len(healthy.sent)} messages, "
+                      f"broken {[m['type'] for m in broken.sent]}, task running: {running}")
+
+    def test_schedule_export(self):
+        """내보내기: 제품명/설비명 조인, 기간/설비 필터, XLSX 행 수 일치, CSV 최대 메모리가 행 수에 비례하지 않아야 함 (fetch 크기 이상에서)"""
+        from openpyxl import load_workbook
+
+        def export(count, format, keep=True, **filters):
+            with self.Session() as db:
+                persist_batches(db, [
+                    Batch(id=f"X{i:06d}", lot_number=f"LOT-X{i:06d}", product_id=PRODUCT_IDS[i % 8],
+                          equipment_id=f"EQ00{i % 8 + 1}", quantity=1, process_name="혼합",
+                          start_time=datetime(2025, 1, 1) + timedelta(hours=i // 8),
+                          end_time=datetime(2025, 1, 1) + timedelta(hours=i // 8 + 1))
+                    for i in range(count)
+                ], schedule_id="export")
+                db.commit()
+                tracemalloc.start()
+                chunks = []
+                for chunk in iter_export(iter_export_rows(db, **filters), format):
+                    chunks.append(chunk if keep else b"")
+                peak = tracemalloc.get_traced_memory()[1]
+                tracemalloc.stop()
+                db.query(Batch).delete()
+                db.commit()
+            return b"".join(chunks), peak
+
+        content, _ = export(800, "csv", start=datetime(2025, 1, 2), end=datetime(2025, 1, 3),
+                            equipment_ids=["EQ001"])
+        rows = list(csv.reader(io.StringIO(content.decode("utf-8-sig"))))
+        csv_ok = (tuple(rows[0]) == EXPORT_COLUMNS and len(rows) == 1 + 24
+                  and rows[1][2] == "기넥신에프정 40mg 100T" and rows[1][4] == "혼합기 1호")
+
+        content, _ = export(800, "excel")
+        sheet = load_workbook(io.BytesIO(content), read_only=True).active
+        xlsx_rows = list(sheet.iter_rows(values_only=True))
+        xlsx_ok = len(xlsx_rows) == 801 and xlsx_rows[1][6] == datetime(2025, 1, 1)
+
+        # 시트 행 한도를 넘으면 헤더를 반복하며 다음 시트로 (행 누락 없음)
+        workbook = load_workbook(io.BytesIO(b"".join(iter_export_file(
+            ((f"LOT{i}",) + ("",) * (len(EXPORT_COLUMNS) - 1) for i in range(250)), "excel", xlsx_max_rows=100
+        ))), read_only=True)
+        sheets = [list(sheet.iter_rows(values_only=True)) for sheet in workbook.worksheets]
+        split_ok = ([len(rows) for rows in sheets] == [100, 100, 53]
+                    and all(rows[0] == EXPORT_COLUMNS for rows in sheets)
+                    and [row[0] for rows in sheets for row in rows[1:]] == [f"LOT{i}" for i in range(250)]
+                    and workbook.sheetnames == ["Schedule", "Schedule (2)", "Schedule (3)"])
+
+        _, small_peak = export(8000, "csv", keep=False)
+        _, large_peak = export(40000, "csv", keep=False)
+        self.log_test("Schedule Export", csv_ok and xlsx_ok and split_ok and large_peak < small_peak * 2,
+                      f"csv window rows {len(rows) - 1}, xlsx rows {len(xlsx_rows) - 1}, "
+                      f"split sheets {[len(rows) for rows in sheets]}, "
+                      f"csv peak {small_peak / 1024:.0f} KiB (8k) vs {large_peak / 1024:.0f} KiB (40k)")
+
+    def test_master_data_cache(self):
+        """마스터 데이터 캐시: 변경이 없으면 재조회 없음, 커밋된 변경/무효화 후 재조회, 스케줄 생성도 캐시 사용"""
+        cache = MasterDataCache(self.Session)
+        with QueryCounter(self.engine) as counter:
+            first = cache.entry("products")
+            cache.entry("products")
+            cache.routing()
+            cache.routing()
+        cached_queries = counter.count
+
+        plans = self.make_sales_plans(10)
+        with self.Session() as db:
+            expected = SchedulerService(db).generate_schedule_from_sales(plans)
+            with QueryCounter(self.engine) as counter:
+                batches = SchedulerService(db, master_data=cache,
+                                           lot_numbers=LotNumberAllocator()).generate_schedule_from_sales(plans)
+        same = [(b.equipment_id, b.start_time) for b in batches] == [(b.equipment_id, b.start_time) for b in expected]
+        generation_queries = counter.count
+
+        with self.Session() as db:
+            product = db.get(Product, PRODUCT_IDS[0])
+            original = product.name
+            product.name = "변경된 제품명"
+            db.commit()
+            renamed = cache.product_names()[PRODUCT_IDS[0]]
+            product.name = original
+            db.commit()
+        cache.invalidate("products")
+        reloaded = cache.entry("products")
+
+        ok = (cached_queries == 4 and generation_queries == 0 and same and renamed == "변경된 제품명"
+              and json.loads(first.body) == first.value and reloaded.value == first.value)
+        self.log_test("Master Data Cache", ok,
+                      f"{cached_queries} queries to load products + routing (none on re-read), "
+                      f"{generation_queries} during generation, "
+                      f"loads {cache.stats['loads']}")
+
+    def test_master_data_refresh(self):
+        """DB 를 직접 고친 뒤 새로고침하면 마스터 데이터 ETag 가 바뀌어 조건부 요청이 304 가 아니어야 함"""
+        cache = MasterDataCache(self.Session)
+        old_body = cache.entry("products").body
+        old_etag = versions.etag(("master",), "/api/products?")
+        table = Product.__table__
+        with self.engine.begin() as connection:  # 세션 밖 변경 (버전 추적 없음)
+            original = connection.execute(select(table.c.name).where(table.c.id == PRODUCT_IDS[0])).scalar()
+            connection.execute(update(table).where(table.c.id == PRODUCT_IDS[0]).values(name="외부 변경"))
+        try:
+            cache.invalidate()
+            refreshed = cache.entry("products")
+            new_etag = versions.etag(("master",), "/api/products?")
+            unchanged_etag = versions.etag(("master",), "/api/products?")
+            cache.invalidate()
+            cache.entry("products")  # 내용이 같으면 버전 유지
+            stable = versions.etag(("master",), "/api/products?") == unchanged_etag
+        finally:
+            with self.engine.begin() as connection:
+                connection.execute(update(table).where(table.c.id == PRODUCT_IDS[0]).values(name=original))
+            cache.invalidate()
+            cache.entry("products")
+
+        ok = (refreshed.body != old_body and not etag_matches(old_etag, new_etag) and stable
+              and "외부 변경".encode() in refreshed.body)
+        self.log_test("Master Data Refresh", ok,
+                      f"etag {old_etag} -> {new_etag}, unchanged reload keeps etag: {stable}")
+
+    def test_batch_store(self):
+        """메모리 배치 저장소: 수정/삭제 후에도 기간 조회와 요약이 전체 스캔 결과와 같아야 함"""
+        rng = random.Random(7)
+        origin = datetime(2025, 1, 1)
+
+        def make_batch(i):
+            start = origin + timedelta(hours=2 * rng.randrange(0, 1000))
+            return {"id": f"B{i:05d}", "product_id": rng.choice(PRODUCT_IDS), "equipment_id": f"EQ{rng.randrange(20):03d}",
+                    "start_time": start.isoformat(), "end_time": (start + timedelta(hours=2 * rng.randint(1, 6))).isoformat()}
+
+        def scan(batches, start, end, equipment_ids=None, product_id=None):
+            return sorted((b for b in batches
+                           if datetime.fromisoformat(b["end_time"]) > start and datetime.fromisoformat(b["start_time"]) < end
+                           and (equipment_ids is None or b["equipment_id"] in equipment_ids)
+                           and (product_id is None or b["product_id"] == product_id)),
+                          key=lambda b: (b["start_time"], b["id"]))
+
+        batches = [make_batch(i) for i in range(5000)]
+        store = BatchStore(batches)
+        for i in range(2000):
+            batch = batches[rng.randrange(len(batches))]
+            if i % 4 == 0:
+                store.remove(batch["id"])
+                batches.remove(batch)
+            elif i % 4 == 1:
+                added = make_batch(5000 + i)
+                store.add(added)
+                batches.append(added)
+            else:
+                moved = make_batch(0)
+                store.update(batch["id"], {"equipment_id": moved["equipment_id"], "start_time": moved["start_time"],
+                                           "end_time": moved["end_time"], "status": "moved"})
+
+        mismatches = 0
+        for _ in range(200):
+            start = origin + timedelta(hours=rng.randrange(0, 2000))
+            end = start + timedelta(hours=rng.randrange(1, 100))
+            equipment_ids = rng.choice([None, [f"EQ{rng.randrange(20):03d}", f"EQ{rng.randrange(20):03d}"]])
+            product_id = rng.choice([None, rng.choice(PRODUCT_IDS)])
+            expected = scan(batches, start, end, equipment_ids, product_id)
+            if store.window(start, end, equipment_ids, product_id) != expected:
+                mismatches += 1
+
+        expected_summary = {"total_batches": len(batches),
+                            "total_products": len({b["product_id"] for b in batches}),
+                            "total_equipment": len({b["equipment_id"] for b in batches})}
+        ok = mismatches == 0 and store.summary() == expected_summary and list(store) == batches
+        self.log_test("Batch Store", ok,
+                      f"{len(store)} batches after 2000 changes, {mismatches}/200 window mismatches, "
+                      f"summary {store.summary()}")
+
+    def test_log_pipeline(self):
+        """로깅: 요청 ID/라우트/지연 시간 JSON lines, 크기 기준 로테이션, 큐가 차면 막지 않고 버린 건수 집계"""
+        root = logging.getLogger()
+        saved_handlers, saved_level = list(root.handlers), root.level
+        try:
+            with tempfile.TemporaryDirectory() as directory:
+                log_file = Path(directory) / "api.log"
+                pipeline = setup_logging(log_file, json_format=True, max_bytes=2000, backup_count=2, stream=None)
+
+                async def endpoint(scope, receive, send):
+                    scope["route"] = type("Route", (), {"path": "/api/batches/{batch_id}"})()
+                    logging.getLogger("handler").info("moving batch")
+                    await send({"type": "http.response.start", "status": 200, "headers": []})
+                    await send({"type": "http.response.body", "body": b"{}"})
+
+                for i in range(100):
+                    logging.getLogger("filler").info("filler record %d", i)
+                sent = []
+
+                async def capture(message):
+                    sent.append(message)
+
+                scope = {"type": "http", "method": "PUT", "path": "/api/batches/B1",
+                         "headers": [(b"x-request-id", b"req-1")]}
+                asyncio.run(RequestLogMiddleware(endpoint)(scope, None, capture))
+                pipeline.stop()
+
+                files = sorted(p.name for p in Path(directory).iterdir())
+                records = [json.loads(line) for name in files for line in (Path(directory) / name).read_text().splitlines()]
+            by_logger = {r["logger"]: r for r in records}
+            handler_record, access_record = by_logger.get("handler", {}), by_logger.get("access", {})
+            structured = (handler_record.get("request_id") == "req-1"
+                          and handler_record.get("route") == "/api/batches/{batch_id}"
+                          and access_record.get("status") == 200 and access_record.get("latency_ms", -1) >= 0
+                          and (b"x-request-id", b"req-1") in sent[0]["headers"])
+            rotated = files == ["api.log", "api.log.1", "api.log.2"]
+
+            # 리스너가 멈춘 상태에서 큐(10건)를 넘겨 기록 - 호출은 막히지 않고 초과분은 버려짐
+            release = threading.Event()
+
+            class SlowHandler(logging.Handler):
+                def __init__(self):
+                    super().__init__()
+                    self.messages = []
+
+                def emit(self, record):
+                    release.wait(5)
+                    self.messages.append(record.getMessage())
+
+            slow = SlowHandler()
+            handler = DroppingQueueHandler(queue.Queue(maxsize=10))
+            listener = QueueListener(handler.queue, slow)
+            listener.start()
+            logger = logging.getLogger("overload")
+            logger.propagate = False
+            logger.addHandler(handler)
+            started = time.perf_counter()
+            for i in range(1000):
+                logger.info("record %d", i)
+            emit_seconds = time.perf_counter() - started
+            dropped = handler.dropped
+            release.set()
+            time.sleep(0.05)
+            logger.info("after overload")
+            listener.stop()
+            logger.removeHandler(handler)
+            reported = any(m.startswith(f"Dropped {dropped} log records") for m in slow.messages)
+        finally:
+            for handler in list(root.handlers):
+                root.removeHandler(handler)
+            for handler in saved_handlers:
+                root.addHandler(handler)
+            root.setLevel(saved_level)
+
+        ok = structured and rotated and dropped >= 980 and emit_seconds < 1 and reported
+        self.log_test("Log Pipeline", ok,
+                      f"structured: {structured}, files: {files}, dropped {dropped}/1000 in {emit_seconds * 1000:.1f}ms, "
+                      f"drop warning: {reported}")
+
+    def test_metrics(self):
+        """지표: 라우트/상태별 지연 히스토그램, 응답 크기, 처리 중 요청 수, 스케줄러 카운터, 미들웨어 오버헤드"""
+        registry = MetricsRegistry()
+        route = type("Route", (), {"path": "/api/batches/{batch_id}"})()
+        in_flight = []
+
+        async def endpoint(scope, receive, send):
+            if scope["path"] != "/missing":
+                scope["route"] = route
+            in_flight.append(registry.in_flight)
+            await send({"type": "http.response.start", "status": 404 if scope["path"] == "/missing" else 200})
+            await send({"type": "http.response.body", "body": b"x" * 300})
+
+        async def discard(message):
+            pass
+
+        app = MetricsMiddleware(endpoint, registry)
+
+        async def run(count, path):
+            for _ in range(count):
+                await app({"type": "http", "method": "GET", "path": path}, None, discard)
+
+        async def run_bare(count):
+            for _ in range(count):
+                await endpoint({"type": "http", "method": "GET", "path": "/api/batches/B1"}, None, discard)
+
+        asyncio.run(run(3, "/api/batches/B1"))
+        asyncio.run(run(1, "/missing"))
+
+        with self.Session() as db:
+            service = SchedulerService(db, lot_numbers=LotNumberAllocator())
+            service.generate_schedule_from_sales(self.make_sales_plans(50))
+        registry.record_generation("succeeded", service.run_stats)
+        registry.record_generation("cancelled", None)
+        registry.add_collector(lambda: [("aps_test_gauge", "gauge", "test", [({"kind": "a"}, 1.5)])])
+        text = registry.render()
+        lines = set(text.splitlines())
+
+        # 미들웨어 유무에 따른 요청당 추가 시간
+        iterations = 20000
+        bare_started = time.perf_counter()
+        asyncio.run(run_bare(iterations))
+        bare = time.perf_counter() - bare_started
+        measured_started = time.perf_counter()
+        asyncio.run(run(iterations, "/api/batches/B1"))
+        overhead_us = ((time.perf_counter() - measured_started) - bare) / iterations * 1e6
+
+        expected = {
+            'http_request_duration_seconds_count{method="GET",route="/api/batches/{batch_id}",status="200"} 3',
+            'http_request_duration_seconds_bucket{method="GET",route="<unmatched>",status="404",le="+Inf"} 1',
+            'http_response_size_bytes_bucket{method="GET",route="/api/batches/{batch_id}",le="256"} 0',
+            'http_response_size_bytes_bucket{method="GET",route="/api/batches/{batch_id}",le="1024"} 3',
+            'http_requests_in_flight 0',
+            'aps_schedule_jobs_total{status="cancelled"} 1',
+            f'aps_scheduler_batches_placed_total {service.run_stats["batches_placed"]}',
+            f'aps_scheduler_slot_search_iterations_total {service.run_stats["slot_search_iterations"]}',
+            'aps_test_gauge{kind="a"} 1.5',
+        }
+        ok = (expected <= lines and in_flight[:4] == [1, 1, 1, 1] and service.run_stats["slot_search_iterations"] > 0
+              and "# TYPE http_request_duration_seconds histogram" in lines and overhead_us < 50)
+        self.log_test("Metrics", ok,
+                      f"missing lines: {sorted(expected - lines)}, slot searches {service.run_stats['slot_search_iterations']}, "
+                      f"middleware overhead {overhead_us:.1f}us/request")
+
+    def test_generation_job_replacement(self):
+        """월/전체 생성 작업이 같은 판매계획의 배치를 중복 없이 교체하고, 유지 배치와 설비 구간이 겹치지 않아야 함"""
+        def run(queue, year=None, month=None):
+            job = queue.submit(year, month, search_days=45)
+            for _ in range(1000):
+                if job.status in FINISHED_STATES:
+                    break
+                time.sleep(0.01)
+            return job
+
+        with tempfile.TemporaryDirectory() as directory:
+            engine = create_db_engine(f"sqlite:///{directory}/replace.db")
+            Base.metadata.create_all(bind=engine)
+            Session = sessionmaker(bind=engine)
+            january = self.make_sales_plans(120)  # 1월 배치 일부가 2월로 넘어가는 양 (검색 45일)
+            february = [SalesPlan(id=f"FEB{i:03d}", product_id=PRODUCT_IDS[i % len(PRODUCT_IDS)],
+                                  year=2025, month=2, quantity=1000, priority=1) for i in range(8)]
+            with Session() as db:
+                create_sample_master_data(db)
+                db.add_all(january + february)
+                db.commit()
+
+            queue = GenerationJobQueue(Session)
+            runs = []
+            for year, month in ((None, None), (2025, 1), (2025, 2), (2025, 1)):
+                job = run(queue, year, month)
+                with Session() as db:
+                    stored = db.query(Batch).all()
+                    per_plan = {}
+                    for batch in stored:
+                        per_plan.setdefault(batch.sales_plan_id, set()).add(batch.schedule_id)
+                    validation = SchedulerService(db).validate_schedule(stored)
+                runs.append((job.schedule_id, job.status, len(stored), len(validation['conflicts']),
+                             max(len(ids) for ids in per_plan.values())))
+            queue.shutdown(wait=True)
+            with Session() as db:
+                spilled = db.query(Batch).filter(Batch.sales_plan_id.like("PLAN%"),
+                                                 Batch.start_time >= datetime(2025, 2, 1)).count()
+            engine.dispose()
+
+        ok = (all(status == SUCCEEDED and conflicts == 0 and schedule_sets == 1
+                  for _, status, _, conflicts, schedule_sets in runs)
+              and len({count for _, _, count, _, _ in runs}) == 1 and spilled > 0)
+        self.log_test("Generation Job Replacement", ok,
+                      f"(schedule_id, status, stored, overlaps, schedule ids per plan): {runs}, "
+                      f"january batches in february: {spilled}")
+
+    def test_incremental_repair(self):
+        """이동한 배치와 겹치는 설비 배치, 같은 로트의 후속 공정만 밀려야 함"""
+        base = datetime(2025, 1, 1)
+        hours = lambda h: base + timedelta(hours=h)
+        timeline = BatchTimeline([
+            TimelineEntry("A1", "EQ001", hours(0), hours(2), "LOT-A", 1),
+            TimelineEntry("A2", "EQ003", hours(2), hours(6), "LOT-A", 2),
+            TimelineEntry("B1", "EQ001", hours(2), hours(4), "LOT-B", 1),
+            TimelineEntry("B2", "EQ003", hours(6), hours(10), "LOT-B", 2),
+            TimelineEntry("C1", "EQ002", hours(0), hours(2), "LOT-C", 1),
+        ])
+        changed = repair_after_move(timeline, "A1", hours(2), hours(4))
+        result = {e.id: (e.start, e.end) for e in changed}
+        expected = {
+            "A1": (hours(2), hours(4)),
+            "B1": (hours(4), hours(6)),   # 같은 설비 충돌
+            "A2": (hours(4), hours(8)),   # 후속 공정
+            "B2": (hours(8), hours(12)),  # A2 에 밀린 같은 설비 배치
+        }
+        self.log_test("Incremental Repair", result == expected, f"changed: {sorted(result)}")
+
+        # 선행 공정(A1, ~04:00) 종료 전으로 옮긴 A2 는 선행 공정 종료 시각으로 맞춰짐
+        changed = repair_after_move(timeline, "A2", hours(0), hours(3))
+        a2 = timeline.get("A2")
+        self.log_test("Incremental Repair Predecessor Clamp",
+                      (a2.start, a2.end) == (hours(4), hours(7)) and "A2" in {e.id for e in changed},
+                      f"A2: {a2.start:%H:%M}-{a2.end:%H:%M}")
+
+        # 삭제는 같은 설비의 다음 배치와 로트 후속 공정을 비워진 구간으로 당김 (설비 앞 배치/선행 공정/월 1일까지)
+        timeline = BatchTimeline([
+            TimelineEntry("A1", "EQ001", hours(0), hours(2), "LOT-A", 1),
+            TimelineEntry("B1", "EQ001", hours(2), hours(4), "LOT-B", 1),
+            TimelineEntry("C1", "EQ001", hours(4), hours(6), "LOT-C", 1),
+            TimelineEntry("A2", "EQ003", hours(2), hours(6), "LOT-A", 2),
+            TimelineEntry("B2", "EQ003", hours(6), hours(10), "LOT-B", 2),
+            TimelineEntry("C2", "EQ003", hours(10), hours(14), "LOT-C", 2),
+            TimelineEntry("X1", "EQ009", hours(-4), hours(-2), "LOT-X", 1),  # 전월 말
+            TimelineEntry("Y1", "EQ009", hours(0), hours(2), "LOT-Y", 1),
+        ])
+        changed = repair_after_delete(timeline, "A1")
+        changed += repair_after_delete(timeline, "X1")
+        result = {e.id: (e.start, e.end) for e in changed}
+        expected = {
+            "B1": (hours(0), hours(2)),   # 같은 설비 다음 배치
+            "A2": (hours(0), hours(4)),   # 삭제된 배치의 후속 공정 (선행 공정 없음 → 월 1일)
+            "C1": (hours(2), hours(4)),   # B1 이 비운 구간
+            "B2": (hours(4), hours(8)),   # B1 후속 공정, EQ003 의 A2 뒤
+            "C2": (hours(8), hours(12)),  # C1 후속 공정, B2 뒤
+        }
+        self.log_test("Incremental Repair Delete", result == expected and "A1" not in timeline
+                      and timeline.get("Y1").start == hours(0),
+                      f"changed: {sorted(result)}")
+
+        # 50k 배치 스케줄에서 빈 구간으로 옮기는 편집은 50ms 이내
+        entries = [
+            TimelineEntry(f"B{lot * 4 + seq}", f"EQ{seq * 2 + lot % 2:03d}",
+                          hours(4 * lot + 2 * seq), hours(4 * lot + 2 * seq + 2), f"LOT{lot}", seq + 1)
+            for lot in range(12500) for seq in range(4)
+        ]
+        timeline = BatchTimeline(entries)
+        target = timeline.get("B20003")
+        started = time.perf_counter()
+        changed = repair_after_move(timeline, target.id, target.start + timedelta(hours=2),
+                                    target.end + timedelta(hours=2))
+        elapsed_ms = (time.perf_counter() - started) * 1000
+        self.log_test("Incremental Repair Latency (50k batches)", elapsed_ms < 50,
+                      f"{len(changed)} changed in {elapsed_ms:.2f} ms")
+
+    def test_validator(self):
+        """스윕라인 검증 결과가 전수 비교와 같고, 증분 검증이 전체 재검증과 같아야 함"""
+        rng = random.Random(7)
+        base = datetime(2025, 1, 1)
+        batches = []
+        for i in range(400):
+            start = base + timedelta(hours=rng.randrange(0, 300, 2))
+            batches.append(Batch(id=f"B{i:03d}", equipment_id=f"EQ00{rng.randint(1, 4)}", start_time=start,
+                                 end_time=start + timedelta(hours=rng.choice([2, 4, 6])),
+                                 sales_plan_id=f"PLAN{i // 4}", sequence=i % 4 + 1))
+
+        def brute_force(items):
+            pairs = {tuple(sorted((a.id, b.id))) for a in items for b in items
+                     if a.id < b.id and a.equipment_id == b.equipment_id
+                     and a.start_time < b.end_time and b.start_time < a.end_time}
+            steps = {(a.id, b.id) for a in items for b in items
+                     if a.sales_plan_id == b.sales_plan_id and b.sequence == a.sequence + 1
+                     and b.start_time < a.end_time}
+            return pairs, steps
+
+        def found(result):
+            return ({tuple(sorted(c["batch_ids"])) for c in result["conflicts"]},
+                    {p["batch_ids"] for p in result["precedence_violations"]})
+
+        service = SchedulerService(None)
+        full = service.validate_schedule(batches)
+        self.log_test("Sweep-line Validation", found(full) == brute_force(batches),
+                      f"{len(full['conflicts'])} conflicts, {len(full['precedence_violations'])} precedence violations")
+
+        # 일부 배치 이동/삭제 후 증분 검증
+        for batch in batches[:20]:
+            batch.start_time += timedelta(hours=8)
+            batch.end_time += timedelta(hours=8)
+        removed = [b.id for b in batches[20:30]]
+        remaining = batches[:20] + batches[30:]
+        incremental = service.validate_schedule(batches[:20], incremental=True, removed_ids=removed)
+        self.log_test("Incremental Validation", found(incremental) == brute_force(remaining)
+                      and incremental["statistics"]["equipment_utilization"]
+                      == SchedulerService(None).validate_schedule(remaining)["statistics"]["equipment_utilization"],
+                      f"{incremental['statistics']['total_batches']} batches, "
+                      f"{len(incremental['conflicts'])} conflicts after edit")
+
+        # 가운데 공정만 삭제 - 앞뒤 공정이 새로 인접하므로 그 쌍도 다시 검사해야 함
+        steps = {(b.sales_plan_id, b.sequence): b for b in remaining}
+        middle = [steps[(lot, 2)].id for lot, sequence in list(steps)
+                  if sequence == 1 and (lot, 2) in steps and (lot, 3) in steps
+                  and steps[(lot, 3)].start_time < steps[(lot, 1)].end_time]
+        remaining = [b for b in remaining if b.id not in middle]
+        incremental = service.validate_schedule([], incremental=True, removed_ids=middle)
+        full = SchedulerService(None).validate_schedule(remaining)
+        self.log_test("Incremental Validation (middle step removed)",
+                      bool(middle) and found(incremental) == found(full),
+                      f"{len(middle)} middle steps removed, "
+                      f"{len(incremental['precedence_violations'])} precedence violations")
+
+    def test_utilization_series(self):
+        """구간 가동률 시계열이 구간별 전수 계산과 같아야 함"""
+        rng = random.Random(3)
+        base = datetime(2025, 1, 1, 3)
+        rows = []
+        for _ in range(500):
+            start = base + timedelta(minutes=rng.randrange(0, 60 * 24 * 30, 30))
+            rows.append((f"EQ00{rng.randint(1, 3)}", start, start + timedelta(hours=rng.choice([1, 2, 5, 30]))))
+        types = {"EQ001": "mixer", "EQ002": "mixer", "EQ003": "tablet_press"}
+        result = utilization_series(*zip(*rows), bucket="shift", equipment_types=types)
+
+        mismatches = 0
+        for i, edge in enumerate(result["edges"]):
+            bucket_start = datetime.fromisoformat(edge)
+            bucket_end = bucket_start + timedelta(hours=8)
+            busy = {}
+            for equipment_id, start, end in rows:
+                overlap = (min(end, bucket_end) - max(start, bucket_start)).total_seconds()
+                busy[equipment_id] = busy.get(equipment_id, 0) + max(0, overlap)
+            for equipment_id, series in result["equipment"].items():
+                if abs(series[i] - round(busy.get(equipment_id, 0) / 28800 * 100, 2)) > 0.01:
+                    mismatches += 1
+            mixer = (busy.get("EQ001", 0) + busy.get("EQ002", 0)) / (2 * 28800) * 100
+            if abs(result["types"]["mixer"][i] - round(mixer, 2)) > 0.01:
+                mismatches += 1
+        self.log_test("Utilization Series", mismatches == 0 and result["edges"][0] == "2025-01-01T00:00:00",
+                      f"{len(result['edges'])} shift buckets, {mismatches} mismatches")
+
+    def generate_report(self):
+        """테스트 리포트 생성"""
+        passed = sum(1 for r in self.test_results if r['result'] == 'PASS')
+        failed = len(self.test_results) - passed
+        print("\n" + "="*50)
+        print(f"Total Tests: {len(self.test_results)}, Passed: {passed}, Failed: {failed}")
+        print("="*50)
+        return failed == 0
+
+    def run_all_tests(self):
+        """모든 테스트 실행"""
+        print("Starting SchedulerService Tests...")
+        print("="*50)
+        self.test_generation_query_count()
+        self.test_generation_slots()
+        self.test_engine_parity()
+        self.test_equipment_pools()
+        self.test_parallel_scenarios()
+        self.test_optimize_schedule()
+        self.test_bulk_persist()
+        self.test_database_profile()
+        self.test_schema_migration()
+        self.test_query_plans()
+        self.test_schedule_window_paging()
+        self.test_data_versions()
+        self.test_schedule_stream()
+        self.test_lot_numbers()
+        self.test_sales_plan_import()
+        self.test_generation_jobs()
+        self.test_generation_job_replacement()
+        self.test_schedule_broadcast()
+        self.test_broadcast_filter_errors()
+        self.test_schedule_export()
+        self.test_master_data_cache()
+        self.test_master_data_refresh()
+        self.test_batch_store()
+        self.test_log_pipeline()
+        self.test_metrics()
+        self.test_incremental_repair()
+        self.test_validator()
+        self.test_utilization_series()
+        return self.generate_report()
+
+
+if __name__ == "__main__":
+    tester = SchedulerServiceTester()
+    sys.exit(0 if tester.run_all_tests() else 1)